@@ -0,0 +1,46 @@
+"""Daily expiry alert digest, for cron or any scheduler.
+
+    python alert_digest.py                    # window from the app's "Alert before expiry" setting
+    python alert_digest.py --days 14 --out /srv/billboards/alerts
+
+    # crontab: every morning at 07:00
+    0 7 * * * cd /path/to/app && python alert_digest.py
+
+Writes alerts/alerts-<date>.txt and .json: live contracts expiring within
+the alert window, and those that expired since the previous run (or
+yesterday on the first run). Only sqlite3 is needed; pandas is not loaded.
+"""
+import argparse
+import sys
+from datetime import date
+
+from billboard_core.alerts import ALERTS_DIR, build_digest, mark_run, since_last_run, write_digest
+from billboard_core.db import close_all, reading
+from billboard_core.schema import DB_PATH
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--days', type=int, help="alert window (default: the saved app setting)")
+    parser.add_argument('--since', type=date.fromisoformat, help="report expiries from this date (YYYY-MM-DD)")
+    parser.add_argument('--today', type=date.fromisoformat, help="run as of this date (YYYY-MM-DD)")
+    parser.add_argument('--out', default=ALERTS_DIR, help="output directory")
+    parser.add_argument('--db', default=DB_PATH)
+    args = parser.parse_args(argv)
+
+    today = args.today or date.today()
+    since = args.since or since_last_run(today, args.out)
+    try:
+        with reading(args.db) as conn:
+            digest = build_digest(conn, args.days, since, today)
+    finally:
+        close_all()
+    txt, _ = write_digest(digest, args.out)
+    mark_run(digest, args.out)
+    print(f"✅ {len(digest['expiring'])} expiring within {digest['alert_days']} days, "
+          f"{len(digest['expired'])} expired since {digest['expired_since']} → {txt}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
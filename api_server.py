@@ -0,0 +1,40 @@
+"""Read-only JSON API over the billboard database, run next to the app.
+
+    python api_server.py                           # http://127.0.0.1:8502
+    python api_server.py --host 0.0.0.0 --port 8080 --db /srv/billboards/billboards.db
+
+    GET /boards?status=Available,Expiring%20Soon&page=1&page_size=100
+    GET /boards/12                                 # one board, its live contract and bookings
+    GET /availability?start=2026-11-01&end=2026-11-30
+    GET /expiring?days=14                          # default: the app's "Alert before expiry" setting
+    GET /health
+
+Responses carry an ETag that changes only when the database does (or the
+date rolls over); send it back in If-None-Match and an unchanged answer is
+a bodiless 304. Runs on asyncio with only sqlite3 underneath: neither
+Streamlit nor pandas is loaded. The database is opened read-only and never
+created or upgraded; until the app (or migrate_db.py) has brought it to the
+current schema, data requests get 503.
+"""
+import argparse
+import logging
+import sys
+
+from billboard_core.api import API_HOST, API_PORT, run
+from billboard_core.schema import DB_PATH
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default=API_HOST, help="interface to listen on")
+    parser.add_argument('--port', type=int, default=API_PORT)
+    parser.add_argument('--db', default=DB_PATH)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    run(args.db, args.host, args.port)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,158 +1,481 @@
 import streamlit as st
 import pandas as pd
-import sqlite3
 from datetime import datetime, timedelta
 import os
+import sqlite3
+import tempfile
+import uuid
+
+from billboard_core import perf
+from billboard_core.schema import CONTRACT_COLUMNS, CONTRACT_STATUSES, PAYMENT_STATUSES
+from billboard_core.status import cached_statuses
+from billboard_core.slots import SlotIndex
+from billboard_core.db import reading, transaction, writing
+from billboard_core.persistence import (
+    DB_PATH, DASHBOARD_KEY, ARCHIVE_KEY, read_store, read_summary, shared,
+    changes, row_changes, is_empty_changes, resolve_archive_ids,
+    rewrite_db, snapshot, diff_rows, row_hashes, clear_rows, blank_rows, row_is_blank,
+)
+from billboard_core.frames import (
+    append_rows, apply_editor_delta, contains, fmt_money, is_blank, overlay, to_board_number, widen_categories,
+)
+from billboard_core.inventory import (
+    dashboard_page, dashboard_rows, read_dashboard, board_is_occupied,
+    board_count, set_inventory_size, clear_live_contracts,
+)
+from billboard_core.reports import STATUS_SQL, live_contracts, summary_metrics, summary_page
+from billboard_core.export import EXPORT_FORMATS, export_archive_bytes
+from billboard_core.availability import (
+    BOOKED, activate_due_bookings, book_board, booking_conflicts, cancel_booking, count_free, free_boards,
+    occupancy_by_month, overlapping, upcoming_bookings,
+)
+from billboard_core.finance import (
+    PAYMENT_METHODS, delete_payment, finance_kpis, live_contract, payments_for, record_payment,
+)
+from billboard_core.importer import import_contracts
+from billboard_core.alerts import expiry_counts
+from billboard_core.settings import (
+    ALERT_DAYS, PERF_ENABLED, PERF_SLOW_MS, alert_days as alert_days_setting, perf_settings, set_setting,
+)
+from billboard_core.pdf_forms import batch_pdf, batch_zip, contract_pdf
+from billboard_core.images import (
+    UPLOAD_TYPES, data_url, image_mime, read_original, ref_key, store_image, thumbnail, thumbnail_urls,
+)
+from billboard_core.autosave import writer_for
+from billboard_core.backup import create_backup, list_backups, restore_backup
+from billboard_core.journal import board_history, labels as journal_labels, redo, state_at, undo
 
 
-# -------------------- CONFIG --------------------
-DB_PATH = "billboards.db"
-DEFAULT_COLS = [
-    'Billboard Number', 'Billboard ID', 'Location', 'Billboard Size',
-    'Client Name', 'Company Name', 'Contact Number', 'Email',
-    'Contract Start Date', 'Contract End Date', 'Rental Duration',
-    'Rent Amount (PKR)', 'Advance Received (PKR)', 'Balance / Credit (PKR)',
-    'Payment Status', 'Contract Status', 'Days Remaining',
-    'Remarks / Notes', 'Image / Link', 'Partner’s share'
-]
-MAX_BOARDS = 50
-
 st.set_page_config(page_title="Billboard Manager — Pro", layout="wide")
 st.title("📊 Billboard Rental Manager — Pro")
 
 # -------------------- SIDEBAR SETTINGS --------------------
 st.sidebar.header("Settings")
-use_sql = st.sidebar.checkbox("Use SQLite persistence", value=True)
+# The dashboard, archive and search are paged straight from SQLite, so the
+# database is always opened (and created or upgraded on first use). The
+# toggle only decides whether this session's changes are written back.
+use_sql = st.sidebar.checkbox(
+    "Use SQLite persistence", value=True,
+    help="Write changes to billboards.db. When off, edits stay in this session; "
+         "data is still read from the database.",
+)
 auto_save = st.sidebar.checkbox("Auto-save after actions", value=True)
-alert_days = st.sidebar.number_input("Alert before expiry (days)", min_value=0, max_value=365, value=7)
+# the alert window is shared with the daily alert job (alert_digest.py)
+with reading() as conn:
+    saved_alert_days = alert_days_setting(conn)
+    perf_on, perf_slow_ms = perf_settings(conn)
+# per-rerun timings for Admin → Performance; close a run that st.rerun() cut short
+perf.configure(perf_on, perf_slow_ms)
+perf.end(st.session_state.pop('perf_run', None), cut=True)
+st.session_state.perf_run = perf.begin('rerun')
+alert_days = st.sidebar.number_input(
+    "Alert before expiry (days)", min_value=0, max_value=365, value=saved_alert_days, key='alert_days',
+)
+if use_sql and alert_days != saved_alert_days:
+    with writing() as conn:
+        set_setting(conn, ALERT_DAYS, int(alert_days))
+with reading() as conn:
+    expiry = expiry_counts(conn, alert_days)
+st.sidebar.caption(f"⏰ {expiry['expiring']:,} expiring within {alert_days} days · {expiry['expired']:,} expired")
+page_size = st.sidebar.selectbox("Boards per page", [25, 50, 100, 200], index=1)
 
 # -------------------- HELPERS --------------------
-def fmt_money(val):
-    try:
-        if val is None or (isinstance(val, float) and pd.isna(val)) or str(val).strip() == "":
-            return ""
-        return f"{float(val):,.0f}"
-    except:
-        return str(val)
-
-def init_db_if_missing(conn):
-    cur = conn.cursor()
-    cur.execute("SELECT name FROM sqlite_master WHERE type='table'")
-    tables = {r[0] for r in cur.fetchall()}
-    if 'dashboard' not in tables or 'saveddata' not in tables or 'summary' not in tables:
-        df = pd.DataFrame(columns=DEFAULT_COLS)
-        df.to_sql('dashboard', conn, index=False, if_exists='replace')
-        df.to_sql('saveddata', conn, index=False, if_exists='replace')
-        pd.DataFrame({'Total Boards':[MAX_BOARDS]}).to_sql('summary', conn, index=False, if_exists='replace')
-
-def read_sheets_sqlite():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    try:
-        init_db_if_missing(conn)
-        dashboard = pd.read_sql_query('SELECT * FROM dashboard', conn)
-        saved = pd.read_sql_query('SELECT * FROM saveddata', conn)
-        summary = pd.read_sql_query('SELECT * FROM summary', conn)
-
-        for df in (dashboard, saved):
-            for c in df.columns:
-                if any(k in c.lower() for k in ['date','start','end','from','to']):
-                    df[c] = pd.to_datetime(df[c], errors='coerce')
-
-        return dashboard, summary, saved
-    finally:
-        conn.close()
-
-def save_to_db(dashboard_df, summary_df, saved_df):
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    dashboard_df.to_sql('dashboard', conn, index=False, if_exists='replace')
-    saved_df.to_sql('saveddata', conn, index=False, if_exists='replace')
-    summary_df.to_sql('summary', conn, index=False, if_exists='replace')
-    conn.close()
-
-def compute_status(end_val, alert_days_local):
+def db_query(fn, *args, **kwargs):
+    with perf.phase(f"query:{fn.__name__}") as p, reading() as conn:
+        result = fn(conn, *args, **kwargs)
+        p.rows = perf.rows_of(result)
+        return result
+
+def db_write(fn, *args, **kwargs):
+    # fn manages its own transaction on the shared writer connection
+    with perf.phase(f"write:{fn.__name__}"), writing() as conn:
+        return fn(conn, *args, **kwargs)
+
+def touch_dashboard():
+    # bump whenever dashboard_df changes so cached derived columns are recomputed
+    st.session_state.data_version = st.session_state.get('data_version', 0) + 1
+
+def add_pending(rows):
+    if rows.empty:
+        return
+    pending = st.session_state.pending
+    keep = pending[~pending[DASHBOARD_KEY].isin(rows[DASHBOARD_KEY])] if not pending.empty else pending
+    st.session_state.pending = pd.concat([keep, rows], ignore_index=True)
+
+def sync_slots(rows, released=()):
+    # keep the free-slot index in step with rows that were just edited
+    slots = st.session_state.slots
+    for _, r in rows.iterrows():
+        if not pd.isna(r[DASHBOARD_KEY]):
+            slots.set_occupied(r[DASHBOARD_KEY], not row_is_blank(r))
+    for n in released:
+        slots.release(n)
+
+def current_page():
+    # the visible dashboard page, loading page 1 if no view has loaded one yet
+    if st.session_state.dashboard_df is None:
+        load_page(None, 1, [], "")
+    return st.session_state.dashboard_df
+
+def stage_rows(rows):
+    # rows on the visible page are edited in place; others wait in `pending`
+    page = current_page()
+    on_page = rows[DASHBOARD_KEY].isin(page[DASHBOARD_KEY])
+    overlay(page, rows[on_page])
+    add_pending(rows[~on_page])
+    sync_slots(rows)
+    touch_dashboard()
+
+def apply_dashboard_edits(edited):
+    # write only the cells in the editor's change set into the page; deleted
+    # rows are cleared and added rows go to the first free boards (not ones
+    # freed by this same edit, whose contracts are being deleted). Returns
+    # (page labels to save, added rows that found no free board)
+    page = st.session_state.dashboard_df
+    delta = st.session_state.get("dashboard_editor") or {}
+    with perf.phase('apply_delta') as p:
+        changed, deleted, added = apply_editor_delta(page, edited, delta)
+        clear_rows(page, deleted)
+        touched = list(dict.fromkeys(changed + deleted))
+        p.rows = len(touched) + len(added)
+    added = added[[not row_is_blank(r) for _, r in added.iterrows()]]
+    unplaced = 0
+    if len(added):
+        boards = allocate_boards(len(added))
+        if boards:
+            rows = added.drop(columns=[c for c in ('Select', 'Preview', 'Status', 'Days Remaining') if c in added.columns])
+            rows[DASHBOARD_KEY] = boards
+            stage_rows(rows)
+            touched += [i for i in page.index[page[DASHBOARD_KEY].isin(boards)] if i not in touched]
+        else:
+            unplaced = len(added)
+    sync_slots(page.loc[touched])
+    if touched:
+        touch_dashboard()
+    return touched, unplaced
+
+def board_rows(numbers):
+    # current (possibly unsaved) rows for board numbers, from page, pending or DB
+    page = st.session_state.dashboard_df
+    rows = db_query(dashboard_rows, numbers)
+    rows = overlay(rows, st.session_state.pending)
+    return overlay(rows, page)
+
+def stash_page_edits():
+    # keep unsaved edits of the current page before another page replaces it
+    page = st.session_state.get('dashboard_df')
+    if page is None or st.session_state.db_baseline is None:
+        return
+    changed, deleted = diff_rows(page, DASHBOARD_KEY, st.session_state.db_baseline['dashboard'])
+    if deleted:
+        changed = pd.concat([changed, blank_rows(deleted, page)], ignore_index=True)
+    add_pending(changed[changed[DASHBOARD_KEY].notna()].copy())
+
+def load_page(key, page_no, statuses, search):
+    page, total = db_query(
+        dashboard_page, page_no, page_size, statuses=statuses, search=search, alert_days=alert_days,
+    )
+    st.session_state.db_baseline['dashboard'] = row_hashes(page, DASHBOARD_KEY)
+    st.session_state.dashboard_df = overlay(page, st.session_state.pending)
+    st.session_state.page_key = key
+    st.session_state.page_total = total
+    touch_dashboard()
+
+def edited_boards():
+    # boards with unsaved changes in this session (pending or edited on the page)
+    boards = set(st.session_state.pending[DASHBOARD_KEY].tolist())
+    page = st.session_state.dashboard_df
+    if page is not None and st.session_state.db_baseline is not None:
+        changed, deleted = diff_rows(page, DASHBOARD_KEY, st.session_state.db_baseline['dashboard'])
+        boards.update(changed[DASHBOARD_KEY].tolist())
+        boards.update(deleted)
+    return boards
+
+def slot_is_free(n):
+    # the session's index is authoritative for boards it has edited; anything
+    # else is re-checked against the DB in case another session booked it
+    slots = st.session_state.slots
+    if not slots.is_free(n):
+        return False
+    if n not in edited_boards() and db_query(board_is_occupied, n):
+        slots.occupy(n)
+        return False
+    return True
+
+def allocate_boards(count=1, period=None):
+    # lowest `count` free boards (O(log n) each), or [] if there aren't enough;
+    # with a (start, end) period, boards booked during it are passed over
+    slots = st.session_state.slots
+    taken, booked = [], []
+    while len(taken) < count:
+        n = slots.first_free()
+        if n is None:
+            break
+        if not slot_is_free(n):
+            continue
+        slots.occupy(n)
+        if period and db_query(overlapping, n, *period, kinds=(BOOKED,)):
+            booked.append(n)
+        else:
+            taken.append(n)
+    for n in booked:
+        slots.release(n)
+    if len(taken) < count:
+        for n in taken:
+            slots.release(n)
+        return []
+    return taken
+
+def restore_archived(labels):
+    # move archived rows (saved_df index labels) back onto their boards in one
+    # batch; rows whose board is missing, occupied or claimed twice are skipped
+    saved = st.session_state.saved_df
+    rows = saved.loc[labels]
+    slots = st.session_state.slots
+    restored, conflicts, claimed = {}, [], set()
+    for label, r in rows.iterrows():
+        n = to_board_number(r[DASHBOARD_KEY])
+        if n is None or not slots.exists(n):
+            reason = "board does not exist"
+        elif n in claimed:
+            reason = "another selected row restores to this board"
+        elif not slot_is_free(n):
+            reason = "board is occupied"
+        else:
+            claimed.add(n)
+            restored[label] = n
+            continue
+        conflicts.append({
+            ARCHIVE_KEY: r.get(ARCHIVE_KEY), DASHBOARD_KEY: r[DASHBOARD_KEY],
+            'Client Name': r.get('Client Name', ''), 'Reason': reason,
+        })
+    if restored:
+        targets = board_rows(restored.values())
+        src = rows.loc[list(restored)].set_index(DASHBOARD_KEY, drop=False)
+        src.index = [to_board_number(v) for v in src.index]
+        cols = [c for c in targets.columns if c != DASHBOARD_KEY and c in src.columns]
+        widen_categories(targets, src)
+        for i, n in targets[DASHBOARD_KEY].items():
+            for c in cols:
+                targets.at[i, c] = src.at[n, c]
+        stage_rows(targets)
+        st.session_state.saved_df = saved.drop(index=list(restored))
+    return sorted(restored.values()), pd.DataFrame(conflicts)
+
+def current_dashboard():
+    # every board, with unsaved edits applied (reporting / full rewrite only)
+    full = db_query(read_dashboard)
+    full = overlay(full, st.session_state.pending)
+    return overlay(full, st.session_state.dashboard_df)
+
+def persist(wait=False, label="Save"):
+    # queue the page, pending off-page rows and archive rows changed since the
+    # baseline for the background writer; the UI carries on at once. `label`
+    # names the action in the change journal (Undo / board history)
+    page = current_page()
+    pending = st.session_state.pending
+    if not pending.empty:
+        pending = pending[~pending[DASHBOARD_KEY].isin(page[DASHBOARD_KEY])]
+    with perf.phase('persist_diff') as p:
+        changeset, baseline = changes(
+            pd.concat([page, pending], ignore_index=True) if not pending.empty else page,
+            st.session_state.summary_df, st.session_state.saved_df,
+            baseline=st.session_state.db_baseline,
+        )
+        p.rows = len(changeset['live']) + len(changeset['archive'])
+    baseline['dashboard'] = row_hashes(page, DASHBOARD_KEY)
+    st.session_state.pending = page.iloc[0:0]
+    submit(changeset, baseline, wait, label)
+
+def persist_rows(rows, archived=None, label="Edit"):
+    # queue just these page rows (new archive rows are stamped with their
+    # temporary ids), plus any pending off-page rows, without diffing the
+    # page or the archive
+    page, pending = current_page(), st.session_state.pending
+    with perf.phase('persist_rows', rows=len(rows)) as p:
+        if not pending.empty:
+            # pending rows shown on the page are saved as the page has them
+            also = page[DASHBOARD_KEY].isin(pending[DASHBOARD_KEY]) & ~page[DASHBOARD_KEY].isin(rows[DASHBOARD_KEY])
+            rows = pd.concat([rows, page[also]])
+        changeset, baseline = row_changes(st.session_state.db_baseline, rows, archived)
+        if not pending.empty:
+            waiting, _ = changes(pending[~pending[DASHBOARD_KEY].isin(page[DASHBOARD_KEY])], None, None)
+            changeset['live'] = {**waiting['live'], **changeset['live']}
+            st.session_state.pending = pending.iloc[0:0]
+        p.rows = len(changeset['live']) + len(changeset['archive'])
+    submit(changeset, baseline, label=label)
+
+def submit(changeset, baseline, wait=False, label="Save"):
+    writer = writer_for(DB_PATH)
+    if not is_empty_changes(changeset):
+        changeset['journal'] = {'session': st.session_state.session_id, 'label': label}
+        seq = writer.submit(changeset)
+        first, _ = st.session_state.save_seqs
+        st.session_state.save_seqs = (first or seq, seq)
+    st.session_state.db_baseline = baseline
+    if wait:
+        with perf.phase('persist_wait'):
+            writer.flush()
+        resolve_archive_ids(st.session_state.saved_df, baseline, writer.id_map)
+
+def save_state():
+    # ('idle' | 'pending' | 'saved' | 'failed', detail) for this session's writes
+    first, last = st.session_state.save_seqs
+    if not last:
+        return 'idle', None
+    state, detail = writer_for(DB_PATH).status(first or last, last)
+    if state == 'saved':
+        st.session_state.save_seqs = (None, last)
+    return state, detail
+
+def safety_backup(action):
+    # snapshot the database before a destructive action; False (with an
+    # error shown) if that fails, and the action should not go ahead
+    writer_for(DB_PATH).flush()
     try:
-        if pd.isna(end_val) or str(end_val).strip() == "":
-            return 'Available'
-        end_dt = pd.to_datetime(end_val)
-    except:
-        return 'Unknown'
-
-    today = pd.Timestamp(datetime.today().date())
-    if end_dt < today:
-        return 'Expired'
-    if end_dt <= today + pd.Timedelta(days=alert_days_local):
-        return 'Expiring Soon'
-    return 'Booked'
+        with perf.phase('backup'):
+            create_backup(reason=f"before {action}")
+    except (OSError, sqlite3.Error, ValueError) as e:
+        st.error(f"❌ Snapshot before {action} failed, nothing was changed: {e}")
+        return False
+    return True
+
+def reload_store():
+    # parsed frames and the slot index are shared by all sessions until the DB
+    # changes; each session gets copy-on-write views of them
+    writer_for(DB_PATH).flush()
+    with perf.phase('load_store') as p:
+        saved, summ, baseline = read_store()
+        p.rows = len(saved)
+    st.session_state.saved_df = saved
+    st.session_state.summary_df = summ
+    st.session_state.db_baseline = baseline
+    st.session_state.pending = pd.DataFrame(columns=[DASHBOARD_KEY])
+    st.session_state.slots = shared('slots', SlotIndex.from_db).copy()
+    st.session_state.dashboard_df = None
+    st.session_state.page_key = None
 
 
 # -------------------- LOAD / INIT --------------------
 if 'initialized' not in st.session_state:
     st.session_state.initialized = True
+    st.session_state.status_cache = {}
+    st.session_state.save_seqs = (None, 0)
+    # tags this session's actions in the change journal, for its Undo / Redo
+    st.session_state.session_id = uuid.uuid4().hex[:12]
+    reload_store()
+
+# archive rows queued for the writer get their real ids once written
+resolve_archive_ids(st.session_state.saved_df, st.session_state.db_baseline, writer_for(DB_PATH).id_map)
+
+@st.fragment(run_every="2s")
+def save_indicator():
+    state, detail = save_state()
+    if state == 'pending':
+        st.caption(f"⏳ Saving… ({detail} change set(s) queued)")
+    elif state == 'saved':
+        st.caption(f"✅ Saved{detail.strftime(' at %H:%M:%S') if detail else ''}")
+    elif state == 'failed':
+        st.error(f"⚠ Save failed: {detail}. Use Admin → Reload from DB.")
+
+def undo_redo(step):
+    # replayed from the change journal; this session's unsaved edits are saved
+    # first, so they are the latest action
+    persist(wait=True)
+    with perf.phase(f"journal_{step.__name__}"), transaction() as conn:
+        result = step(conn, st.session_state.session_id)
+    reload_store()
+    st.session_state.undo_report = (step.__name__, result)
+
+with st.sidebar:
+    save_indicator()
+    if use_sql:
+        can_undo, can_redo = db_query(journal_labels, st.session_state.session_id)
+        u1, u2 = st.columns(2)
+        with u1:
+            if st.button("↶ Undo", help=can_undo and f"Undo: {can_undo}", disabled=not can_undo):
+                undo_redo(undo)
+                st.rerun()
+        with u2:
+            if st.button("↷ Redo", help=can_redo and f"Redo: {can_redo}", disabled=not can_redo):
+                undo_redo(redo)
+                st.rerun()
+        report = st.session_state.pop('undo_report', None)
+        if report and report[1]:
+            step, result = report
+            st.caption(f"{'↶ Undid' if step == 'undo' else '↷ Redid'} “{result['label']}” ({result['cells']} cell(s))")
+            if result['skipped']:
+                st.warning(f"⚠ {result['skipped']} cell(s) changed since were left as they are.")
 
-    if use_sql and os.path.exists(DB_PATH):
-        try:
-            dash, summ, saved = read_sheets_sqlite()
-        except:
-            dash = pd.DataFrame(columns=DEFAULT_COLS)
-            saved = pd.DataFrame(columns=DEFAULT_COLS)
-            summ = pd.DataFrame({'Total Boards':[MAX_BOARDS]})
-    elif use_sql:
-        conn = sqlite3.connect(DB_PATH)
-        init_db_if_missing(conn)
-        conn.close()
-        dash, summ, saved = read_sheets_sqlite()
-    else:
-        dash = pd.DataFrame(columns=DEFAULT_COLS)
-        saved = pd.DataFrame(columns=DEFAULT_COLS)
-        summ = pd.DataFrame({'Total Boards':[MAX_BOARDS]})
-
-    if 'Billboard Number' not in dash.columns:
-        dash = dash.reindex(columns=["Billboard Number"] + [c for c in DEFAULT_COLS if c != 'Billboard Number'])
-
-    if len(dash) < MAX_BOARDS:
-        n_add = MAX_BOARDS - len(dash)
-        add_df = pd.DataFrame([[""]*len(dash.columns)] * n_add, columns=dash.columns)
-        dash = pd.concat([dash, add_df], ignore_index=True)
-
-    dash['Billboard Number'] = list(range(1, MAX_BOARDS+1))
-
-    st.session_state.dashboard_df = dash.reset_index(drop=True)
-    st.session_state.saved_df = saved.reset_index(drop=True)
-    st.session_state.summary_df = summ
-
-dashboard_df = st.session_state.dashboard_df
 saved_df = st.session_state.saved_df
 summary_df = st.session_state.summary_df
 
 # -------------------- MAIN MENU --------------------
 menu = st.sidebar.radio('View', ['Dashboard', 'Summary', 'Saved Data', 'Admin', 'Print'])
+perf.annotate(view=menu)
 # -------------------- DASHBOARD --------------------
 if menu == 'Dashboard':
 
     st.header("📋 Dashboard — Select / Edit / Quick Add")
 
+    # FILTERS / PAGING (only the visible page is loaded)
+    f1, f2, f3 = st.columns([2, 2, 1])
+    with f1:
+        search = st.text_input("Search client / company / location / ID")
+    with f2:
+        statuses = st.multiselect("Status", list(STATUS_SQL))
+    total = st.session_state.get('page_total') or 0
+    n_pages = max(1, -(-total // page_size))
+    with f3:
+        page_no = st.number_input("Page", min_value=1, value=1, step=1)
+
+    key = (int(page_no), page_size, tuple(statuses), search, alert_days if statuses else None)
+    if st.session_state.page_key != key or st.session_state.dashboard_df is None:
+        stash_page_edits()
+        load_page(key, page_no, statuses, search)
+        total = st.session_state.page_total
+        n_pages = max(1, -(-total // page_size))
+    st.caption(f"Page {int(page_no)} of {n_pages} — {total:,} boards match")
+
+    dashboard_df = st.session_state.dashboard_df
+
     # STATUS UPDATE
     end_col = "Contract End Date"
-    dashboard_df["Status"] = [
-        compute_status(dashboard_df.at[i, end_col], alert_days)
-        for i in range(len(dashboard_df))
-    ]
+    with perf.phase('statuses', rows=len(dashboard_df)):
+        status, days_left = cached_statuses(
+            st.session_state.status_cache, st.session_state.data_version,
+            dashboard_df[end_col], alert_days,
+        )
+    dashboard_df["Status"] = status
+    dashboard_df["Days Remaining"] = days_left
 
     # SELECT COLUMN
     if "Select" not in dashboard_df.columns:
         dashboard_df.insert(0, "Select", False)
     dashboard_df["Select"] = dashboard_df["Select"].astype(bool)
-
-    edited = st.data_editor(
-        dashboard_df,
-        use_container_width=True,
-        num_rows="dynamic",
-        column_config={
-            "Select": st.column_config.CheckboxColumn(required=False),
-            "Billboard Number": st.column_config.NumberColumn(disabled=True),
-        },
-        key="dashboard_editor"
-    )
+    # small cached thumbnails of stored photos; only misses are rendered (in a thread pool)
+    with perf.phase('thumbnails', rows=len(dashboard_df)):
+        previews = thumbnail_urls(dashboard_df["Image / Link"])
+    if "Preview" not in dashboard_df.columns:
+        dashboard_df.insert(1, "Preview", previews)
+    else:
+        dashboard_df["Preview"] = previews
+    # free text in the editor: as a categorical it would only offer places already on the page
+    if isinstance(dashboard_df["Location"].dtype, pd.CategoricalDtype):
+        dashboard_df["Location"] = dashboard_df["Location"].astype("string")
+
+    with perf.phase('render_editor', rows=len(dashboard_df)):
+        edited = st.data_editor(
+            dashboard_df,
+            use_container_width=True,
+            num_rows="dynamic",
+            column_config={
+                "Select": st.column_config.CheckboxColumn(required=False),
+                "Preview": st.column_config.ImageColumn("Photo", width="small"),
+                "Billboard Number": st.column_config.NumberColumn(disabled=True),
+            },
+            key="dashboard_editor"
+        )
 
     # SELECTED ROWS
     selected_rows = edited.index[edited["Select"] == True].tolist() if "Select" in edited.columns else []
@@ -160,13 +483,18 @@ if menu == 'Dashboard':
     col_apply, col_archive, col_delete = st.columns(3)
 
     # APPLY EDITS
+    # all three act on the editor's change set (st.session_state.dashboard_editor),
+    # so only the touched rows are written to the page and the database
     with col_apply:
         if st.button("Apply Edits"):
-            st.session_state.dashboard_df = edited.copy()
-            if auto_save and use_sql:
-                save_to_db(edited, summary_df, saved_df)
-            st.success("✔ Changes Saved")
-            st.rerun()
+            touched, unplaced = apply_dashboard_edits(edited)
+            if auto_save and use_sql and touched:
+                persist_rows(st.session_state.dashboard_df.loc[touched])
+            if unplaced:
+                st.warning(f"⚠ {unplaced} added row(s) not saved: no free board left.")
+            else:
+                st.success("✔ Changes Saved")
+                st.rerun()
 
     # ARCHIVE SELECTED
     with col_archive:
@@ -174,20 +502,18 @@ if menu == 'Dashboard':
             if not selected_rows:
                 st.warning("⚠ کوئی row منتخب نہیں کی گئی۔")
             else:
-                dash_copy = edited.copy()
-                archive_block = []
-                for idx in selected_rows:
-                    r = dash_copy.iloc[idx].copy()
-                    r["Archived At"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    archive_block.append(r)
-                    for col in dash_copy.columns:
-                        if col not in ["Billboard Number", "Select"]:
-                            dash_copy.at[idx, col] = ""
-                st.session_state.saved_df = pd.concat([saved_df, pd.DataFrame(archive_block)], ignore_index=True)
-                st.session_state.dashboard_df = dash_copy
+                touched, _ = apply_dashboard_edits(edited)
+                page = st.session_state.dashboard_df
+                archive_block = page.loc[selected_rows].copy()
+                archive_block["Archived At"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                clear_rows(page, selected_rows)
+                sync_slots(page.loc[selected_rows])
+                touched += [i for i in selected_rows if i not in touched]
+                touch_dashboard()
 
                 if auto_save and use_sql:
-                    save_to_db(dash_copy, summary_df, st.session_state.saved_df)
+                    persist_rows(page.loc[touched], archived=archive_block, label="Archive")
+                st.session_state.saved_df = append_rows(saved_df, archive_block)
 
                 st.success("✔ Rows Archived")
                 st.rerun()
@@ -198,15 +524,15 @@ if menu == 'Dashboard':
             if not selected_rows:
                 st.warning("⚠ کوئی row منتخب نہیں کی گئی۔")
             else:
-                dash_copy = edited.copy()
-                for idx in selected_rows:
-                    for col in dash_copy.columns:
-                        if col not in ["Billboard Number", "Select"]:
-                            dash_copy.at[idx, col] = ""
-                st.session_state.dashboard_df = dash_copy
+                touched, _ = apply_dashboard_edits(edited)
+                page = st.session_state.dashboard_df
+                clear_rows(page, selected_rows)
+                sync_slots(page.loc[selected_rows])
+                touched += [i for i in selected_rows if i not in touched]
+                touch_dashboard()
 
                 if auto_save and use_sql:
-                    save_to_db(dash_copy, summary_df, saved_df)
+                    persist_rows(page.loc[touched], label="Delete")
 
                 st.success("✔ Rows Cleared")
                 st.rerun()
@@ -217,21 +543,19 @@ if menu == 'Dashboard':
     st.subheader("➕ Quick Add / Auto-Fill")
 
     # Slot selection
-    col_slot1, col_slot2 = st.columns([2, 1])
+    slots = st.session_state.slots
+    col_slot1, col_slot2, col_slot3 = st.columns([2, 1, 1])
     with col_slot1:
-        choices = ["🪧 Auto (First Empty Slot)"] + [
-            f"Billboard {i}" for i in range(1, MAX_BOARDS + 1)
-        ]
-        choice = st.selectbox("🎯 Target Slot:", choices)
+        choice = st.selectbox("🎯 Target Slot:", ["🪧 Auto (First Empty Slot)", "🔢 Billboard Number"])
+    auto_slot = choice == "🪧 Auto (First Empty Slot)"
     with col_slot2:
-        overwrite = st.checkbox("🔄 Overwrite Existing", value=False)
-
-    chosen_idx = None
-    if choice != "🪧 Auto (First Empty Slot)":
-        chosen = int(choice.split()[-1])
-        idx_list = dashboard_df.index[dashboard_df["Billboard Number"] == chosen].tolist()
-        if idx_list:
-            chosen_idx = idx_list[0]
+        if auto_slot:
+            n_book = st.number_input("Boards to book", min_value=1, max_value=max(slots.n_free, 1), value=1, step=1)
+        else:
+            chosen = st.number_input("Billboard", min_value=1, max_value=max(len(slots), 1), value=1, step=1)
+    with col_slot3:
+        overwrite = st.checkbox("🔄 Overwrite Existing", value=False, disabled=auto_slot)
+    st.caption(f"{slots.n_free:,} of {len(slots):,} boards free")
 
     st.write("### 📝 Fill Details")
 
@@ -266,117 +590,318 @@ if menu == 'Dashboard':
                 st.markdown("**Balance (PKR)**")
                 st.info(f"{balance:,.2f}")
 
-            pay_status = st.selectbox("Payment Status", ["Pending", "Paid", "Partial", "Overdue"])
-            contract_status = st.selectbox("Contract Status", ["Active", "Completed", "Cancelled"])
+            pay_status = st.selectbox("Payment Status", PAYMENT_STATUSES)
+            contract_status = st.selectbox("Contract Status", CONTRACT_STATUSES)
 
         st.write("### 🧾 Extra Info")
         remarks = st.text_area("Remarks / Notes")
         colx1, colx2 = st.columns(2)
         with colx1:
             img_link = st.text_input("📷 Image Link / URL")
+            img_file = st.file_uploader("…or upload a photo", type=UPLOAD_TYPES)
         with colx2:
             partner_share = st.text_input("💼 Partner’s Share (if any)")
 
         submitted = st.form_submit_button("✅ Add Billboard Entry")
 
-    if submitted:
-        target = None
-
-        # Auto slot detection
-        if choice == "🪧 Auto (First Empty Slot)":
-            for i in range(len(dashboard_df)):
-                row = dashboard_df.iloc[i]
-                if all(str(row[c]).strip() == "" for c in dashboard_df.columns if c not in ["Billboard Number", "Select", "Status"]):
-                    target = i
-                    break
-        else:
-            target = chosen_idx
-            if target is not None and not overwrite:
-                row = dashboard_df.iloc[target]
-                if any(str(row[c]).strip() != "" for c in dashboard_df.columns if c not in ["Billboard Number", "Select", "Status"]):
-
-                    st.error("❌ Slot already occupied! Enable Overwrite option.")
-                    target = None
+    if submitted and img_file is not None:
+        # stored before any board is taken, so a bad file books nothing
+        try:
+            img_link = store_image(img_file.getvalue())
+        except ValueError as e:
+            st.error(f"❌ Photo not added: {e}")
+            submitted = False
 
-        if target is None:
-            st.error("⚠ Empty slot not found.")
+    if submitted:
+        targets = []
+
+        # Auto slot detection (one or many boards for a campaign)
+        booked = [] if auto_slot else db_query(overlapping, int(chosen), start_date, end_date, kinds=(BOOKED,))
+        if auto_slot:
+            targets = allocate_boards(int(n_book), period=(start_date, end_date))
+        elif not slots.exists(chosen):
+            st.error(f"Billboard {chosen} not found in Dashboard")
+        elif not overwrite and not slot_is_free(int(chosen)):
+            st.error("❌ Slot already occupied! Enable Overwrite option.")
+        elif not overwrite and booked:
+            st.error(f"❌ Board booked by {booked[0]['client']} from {booked[0]['start']} to {booked[0]['end']}. "
+                     "Enable Overwrite option.")
         else:
-            dashboard_df.at[target, "Billboard ID"] = bb_id
-            dashboard_df.at[target, "Location"] = location
-            dashboard_df.at[target, "Billboard Size"] = size
-            dashboard_df.at[target, "Client Name"] = client
-            dashboard_df.at[target, "Company Name"] = company
-            dashboard_df.at[target, "Contact Number"] = contact
-            dashboard_df.at[target, "Email"] = email
-            dashboard_df.at[target, "Contract Start Date"] = start_date
-            dashboard_df.at[target, "Contract End Date"] = end_date
-            dashboard_df.at[target, "Rental Duration"] = duration
-            dashboard_df.at[target, "Rent Amount (PKR)"] = rent
-            dashboard_df.at[target, "Advance Received (PKR)"] = adv
-            dashboard_df.at[target, "Balance / Credit (PKR)"] = balance
-            dashboard_df.at[target, "Payment Status"] = pay_status
-            dashboard_df.at[target, "Contract Status"] = contract_status
-            dashboard_df.at[target, "Remarks / Notes"] = remarks
-            dashboard_df.at[target, "Image / Link"] = img_link
-            dashboard_df.at[target, "Partner’s share"] = partner_share
-            dashboard_df.at[target, "Days Remaining"] = (
-                pd.Timestamp(end_date) - pd.Timestamp(datetime.today().date())
-            ).days
+            targets = [int(chosen)]
 
-        if target is None:
+        if not targets:
             st.error("⚠ Empty slot not found.")
         else:
-            dashboard_df.at[target, "Billboard ID"] = bb_id
-            dashboard_df.at[target, "Location"] = location
-            dashboard_df.at[target, "Billboard Size"] = size
-            dashboard_df.at[target, "Client Name"] = client
-            dashboard_df.at[target, "Company Name"] = company
-            dashboard_df.at[target, "Contact Number"] = contact
-            dashboard_df.at[target, "Email"] = email
-            dashboard_df.at[target, "Contract Start Date"] = start_date
-            dashboard_df.at[target, "Contract End Date"] = end_date
-            dashboard_df.at[target, "Rental Duration"] = duration
-            dashboard_df.at[target, "Rent Amount (PKR)"] = rent
-            dashboard_df.at[target, "Advance Received (PKR)"] = adv
-            dashboard_df.at[target, "Balance / Credit (PKR)"] = balance
-            dashboard_df.at[target, "Payment Status"] = pay_status
-            dashboard_df.at[target, "Contract Status"] = contract_status
-            dashboard_df.at[target, "Remarks / Notes"] = remarks
-            dashboard_df.at[target, "Image / Link"] = img_link
-            dashboard_df.at[target, "Partner’s share"] = partner_share
-            dashboard_df.at[target, "Days Remaining"] = (
+            row = board_rows(targets)
+            row["Billboard ID"] = bb_id
+            row["Location"] = location
+            row["Billboard Size"] = size
+            row["Client Name"] = client
+            row["Company Name"] = company
+            row["Contact Number"] = contact
+            row["Email"] = email
+            row["Contract Start Date"] = pd.Timestamp(start_date)
+            row["Contract End Date"] = pd.Timestamp(end_date)
+            row["Rental Duration"] = duration
+            row["Rent Amount (PKR)"] = rent
+            row["Advance Received (PKR)"] = adv
+            row["Balance / Credit (PKR)"] = balance
+            row["Payment Status"] = pay_status
+            row["Contract Status"] = contract_status
+            row["Remarks / Notes"] = remarks
+            row["Image / Link"] = img_link
+            row["Partner’s share"] = partner_share
+            row["Days Remaining"] = (
                 pd.Timestamp(end_date) - pd.Timestamp(datetime.today().date())
             ).days
-
-            st.session_state.dashboard_df = dashboard_df.copy()
+            stage_rows(row)
 
             if auto_save and use_sql:
-                save_to_db(dashboard_df, summary_df, saved_df)
+                persist(label="Quick add")
 
-            st.success("✅ Billboard entry added successfully!")
+            st.success(f"✅ Billboard entry added to Billboard {', '.join(map(str, targets))}!")
             st.rerun()
+
+    # -------------------- PHOTOS --------------------
+    with st.expander("🖼 Billboard photos"):
+        ph1, ph2 = st.columns([1, 2])
+        with ph1:
+            photo_board = st.number_input(
+                "Billboard", min_value=1, max_value=max(len(slots), 1), value=1, step=1, key='photo_board',
+            )
+            upload = st.file_uploader("Replace photo", type=UPLOAD_TYPES, key='photo_upload')
+            attach = st.button("Attach photo", disabled=upload is None)
+        photo_row = board_rows([int(photo_board)])
+        link = photo_row["Image / Link"].iloc[0] if len(photo_row) else None
+        photo_key = ref_key(link)
+        with ph2:
+            thumb = photo_key and thumbnail(photo_key, 'medium')
+            if thumb:
+                st.image(thumb, caption=f"Billboard {int(photo_board)}")
+                original = read_original(photo_key)
+                if original is not None:
+                    mime = image_mime(original)
+                    st.download_button(
+                        "⬇ Original photo", data=original, mime=mime,
+                        file_name=f"Billboard_{int(photo_board)}.{mime.split('/')[1]}",
+                    )
+            elif photo_key:
+                st.warning("⚠ The stored photo for this board is missing.")
+            elif not is_blank(link):
+                st.caption(f"Link: {link}")
+            else:
+                st.caption("No photo yet.")
+
+        if attach:
+            if not len(photo_row) or row_is_blank(photo_row.iloc[0]):
+                st.error("❌ No contract on this board; add one first.")
+            else:
+                try:
+                    photo_row["Image / Link"] = store_image(upload.getvalue())
+                except ValueError as e:
+                    st.error(f"❌ Photo not added: {e}")
+                else:
+                    stage_rows(photo_row)
+                    if auto_save and use_sql:
+                        persist(label="Photo")
+                    st.success(f"✅ Photo attached to Billboard {int(photo_board)}")
+                    st.rerun()
+
+    # -------------------- HISTORY --------------------
+    with st.expander("🕘 Board history"):
+        history_board = st.number_input(
+            "Billboard", min_value=1, max_value=max(len(slots), 1), value=1, step=1, key='history_board',
+        )
+        events = db_query(board_history, int(history_board)) if use_sql else []
+        if not events:
+            st.caption("No recorded changes for this board.")
+        else:
+            ui_names = {col: ui for ui, col in CONTRACT_COLUMNS.items()}
+            ui_names.update(billboard_id=DASHBOARD_KEY, archived_at="Archived At")
+            for e in events:
+                e['where'] = 'Dashboard' if e['target'] == 'live' else f"Archive #{e['row_key']}"
+            st.dataframe(pd.DataFrame([{
+                'When': e['at'], 'Action': e['action'], 'Where': e['where'],
+                'Field': ui_names.get(e['column'], e['column']), 'Session': e['session'],
+                # values of any type in one column, shown as text
+                'Before': None if e['old'] is None else str(e['old']),
+                'After': None if e['new'] is None else str(e['new']),
+            } for e in events]), hide_index=True)
+            # the row as it stood after a chosen action, replayed from the journal's checkpoints
+            steps = {}
+            for e in events:
+                steps.setdefault((e['action_id'], e['target'], e['row_key']), e)
+            step = st.selectbox(
+                "Show the record as it stood after", list(steps.values()),
+                format_func=lambda e: f"{e['at']} — {e['action']} ({e['where']})",
+            )
+            state = db_query(state_at, step['target'], step['row_key'], step['event'])
+            if state is not None:
+                st.dataframe(pd.DataFrame([{ui_names.get(c, c): v for c, v in state.items()}]), hide_index=True)
 # -------------------- SUMMARY --------------------
 elif menu == 'Summary':
 
     st.header("📈 Summary — Stats & Filters")
 
-    # Merge dashboard + saved for reporting only
-    full = pd.concat(
-        [st.session_state.dashboard_df, st.session_state.saved_df],
-        ignore_index=True,
-        sort=False
-    )
-
-    # Stats
-    total_boards = MAX_BOARDS
-    occupied = full[full['Client Name'].astype(str).str.strip() != '']
-    num_booked = occupied.shape[0]
-    num_available = total_boards - num_booked
+    # Stats and filters run in SQLite; only the requested page comes back
+    metrics = db_query(summary_metrics)
 
     c1, c2, c3 = st.columns(3)
-    c1.metric('Total Boards', total_boards)
-    c2.metric('Booked / Occupied', int(num_booked))
-    c3.metric('Available', int(num_available))
+    c1.metric('Total Boards', metrics['total'])
+    c2.metric('Booked / Occupied', int(metrics['booked']))
+    c3.metric('Available', int(metrics['available']))
+
+    # finance figures come from aggregates the payment triggers keep current
+    kpis = db_query(finance_kpis)
+    f1, f2, f3, f4 = st.columns(4)
+    f1.metric('Outstanding (PKR)', fmt_money(kpis['outstanding']))
+    f2.metric('Overdue (PKR)', fmt_money(kpis['overdue']), help="Outstanding on contracts past their end date")
+    f3.metric('Received this month (PKR)', fmt_money(kpis['this_month']))
+    f4.metric('Partner share (PKR)', fmt_money(kpis['partner_share']), help="On live contracts")
+    if kpis['monthly']:
+        st.bar_chart(pd.DataFrame(kpis['monthly'], columns=['Month', 'Received (PKR)']).set_index('Month'))
+
+    # boards occupied per month over the last year and the bookings ahead,
+    # one range query per month on the board calendar index
+    today = datetime.today().date()
+    occupancy = db_query(occupancy_by_month, today - timedelta(days=365), 18)
+    st.write("#### 📅 Occupancy over time")
+    st.line_chart(pd.DataFrame(occupancy, columns=['Month', 'Boards occupied']).set_index('Month'))
+
+    # AVAILABILITY & BOOKINGS
+    with st.expander("📅 Availability & bookings"):
+        a1, a2 = st.columns(2)
+        with a1:
+            free_from = st.date_input("Free from", value=today, key="free_from")
+        with a2:
+            free_to = st.date_input("Free until", value=today + timedelta(days=30), key="free_to")
+        if free_to < free_from:
+            st.error("The period ends before it starts.")
+        else:
+            n_free = db_query(count_free, free_from, free_to)
+            shown = db_query(free_boards, free_from, free_to, limit=200)
+            st.caption(f"{n_free:,} boards free for the whole period")
+            if shown:
+                st.write(", ".join(map(str, shown)) + (" …" if n_free > len(shown) else ""))
+
+        st.write("#### Book a board for a future period")
+        with st.form("booking_form", clear_on_submit=True):
+            b1, b2, b3 = st.columns(3)
+            with b1:
+                book_no = st.number_input("Board to book", min_value=1, value=1, step=1)
+            with b2:
+                book_start = st.date_input("Start", value=free_from)
+            with b3:
+                book_end = st.date_input("End", value=free_to)
+            b4, b5, b6 = st.columns(3)
+            with b4:
+                book_client = st.text_input("Client")
+            with b5:
+                book_company = st.text_input("Company")
+            with b6:
+                book_rent = st.number_input("Rent (PKR)", value=0.0, step=1000.0)
+            if st.form_submit_button("📅 Book"):
+                if use_sql:
+                    try:
+                        db_write(
+                            book_board, book_no, book_start, book_end, book_client,
+                            company=book_company, rent=book_rent or None,
+                        )
+                    except ValueError as e:
+                        st.error(str(e))
+                    else:
+                        st.success(f"✔ Board {book_no} booked {book_start} → {book_end}")
+                else:
+                    st.error("Enable SQLite persistence first!")
+
+        bookings = db_query(upcoming_bookings)
+        if bookings:
+            st.write("#### Upcoming bookings")
+            st.dataframe(pd.DataFrame(bookings), hide_index=True)
+            for clash in db_query(booking_conflicts):
+                b = clash['booking']
+                st.warning(
+                    f"⚠ Booking #{b['id']} (board {b['billboard_id']}, {b['start_date']} → {b['end_date']}) overlaps "
+                    + "; ".join(f"{c['kind']} {c['client'] or ''} {c['start']} → {c['end'] or 'open'}"
+                                for c in clash['conflicts'])
+                )
+            k1, k2, k3 = st.columns([2, 1, 1])
+            with k1:
+                cancel_id = st.selectbox(
+                    "Booking", [b['id'] for b in bookings],
+                    format_func=lambda i: next(
+                        f"#{b['id']} — board {b['billboard_id']} — {b['client_name']} — {b['start_date']}"
+                        for b in bookings if b['id'] == i
+                    ),
+                )
+            with k2:
+                if st.button("Cancel booking") and use_sql:
+                    db_write(cancel_booking, cancel_id)
+                    st.rerun()
+            with k3:
+                if st.button("Start due bookings") and use_sql:
+                    # bookings that have started become live contracts on boards now free
+                    persist(wait=True)
+                    started, waiting = db_write(activate_due_bookings)
+                    reload_store()
+                    st.session_state.booking_report = (len(started), len(waiting))
+                    st.rerun()
+        report = st.session_state.pop('booking_report', None)
+        if report:
+            st.success(f"✔ {report[0]} booking(s) started"
+                       + (f"; {report[1]} still waiting for their board to be vacated" if report[1] else ""))
+
+    if len(st.session_state.pending) or not auto_save:
+        st.caption("Figures reflect saved data; unsaved edits appear after Save.")
+
+    # PAYMENTS LEDGER
+    with st.expander("💵 Payments"):
+        pay_board = st.number_input("Board number", min_value=1, value=1, step=1, key="pay_board")
+        contract = db_query(live_contract, pay_board)
+        if contract is None:
+            st.caption("No saved live contract on this board.")
+        else:
+            contract_id, client, balance = contract
+            st.caption(f"{client or '—'} · balance {fmt_money(balance) or '0'} PKR")
+            with st.form("payment_form", clear_on_submit=True):
+                p1, p2, p3 = st.columns(3)
+                with p1:
+                    pay_amount = st.number_input("Amount (PKR)", value=0.0, step=1000.0, help="Negative for a refund")
+                with p2:
+                    paid_on = st.date_input("Paid on", value=datetime.today().date())
+                with p3:
+                    pay_method = st.selectbox("Method", PAYMENT_METHODS)
+                pay_note = st.text_input("Note")
+                if st.form_submit_button("Record payment"):
+                    if use_sql:
+                        # unsaved edits go first so the reload below keeps them
+                        persist(wait=True)
+                        try:
+                            db_write(record_payment, contract_id, pay_amount, paid_on, pay_method, pay_note)
+                        except ValueError as e:
+                            st.error(str(e))
+                        else:
+                            reload_store()
+                            st.rerun()
+                    else:
+                        st.error("Enable SQLite persistence first!")
+            history = db_query(payments_for, contract_id)
+            if history:
+                st.dataframe(pd.DataFrame(history), hide_index=True)
+                pd1, pd2 = st.columns([2, 1])
+                with pd1:
+                    drop_id = st.selectbox(
+                        "Payment", [p['id'] for p in history],
+                        format_func=lambda i: next(
+                            f"#{p['id']} — {p['paid_on']} — {fmt_money(p['amount'])}" for p in history if p['id'] == i
+                        ),
+                    )
+                with pd2:
+                    if st.button("Delete payment") and use_sql:
+                        persist(wait=True)
+                        db_write(delete_payment, drop_id)
+                        reload_store()
+                        st.rerun()
 
     st.markdown("---")
     st.subheader("🔍 Filters")
@@ -384,7 +909,7 @@ elif menu == 'Summary':
     c1, c2, c3 = st.columns(3)
 
     with c1:
-        client_search = st.text_input('Client contains')
+        client_search = st.text_input('Client / company / location')
 
     with c2:
         start_filter = st.date_input('Start on/after', value=None)
@@ -393,24 +918,15 @@ elif menu == 'Summary':
         end_filter = st.date_input('End on/before', value=None)
 
     # APPLY FILTERS
-    filtered = full.copy()
-
-    if client_search:
-        filtered = filtered[
-            filtered['Client Name'].astype(str).str.contains(client_search, case=False, na=False)
-        ]
-
-    if start_filter:
-        filtered = filtered[
-            pd.to_datetime(filtered['Contract Start Date'], errors='coerce') >= pd.Timestamp(start_filter)
-        ]
-
-    if end_filter:
-        filtered = filtered[
-            pd.to_datetime(filtered['Contract End Date'], errors='coerce') <= pd.Timestamp(end_filter)
-        ]
+    summary_size = 100
+    summary_page_no = st.number_input("Results page", min_value=1, value=1, step=1)
+    filtered, n_matches = db_query(
+        summary_page, client_search, start_filter, end_filter, summary_page_no, summary_size
+    )
+    n_pages = max(1, -(-n_matches // summary_size))
 
     st.write("### 📄 Filtered Results")
+    st.caption(f"Page {int(summary_page_no)} of {n_pages} — {n_matches:,} contracts match")
     st.dataframe(filtered)
 
     # SAVE filtered results for Print Tab
@@ -422,71 +938,87 @@ elif menu == 'Saved Data':
 
     st.header("📁 Saved Data (Archive)")
 
-    st.dataframe(st.session_state.saved_df)
+    saved = st.session_state.saved_df
+    archive_search = st.text_input("Search client / company / location / ID", key="archive_search")
+    if archive_search:
+        with perf.phase('archive_search', rows=len(saved)):
+            hit = pd.Series(False, index=saved.index)
+            for c in ['Client Name', 'Company Name', 'Location', 'Billboard ID']:
+                hit |= contains(saved[c], archive_search)
+            saved = saved[hit]
+
+    n_pages = max(1, -(-len(saved) // page_size))
+    archive_page_no = st.number_input("Archive page", min_value=1, value=1, step=1)
+    start = (int(archive_page_no) - 1) * page_size
+    archive_page = saved.iloc[start:start + page_size].copy()
+    archive_page.insert(0, 'Restore', False)
+    st.caption(f"Page {int(archive_page_no)} of {n_pages} — {len(saved):,} archived rows")
+
+    picked = st.data_editor(
+        archive_page,
+        disabled=[c for c in archive_page.columns if c != 'Restore'],
+        column_config={'Restore': st.column_config.CheckboxColumn('Restore', default=False)},
+        use_container_width=True,
+        key=f"archive_editor_{archive_search}_{int(archive_page_no)}_{page_size}",
+    )
+    selected = picked.index[picked['Restore'].fillna(False).astype(bool)].tolist()
 
     c1, c2 = st.columns([1,1])
 
-    # Export CSV
+    # Restore selected rows
     with c1:
-        if st.button("📤 Export CSV"):
-            out = "SavedData_export.csv"
-            st.session_state.saved_df.to_csv(out, index=False)
-            st.success(f"✔ Exported to {out}")
+        if st.button(f"↩ Restore selected → Dashboard ({len(selected)})", disabled=not selected):
+            restored, conflicts = restore_archived(selected)
+            if restored and auto_save and use_sql:
+                persist(label="Restore")
+            st.session_state.restore_report = (restored, conflicts)
+            st.rerun()
 
     # Clear Archive
     with c2:
         if st.button("🧹 Clear Archive"):
-            st.session_state.saved_df = pd.DataFrame(columns=st.session_state.saved_df.columns)
-            if auto_save and use_sql:
-                save_to_db(st.session_state.dashboard_df, st.session_state.summary_df, st.session_state.saved_df)
-            st.success("✔ Archive cleared")
-            st.rerun()
-
-    st.markdown("---")
-    st.subheader("↩ Undo rows back to Dashboard")
-
-    for i in range(len(st.session_state.saved_df)):
-        row = st.session_state.saved_df.iloc[i]
-        cols = st.columns([4,1])
-
-        with cols[0]:
-            st.write(row.to_frame().T)
-
-        with cols[1]:
-            key = f"undo_{i}"
-            if st.button("Undo → Dashboard", key=key):
-                try:
-                    col_bb = next((c for c in st.session_state.saved_df.columns if "billboard" in c.lower() or "number" in c.lower()), None)
-                    if col_bb is None:
-                        st.error("Billboard Number column not found!")
-                        continue
-
-                    bb_num = row[col_bb]
-                    dash_idx = st.session_state.dashboard_df.index[
-                        st.session_state.dashboard_df['Billboard Number'] == bb_num
-                    ].tolist()
-
-                    if not dash_idx:
-                        st.error(f"Billboard {bb_num} not found in Dashboard")
-                        continue
-
-                    j = dash_idx[0]
-
-                    for col in st.session_state.saved_df.columns:
-                        if col != col_bb and col in st.session_state.dashboard_df.columns:
-                            st.session_state.dashboard_df.at[j, col] = row[col]
-
-                    # Remove from saved data
-                    st.session_state.saved_df = st.session_state.saved_df.drop(index=i).reset_index(drop=True)
-
-                    if auto_save and use_sql:
-                        save_to_db(st.session_state.dashboard_df, st.session_state.summary_df, st.session_state.saved_df)
-
-                    st.success(f"✔ Restored to Billboard {bb_num}")
-                    st.rerun()
+            if not (auto_save and use_sql) or safety_backup("clear archive"):
+                st.session_state.saved_df = st.session_state.saved_df.iloc[0:0]
+                if auto_save and use_sql:
+                    persist(label="Clear archive")
+                st.success("✔ Archive cleared")
+                st.rerun()
 
-                except Exception as e:
-                    st.error(f"Undo failed: {e}")
+    # Export: built from SQLite in chunks when the download is clicked; the file is held in memory to send
+    with st.expander("📤 Export archive"):
+        e1, e2, e3, e4 = st.columns(4)
+        with e1:
+            export_fmt = st.selectbox("Format", list(EXPORT_FORMATS))
+        with e2:
+            export_client = st.text_input("Client / company / location", key="export_search")
+        with e3:
+            export_start = st.date_input("Start on/after", value=None, key="export_start")
+        with e4:
+            export_end = st.date_input("End on/before", value=None, key="export_end")
+        export_status = st.multiselect("Status", list(STATUS_SQL), key="export_status")
+        export_filters = dict(
+            search=export_client, start_from=export_start, end_by=export_end,
+            statuses=export_status, alert_days=alert_days,
+        )
+        ext, mime = EXPORT_FORMATS[export_fmt]
+        st.caption("Exports the saved archive; Save first to include unsaved changes."
+                   + ("" if 'Parquet' in EXPORT_FORMATS else " Parquet export needs pyarrow (pip install pyarrow)."))
+        st.download_button(
+            f"⬇ Download {export_fmt}",
+            data=lambda: db_query(export_archive_bytes, export_fmt, **export_filters),
+            file_name=f"SavedData_export.{ext}",
+            mime=mime,
+            on_click='ignore',
+        )
+
+    report = st.session_state.pop('restore_report', None)
+    if report:
+        restored, conflicts = report
+        if restored:
+            st.success(f"✔ Restored to Billboard {', '.join(map(str, restored))}")
+        if not conflicts.empty:
+            st.warning(f"⚠ {len(conflicts)} row(s) not restored (slot conflicts):")
+            st.dataframe(conflicts, hide_index=True)
 
 
 # -------------------- ADMIN --------------------
@@ -500,8 +1032,12 @@ elif menu == 'Admin':
     with c1:
         if st.button("💾 Save to SQLite"):
             if use_sql:
-                save_to_db(st.session_state.dashboard_df, st.session_state.summary_df, st.session_state.saved_df)
-                st.success("✔ Saved to DB")
+                persist(wait=True)
+                state, detail = save_state()
+                if state == 'failed':
+                    st.error(f"Save failed: {detail}")
+                else:
+                    st.success("✔ Saved to DB")
             else:
                 st.error("Enable SQLite persistence first!")
 
@@ -509,10 +1045,7 @@ elif menu == 'Admin':
     with c2:
         if st.button("🔄 Reload from DB"):
             if use_sql and os.path.exists(DB_PATH):
-                dash, summ, saved = read_sheets_sqlite()
-                st.session_state.dashboard_df = dash
-                st.session_state.saved_df = saved
-                st.session_state.summary_df = summ
+                reload_store()
                 st.success("✔ Reloaded")
                 st.rerun()
             else:
@@ -520,27 +1053,192 @@ elif menu == 'Admin':
 
     # RESET DASHBOARD
     with c3:
-        if st.button("🧨 Reset Dashboard (Empty 1..50)"):
-            df = pd.DataFrame(columns=DEFAULT_COLS)
-            if len(df) < MAX_BOARDS:
-                extra = MAX_BOARDS - len(df)
-                add_df = pd.DataFrame([[""]*len(df.columns)]*extra, columns=df.columns)
-                df = pd.concat([df, add_df], ignore_index=True)
-
-            df['Billboard Number'] = list(range(1, MAX_BOARDS+1))
-            st.session_state.dashboard_df = df
+        if st.button("🧨 Reset Dashboard (Empty all boards)"):
+            if not use_sql:
+                st.error("Enable SQLite persistence first!")
+            elif safety_backup("reset"):
+                n = db_write(clear_live_contracts)
+                reload_store()
+                st.success(f"✔ Dashboard Reset ({n:,} boards cleared)")
+                st.rerun()
 
-            if auto_save and use_sql:
-                save_to_db(st.session_state.dashboard_df, st.session_state.summary_df, st.session_state.saved_df)
+    # FULL REWRITE (writes every row, deletes contracts missing from the frames)
+    if st.button("♻️ Rewrite DB (full replace)"):
+        if not use_sql:
+            st.error("Enable SQLite persistence first!")
+        elif safety_backup("rewrite"):
+            full = current_dashboard()
+            rewrite_db(full, st.session_state.summary_df, st.session_state.saved_df)
+            reload_store()
+            st.success("✔ DB rewritten")
+
+    # BACKUPS (online snapshots; the destructive actions here take one first)
+    st.markdown("---")
+    st.write("### 🛟 Backups")
+    if st.button("📸 Back up now"):
+        if use_sql:
+            writer_for(DB_PATH).flush()
+            bar = st.progress(0.0, text="Backing up…")
+            with perf.phase('backup'):
+                path = create_backup(progress=lambda done, total: bar.progress(done / max(total, 1)))
+            bar.empty()
+            st.success(f"✔ Snapshot saved: {os.path.basename(path)}")
+        else:
+            st.error("Enable SQLite persistence first!")
+    backups = list_backups()
+    if not backups:
+        st.caption("No snapshots yet.")
+    else:
+        st.dataframe(pd.DataFrame([
+            {'Snapshot': b['name'], 'Taken': b['taken'], 'Reason': b['reason'], 'Size (MB)': round(b['bytes'] / 1e6, 2)}
+            for b in backups
+        ]), hide_index=True)
+        rb1, rb2 = st.columns([2, 1])
+        with rb1:
+            chosen = st.selectbox(
+                "Snapshot", backups, format_func=lambda b: f"{b['taken']:%Y-%m-%d %H:%M:%S} — {b['reason']}",
+            )
+            confirm_restore = st.checkbox("Replace the current database with this snapshot (it is snapshotted first)")
+        with rb2:
+            st.download_button(
+                "⬇ Download snapshot",
+                data=lambda: open(chosen['path'], 'rb').read(),
+                file_name=chosen['name'],
+                mime="application/gzip",
+                on_click='ignore',
+            )
+            if st.button("⏪ Restore snapshot", disabled=not confirm_restore):
+                if use_sql:
+                    writer_for(DB_PATH).flush()
+                    try:
+                        restore_backup(chosen['path'])
+                    except (OSError, sqlite3.Error, ValueError) as e:
+                        st.error(f"Restore failed: {e}")
+                    else:
+                        reload_store()
+                        st.success(f"✔ Restored {chosen['name']}")
+                        st.rerun()
+                else:
+                    st.error("Enable SQLite persistence first!")
+
+    # INVENTORY SIZE
+    st.markdown("---")
+    st.write("### 🪧 Inventory Size")
+    current_boards = db_query(board_count)
+    ci1, ci2 = st.columns([2, 1])
+    with ci1:
+        new_size = st.number_input(
+            "Number of boards", min_value=1, max_value=1_000_000, value=max(current_boards, 1), step=1,
+        )
+    with ci2:
+        if st.button("Apply inventory size"):
+            # shrinking deletes boards, so it is snapshotted first
+            if use_sql and (new_size >= current_boards or safety_backup("inventory resize")):
+                stash_page_edits()
+                writer_for(DB_PATH).flush()
+                count, kept = db_write(set_inventory_size, new_size)
+                st.session_state.slots = db_query(SlotIndex.from_db)
+                sync_slots(st.session_state.pending)
+                summ = db_query(read_summary)
+                st.session_state.summary_df = summ
+                st.session_state.db_baseline['summary'] = snapshot(None, summ, None)['summary']
+                st.session_state.page_key = None
+                if kept:
+                    st.warning(f"⚠ {kept} boards above {int(new_size)} still have contracts or bookings and were kept.")
+                st.success(f"✔ Inventory now has {count:,} boards")
+            elif not use_sql:
+                st.error("Enable SQLite persistence first!")
 
-            st.success("✔ Dashboard Reset")
-            st.rerun()
+    # BULK IMPORT
+    st.markdown("---")
+    st.write("### 📥 Bulk Import (CSV / Excel)")
+    upload = st.file_uploader("Contracts file", type=['csv', 'xlsx'])
+    cb1, cb2 = st.columns(2)
+    with cb1:
+        replace_existing = st.checkbox("Replace contracts on occupied boards", value=False)
+    with cb2:
+        dry_run = st.checkbox("Validate only (dry run)", value=False)
+    if st.button("📥 Import contracts", disabled=upload is None):
+        if use_sql:
+            # unsaved session edits go to the DB first; the import then reloads everything
+            persist(wait=True)
+            if dry_run or safety_backup("import"):
+                progress = st.empty()
+                with tempfile.TemporaryFile('w+', encoding='utf-8', newline='') as report:
+                    try:
+                        result = import_contracts(
+                            upload, replace=replace_existing, dry_run=dry_run, errors=report,
+                            progress=lambda n: progress.caption(f"{n:,} rows read…"),
+                        )
+                    except (ValueError, ImportError, UnicodeDecodeError) as e:
+                        st.error(f"Import failed: {e}")
+                    else:
+                        report.seek(0)
+                        st.session_state.import_report = (result, report.read().encode('utf-8'), dry_run)
+                        if not dry_run:
+                            reload_store()
+                        st.rerun()
+        else:
+            st.error("Enable SQLite persistence first!")
+
+    report = st.session_state.pop('import_report', None)
+    if report:
+        result, errors_csv, was_dry_run = report
+        verb = "would be imported" if was_dry_run else "imported"
+        st.success(
+            f"✔ {result['imported']:,} of {result['rows']:,} rows {verb}"
+            + (f", {result['boards_created']:,} new boards" if result['boards_created'] else "")
+        )
+        if result['unknown_columns']:
+            st.info("Ignored columns: " + ", ".join(result['unknown_columns']))
+        if result['rejected']:
+            st.warning(f"⚠ {result['rejected']:,} row(s) rejected")
+            st.dataframe(pd.DataFrame(result['errors']), hide_index=True)
+            st.download_button(
+                "⬇ Download error report", data=errors_csv, file_name="import_errors.csv",
+                mime='text/csv', on_click='ignore',
+            )
+
+    # PERFORMANCE
+    st.markdown("---")
+    st.write("### ⏱ Performance")
+    pp1, pp2 = st.columns(2)
+    with pp1:
+        record_timings = st.checkbox("Record timings", value=perf_on, help="Per-phase and SQL timings for every rerun")
+    with pp2:
+        slow_threshold = st.number_input(
+            "Slow threshold (ms)", min_value=1, max_value=600_000, value=int(perf_slow_ms), step=50,
+        )
+    if use_sql and (record_timings != perf_on or slow_threshold != int(perf_slow_ms)):
+        db_write(set_setting, PERF_ENABLED, int(record_timings))
+        db_write(set_setting, PERF_SLOW_MS, int(slow_threshold))
+        perf.configure(record_timings, slow_threshold)
+    stats = perf.phase_stats()
+    if not stats:
+        st.caption("No runs recorded yet." + ("" if record_timings else " Turn on Record timings."))
+    else:
+        st.caption(f"Last {stats[0]['runs']:,} reruns (this one is not included yet)")
+        st.dataframe(pd.DataFrame(stats), hide_index=True)
+        flagged = perf.slow_runs()
+        if flagged:
+            st.warning(f"⚠ {len(flagged)} recent run(s) at or over {int(slow_threshold):,} ms")
+            st.dataframe(pd.DataFrame(flagged), hide_index=True)
+        st.write("Slowest SQL statements")
+        st.dataframe(pd.DataFrame(perf.statement_stats()), hide_index=True)
+        autosave_stats = perf.phase_stats('autosave')
+        if autosave_stats:
+            st.write("Background saves")
+            st.dataframe(pd.DataFrame(autosave_stats), hide_index=True)
+    if perf.log_path():
+        st.caption(f"Log: {perf.log_path()}")
 
     st.markdown("---")
     st.write("### 🔍 DB Info")
     st.write({
         "db_exists": os.path.exists(DB_PATH),
-        "db_path": DB_PATH
+        "db_path": DB_PATH,
+        "boards": current_boards,
+        "pending_unsaved_rows": len(st.session_state.pending),
     })
 # -------------------- PRINT (UNIVERSAL PRINT PANEL) --------------------
 elif menu == "Print":
@@ -551,7 +1249,10 @@ elif menu == "Print":
 
     # SOURCE LOAD
     if src == "Dashboard":
-        source_df = st.session_state.dashboard_df.copy()
+        source_df = st.session_state.dashboard_df
+        if source_df is None:
+            source_df = db_query(dashboard_page, 1, page_size)[0]
+        source_df = source_df.copy()
 
     elif src == "Summary":
         source_df = st.session_state.get("summary_filtered", pd.DataFrame())
@@ -572,7 +1273,10 @@ elif menu == "Print":
         st.error("❌ Record not found.")
         st.stop()
 
-    record = record_row.iloc[0].to_dict()
+    record = {k: '—' if is_blank(v) else v for k, v in record_row.iloc[0].to_dict().items()}
+    photo_key = ref_key(record.get('Image / Link'))
+    photo = photo_key and thumbnail(photo_key, 'medium')
+    photo_html = f'<tr><td class="label-cell">Photo</td><td><img src="{data_url(photo)}" class="form-photo"></td></tr>' if photo else ''
 
     # CSS
     st.markdown("""
@@ -584,6 +1288,7 @@ elif menu == "Print":
 .label-cell{font-weight:600;background:#f3f4f6;}
 .print-btn{background:#2563eb;color:white;padding:6px 16px;border-radius:6px;border:none;margin-top:10px;}
 .print-btn:hover{background:#1d4ed8;}
+.form-photo{max-width:320px;max-height:320px;border-radius:6px;}
 .print-footer{display:flex;justify-content:space-between;margin-top:10px;color:#555;}
 </style>
 """, unsafe_allow_html=True)
@@ -607,6 +1312,7 @@ elif menu == "Print":
 <tr><td class="label-cell">Payment Status</td><td>{record.get('Payment Status','—')}</td></tr>
 <tr><td class="label-cell">Contract Status</td><td>{record.get('Contract Status','—')}</td></tr>
 <tr><td class="label-cell">Remarks</td><td>{record.get('Remarks / Notes','—')}</td></tr>
+{photo_html}
 </table>
 
 <div class="print-footer">
@@ -620,15 +1326,48 @@ elif menu == "Print":
     st.markdown(html_content, unsafe_allow_html=True)
 
     # PDF EXPORT
-    pdf_bytes = pdfkit.from_string(
-        html_content,
-        False,
-        configuration=pdf_config
-    )
-
     st.download_button(
         label="⬇ Download PDF",
-        data=pdf_bytes,
+        data=contract_pdf(record),
         file_name=f"Billboard_{selected_bb}_Contract.pdf",
         mime="application/pdf"
     )
+
+    # BATCH PDF
+    st.markdown("---")
+    st.subheader("🗂 Batch print")
+
+    b1, b2 = st.columns(2)
+    with b1:
+        batch_src = st.radio("Boards", ["All Expiring Soon boards", "All rows in the selected source"])
+    with b2:
+        batch_fmt = st.radio("Output", ["One multi-page PDF", "ZIP of PDFs"])
+
+    if batch_src == "All Expiring Soon boards":
+        batch_df = db_query(live_contracts, ['Expiring Soon'], alert_days=alert_days)
+    else:
+        batch_df = source_df[~source_df.apply(row_is_blank, axis=1)]
+    st.caption(f"{len(batch_df):,} forms")
+
+    batch_records = batch_df.to_dict('records')
+    if batch_fmt == "ZIP of PDFs":
+        st.download_button(
+            "⬇ Download ZIP",
+            data=lambda: batch_zip(batch_records),
+            file_name="Billboard_Contracts.zip",
+            mime="application/zip",
+            on_click='ignore',
+            disabled=not batch_records,
+        )
+    else:
+        st.download_button(
+            "⬇ Download PDF",
+            data=lambda: batch_pdf(batch_records),
+            file_name="Billboard_Contracts.pdf",
+            mime="application/pdf",
+            on_click='ignore',
+            disabled=not batch_records,
+            key="batch_pdf",
+        )
+
+perf.end(st.session_state.pop('perf_run', None))
@@ -0,0 +1,54 @@
+"""Online backup of the billboard database, for cron or any scheduler.
+
+    python backup_db.py                        # snapshot into backups/, keeping the newest 20
+    python backup_db.py --reason nightly --keep 60 --out /srv/billboards/backups
+    python backup_db.py --list
+    python backup_db.py --restore backups/billboards-20261017-020000-nightly.db.gz
+
+    # crontab: every night at 02:00
+    0 2 * * * cd /path/to/app && python backup_db.py --reason nightly
+
+Safe while the app is running: the copy is taken with SQLite's backup
+API from a consistent read snapshot, and a restore replaces the live
+database in one transaction after snapshotting it. Only sqlite3 is
+needed; pandas is not loaded.
+"""
+import argparse
+import sys
+
+from billboard_core.backup import BACKUP_DIR, KEEP_BACKUPS, create_backup, list_backups, restore_backup
+from billboard_core.db import close_all
+from billboard_core.schema import DB_PATH
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reason', default='manual', help="label stored in the snapshot's name")
+    parser.add_argument('--keep', type=int, default=KEEP_BACKUPS, help="newest snapshots to keep")
+    parser.add_argument('--list', action='store_true', help="list snapshots and exit")
+    parser.add_argument('--restore', metavar='SNAPSHOT', help="replace the database with this snapshot")
+    parser.add_argument('--out', default=BACKUP_DIR, help="backup directory")
+    parser.add_argument('--db', default=DB_PATH)
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for b in list_backups(args.out, args.db):
+            print(f"{b['taken']:%Y-%m-%d %H:%M:%S}  {b['bytes'] / 1e6:8.2f} MB  {b['reason']:<24} {b['path']}")
+        return 0
+    try:
+        if args.restore:
+            restore_backup(args.restore, args.db, args.out)
+            print(f"✅ Restored {args.db} from {args.restore} (previous state snapshotted in {args.out})")
+        else:
+            path = create_backup(args.db, args.out, args.reason, max(args.keep, 1))
+            print(f"✅ Backed up {args.db} → {path}")
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        close_all()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
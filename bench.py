@@ -0,0 +1,323 @@
+"""Headless benchmarks over synthetic inventories.
+
+    python bench.py                       # default sizes, results in bench_results.json
+    python bench.py --sizes 50:200 10000:100000 --out before.json
+    python bench.py --full                # adds 100k boards / 1M archived contracts
+
+Each size is BOARDS:ARCHIVED. Every scenario gets its own temporary
+billboards.db, filled by generate_db, and times the app's core paths
+without a browser. Compare two result files to spot regressions, or use
+them to pick inventory limits.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from billboard_core.availability import count_free, occupancy_by_month
+from billboard_core.datacache import cache_for
+from billboard_core.db import close_all, open_connection, reading
+from billboard_core.finance import finance_kpis
+from billboard_core.frames import widen_categories
+from billboard_core.inventory import dashboard_page, dashboard_rows, first_free_board
+from billboard_core.pdf_forms import batch_pdf, contract_pdf, form_values, render_form
+from billboard_core.persistence import (
+    DASHBOARD_KEY, read_sheets_sqlite, read_store, row_hashes, save_to_db,
+)
+from billboard_core.reports import live_contracts, summary_metrics, summary_page
+from billboard_core.schema import CONTRACT_COLUMNS, DB_PATH, ensure_schema
+from billboard_core.slots import SlotIndex
+from billboard_core.status import compute_status, compute_statuses
+
+
+DEFAULT_SIZES = [(50, 200), (1_000, 10_000), (10_000, 100_000)]
+FULL_SIZES = DEFAULT_SIZES + [(100_000, 1_000_000)]
+OCCUPANCY = 0.7          # share of boards with a live contract
+EDITED_ROWS = 10         # rows changed per save / restored per restore
+SCALAR_STATUS_ROWS = 5_000
+PDF_BATCH = 50
+
+
+# -------------------- SYNTHETIC DATA --------------------
+FIRST_NAMES = ['Ali', 'Ahmed', 'Bilal', 'Fatima', 'Hassan', 'Ayesha', 'Usman', 'Zainab', 'Imran', 'Sana',
+               'Kamran', 'Hina', 'Faisal', 'Mariam', 'Tariq', 'Nadia', 'Saad', 'Amna', 'Omer', 'Rabia']
+LAST_NAMES = ['Khan', 'Malik', 'Qureshi', 'Butt', 'Sheikh', 'Chaudhry', 'Raza', 'Iqbal', 'Hussain', 'Siddiqui']
+COMPANIES = ['Jazz', 'Telenor', 'Nestle', 'Unilever', 'Shan Foods', 'Gul Ahmed', 'Khaadi', 'HBL', 'Meezan Bank',
+             'Daraz', 'Foodpanda', 'Engro', 'PSO', 'Coca-Cola', 'Pepsi', 'National Foods', 'Sapphire', 'Haier']
+AREAS = ['Mall Road', 'Gulberg', 'DHA Phase 5', 'Johar Town', 'Model Town', 'Canal Road', 'Ferozepur Road',
+         'MM Alam Road', 'Jail Road', 'Bahria Town', 'Clifton', 'Shahrah-e-Faisal', 'Blue Area', 'Saddar']
+CITIES = ['Lahore', 'Karachi', 'Islamabad', 'Rawalpindi', 'Faisalabad', 'Multan']
+SIZES = ['10x20', '20x40', '30x60', '40x80', '12x24', 'Digital 8x16']
+PAYMENT = ['Paid', 'Partially Paid', 'Pending', 'Overdue']
+CONTRACT = ['Active', 'Active', 'Active', 'Renewal Due', 'On Hold']
+
+
+def _contract(rng, board, today, archived):
+    client = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    months = rng.choice([1, 3, 6, 12])
+    if archived:
+        start = today - timedelta(days=rng.randint(60, 5 * 365))
+    else:
+        # live contracts span expired, expiring soon and booked
+        start = today - timedelta(days=rng.randint(0, 30 * months + 20))
+    end = start + timedelta(days=30 * months)
+    rent = rng.randrange(50_000, 2_000_000, 5_000)
+    advance = rng.choice([0, rent // 4, rent // 2, rent])
+    values = {
+        'billboard_code': f"BB-{board:06d}",
+        'location': f"{rng.choice(AREAS)}, {rng.choice(CITIES)}",
+        'billboard_size': rng.choice(SIZES),
+        'client_name': client,
+        'company_name': rng.choice(COMPANIES),
+        'contact_number': f"03{rng.randint(0, 49):02d}-{rng.randint(0, 9_999_999):07d}",
+        'email': f"{client.lower().replace(' ', '.')}@example.com",
+        'start_date': start.isoformat(),
+        'end_date': end.isoformat(),
+        'rental_duration': f"{months} months",
+        'rent_amount': float(rent),
+        'advance_received': float(advance),
+        'balance': float(rent - advance),
+        'payment_status': rng.choice(PAYMENT),
+        'contract_status': 'Completed' if archived else rng.choice(CONTRACT),
+        'days_remaining': (end - today).days,
+        'remarks': rng.choice(['', '', 'Renewal discussed', 'Flex changed', 'Night lighting']),
+        'image_link': '',
+        'partner_share': rng.choice(['', '', '10%', '20%']),
+    }
+    archived_at = None
+    if archived:
+        archived_at = datetime.combine(end, datetime.min.time()) + timedelta(hours=rng.randint(9, 18))
+        archived_at = archived_at.strftime('%Y-%m-%d %H:%M:%S')
+    return [board] + [values[c] for c in CONTRACT_COLUMNS.values()] + [archived_at]
+
+
+def generate_db(db_path, n_boards, n_archived, occupancy=OCCUPANCY, seed=0, today=None):
+    """Create `db_path` with n_boards boards, ~occupancy of them booked, and n_archived old contracts."""
+    rng = random.Random(seed)
+    today = today or date.today()
+    cols = ['billboard_id'] + list(CONTRACT_COLUMNS.values()) + ['archived_at']
+    insert = f"INSERT INTO contracts ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})"
+    conn = open_connection(db_path)
+    try:
+        conn.execute("PRAGMA journal_mode = WAL")
+        ensure_schema(conn, n_boards)
+        conn.execute("BEGIN IMMEDIATE")
+        booked = (b for b in range(1, n_boards + 1) if rng.random() < occupancy)
+        conn.executemany(insert, (_contract(rng, b, today, False) for b in booked))
+        conn.executemany(
+            insert, (_contract(rng, rng.randint(1, n_boards), today, True) for _ in range(n_archived))
+        )
+        conn.execute("DELETE FROM summary")
+        conn.execute('INSERT INTO summary ("Total Boards") VALUES (?)', (n_boards,))
+        conn.execute("COMMIT")
+        conn.execute("PRAGMA optimize")
+    finally:
+        conn.close()
+
+
+# -------------------- TIMING --------------------
+def timed(fn, repeat=3, setup=None):
+    """{'min', 'median', 'runs'} seconds over `repeat` calls; setup() runs untimed before each."""
+    runs = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t0)
+    return {'min': min(runs), 'median': statistics.median(runs), 'runs': len(runs)}
+
+
+def _edited_page(rng, tag):
+    with reading() as conn:
+        page, _ = dashboard_page(conn, 1, 50)
+    baseline_page = row_hashes(page, DASHBOARD_KEY)
+    for i in rng.sample(range(len(page)), min(EDITED_ROWS, len(page))):
+        page.at[i, 'Client Name'] = f"Bench {tag} {i}"
+    return page, baseline_page
+
+
+def bench_scenario(n_boards, n_archived, repeat=3, seed=0):
+    rng = random.Random(seed)
+    results = {}
+    cache = cache_for(DB_PATH)
+
+    # DB load: cold reads the file, warm is served from the shared cache
+    results['read_sheets_sqlite_cold'] = timed(read_sheets_sqlite, repeat, setup=cache.clear)
+    results['read_sheets_sqlite_warm'] = timed(read_sheets_sqlite, repeat)
+    results['read_store_cold'] = timed(read_store, repeat, setup=cache.clear)
+    dashboard, _, _ = read_sheets_sqlite()
+
+    # status
+    end_dates = dashboard['Contract End Date']
+    results['compute_statuses'] = timed(lambda: compute_statuses(end_dates, 7), repeat)
+    sample = end_dates.head(SCALAR_STATUS_ROWS)
+    results['compute_status_per_row'] = timed(lambda: [compute_status(v, 7) for v in sample], repeat)
+    results['compute_status_per_row']['rows'] = len(sample)
+
+    # free-slot search
+    with reading() as conn:
+        results['slot_index_from_db'] = timed(lambda: SlotIndex.from_db(conn), repeat)
+        slots = SlotIndex.from_db(conn)
+        results['first_free_board_sql'] = timed(lambda: first_free_board(conn), repeat)
+    results['slot_first_free'] = timed(slots.first_free, repeat)
+    results['slot_allocate_100'] = timed(lambda: slots.copy().allocate_many(100), repeat)
+
+    # Summary filtering
+    with reading() as conn:
+        results['summary_metrics'] = timed(lambda: summary_metrics(conn), repeat)
+        results['finance_kpis'] = timed(lambda: finance_kpis(conn), repeat)
+        results['summary_search'] = timed(lambda: summary_page(conn, search='ali kh'), repeat)
+        start = (date.today() - timedelta(days=365)).isoformat()
+        results['summary_date_range'] = timed(
+            lambda: summary_page(conn, start_from=start, end_by=date.today().isoformat()), repeat
+        )
+        results['live_expiring_soon'] = timed(lambda: live_contracts(conn, ['Expiring Soon']), repeat)
+        ahead = date.today() + timedelta(days=90)
+        results['free_boards_90d'] = timed(lambda: count_free(conn, date.today(), ahead), repeat)
+        results['occupancy_18_months'] = timed(lambda: occupancy_by_month(conn, start, 18), repeat)
+
+    # persistence: EDITED_ROWS edits on one dashboard page, against the whole archive
+    def save():
+        saved, summary, baseline = read_store()
+        page, baseline['dashboard'] = _edited_page(rng, time.perf_counter_ns())
+        t0 = time.perf_counter()
+        save_to_db(page, summary, saved, baseline)
+        return time.perf_counter() - t0
+    runs = [save() for _ in range(repeat)]
+    results['save_to_db'] = {'min': min(runs), 'median': statistics.median(runs), 'runs': len(runs)}
+
+    # archive restore: move EDITED_ROWS archived contracts back onto free boards
+    def restore():
+        saved, summary, baseline = read_store()
+        with reading() as conn:
+            slots = SlotIndex.from_db(conn)
+        free = [n for n in saved[DASHBOARD_KEY].dropna().astype(int).unique() if slots.is_free(int(n))]
+        picks = saved[saved[DASHBOARD_KEY].isin(free[:EDITED_ROWS])].drop_duplicates(DASHBOARD_KEY)
+        if picks.empty:
+            return None
+        boards = picks[DASHBOARD_KEY].astype(int).tolist()
+        t0 = time.perf_counter()
+        with reading() as conn:
+            targets = dashboard_rows(conn, boards)
+        baseline['dashboard'] = row_hashes(targets, DASHBOARD_KEY)
+        src = picks.set_index(picks[DASHBOARD_KEY].astype(int))
+        widen_categories(targets, src)
+        for col in [c for c in targets.columns if c != DASHBOARD_KEY and c in src.columns]:
+            targets[col] = targets[DASHBOARD_KEY].map(src[col]).astype(targets[col].dtype)
+        save_to_db(targets, summary, saved.drop(index=picks.index), baseline)
+        return time.perf_counter() - t0
+    runs = [r for r in (restore() for _ in range(repeat)) if r is not None]
+    if runs:
+        results['archive_restore'] = {'min': min(runs), 'median': statistics.median(runs), 'runs': len(runs)}
+
+    # PDF rendering, into a throwaway cache
+    pdf_dir = tempfile.mkdtemp(prefix='bench-pdf-')
+    try:
+        with reading() as conn:
+            records = live_contracts(conn).head(PDF_BATCH).to_dict('records')
+        if records:
+            values = form_values(records[0])
+            results['pdf_render_form'] = timed(lambda: render_form(values), repeat)
+            contract_pdf(records[0], pdf_dir)
+            results['pdf_cached_form'] = timed(lambda: contract_pdf(records[0], pdf_dir), repeat)
+            results['pdf_batch'] = timed(
+                lambda: batch_pdf(records, pdf_dir), repeat,
+                setup=lambda: shutil.rmtree(pdf_dir, ignore_errors=True),
+            )
+            results['pdf_batch']['forms'] = len(records)
+    finally:
+        shutil.rmtree(pdf_dir, ignore_errors=True)
+    return results
+
+
+# -------------------- RUN --------------------
+def _git_commit():
+    try:
+        out = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True,
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _metadata():
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def run(sizes, repeat=3, seed=0, keep=False):
+    report = {'meta': _metadata(), 'scenarios': []}
+    home = os.getcwd()
+    for n_boards, n_archived in sizes:
+        workdir = tempfile.mkdtemp(prefix=f'bench-{n_boards}-')
+        os.chdir(workdir)  # DB_PATH is relative, so the app code uses this copy
+        try:
+            t0 = time.perf_counter()
+            generate_db(DB_PATH, n_boards, n_archived, seed=seed)
+            scenario = {
+                'boards': n_boards,
+                'archived': n_archived,
+                'generate_seconds': time.perf_counter() - t0,
+                'db_bytes': os.path.getsize(DB_PATH),
+                'results': bench_scenario(n_boards, n_archived, repeat, seed),
+            }
+            report['scenarios'].append(scenario)
+            print(f"{n_boards:>8} boards {n_archived:>9} archived: "
+                  + ", ".join(f"{k} {v['median']:.3f}s" for k, v in scenario['results'].items()),
+                  file=sys.stderr)
+        finally:
+            close_all()
+            cache_for(DB_PATH).clear()
+            os.chdir(home)
+            if keep:
+                print("kept", workdir, file=sys.stderr)
+            else:
+                shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+def _size(text):
+    boards, _, archived = text.partition(':')
+    return int(boards), int(archived or 0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', type=_size, help="BOARDS:ARCHIVED pairs")
+    parser.add_argument('--full', action='store_true', help="include 100k boards / 1M archived")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='bench_results.json')
+    parser.add_argument('--keep', action='store_true', help="keep the generated databases")
+    args = parser.parse_args(argv)
+
+    sizes = args.sizes or (FULL_SIZES if args.full else DEFAULT_SIZES)
+    report = run(sizes, args.repeat, args.seed, args.keep)
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print("results written to", args.out, file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Billboard inventory core: schema, persistence, status and reporting, without any UI.
+
+Importing the package is cheap. Submodules, and the heavy libraries they
+use (pandas, reportlab), load on first use, so e.g.
+
+    from billboard_core import migrate        # sqlite3 only
+    from billboard_core import read_store     # loads pandas now
+
+Scripts that only touch the database (init_db.py, migrate_db.py) never
+import pandas. The Streamlit UI in app.py is a thin layer over these
+modules.
+"""
+import importlib
+
+
+# public name -> submodule that defines it
+_EXPORTS = {
+    # schema / connections (sqlite3 only)
+    'DB_PATH': 'schema', 'MAX_BOARDS': 'schema', 'SCHEMA_VERSION': 'schema',
+    'CONTRACT_COLUMNS': 'schema', 'DEFAULT_COLS': 'schema', 'ensure_schema': 'schema', 'migrate': 'schema',
+    'open_connection': 'db', 'reading': 'db', 'writing': 'db', 'transaction': 'db', 'close_all': 'db',
+    'SlotIndex': 'slots',
+    # data model and persistence (pandas)
+    'is_blank': 'frames', 'sql_value': 'frames', 'to_board_number': 'frames', 'fmt_money': 'frames',
+    'connect': 'persistence', 'read_sheets_sqlite': 'persistence', 'read_store': 'persistence',
+    'save_to_db': 'persistence', 'rewrite_db': 'persistence', 'snapshot': 'persistence',
+    'writer_for': 'autosave',
+    'compute_status': 'status', 'compute_statuses': 'status',
+    # reporting and output
+    'summary_metrics': 'reports', 'summary_page': 'reports', 'live_contracts': 'reports',
+    'export_archive': 'export', 'contract_pdf': 'pdf_forms',
+    'store_image': 'images', 'thumbnails': 'images',
+    'create_backup': 'backup', 'restore_backup': 'backup', 'list_backups': 'backup',
+    'board_history': 'journal', 'state_at': 'journal',
+    'import_contracts': 'importer',
+    'build_digest': 'alerts', 'expiring_within': 'alerts', 'expired_since': 'alerts',
+    'record_payment': 'finance', 'finance_kpis': 'finance',
+    'free_boards': 'availability', 'book_board': 'availability', 'BookingConflict': 'availability',
+    'ApiServer': 'api',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,147 @@
+import json
+import os
+from datetime import date, timedelta
+
+from .settings import alert_days as saved_alert_days
+
+
+ALERTS_DIR = "alerts"
+LAST_RUN_FILE = "last_run.json"
+
+# Range scans over ix_contracts_live_end (live contracts ordered by end_date),
+# so each answer costs a seek plus the rows returned, not a table scan
+_LIVE_BY_END = """
+SELECT c.billboard_id, c.client_name, c.company_name, c.location, c.contact_number,
+       c.end_date, c.balance
+FROM contracts c
+WHERE c.archived_at IS NULL AND c.end_date >= :lo AND c.end_date < :hi
+ORDER BY c.end_date, c.billboard_id
+"""
+_COUNT_BY_END = """
+SELECT COUNT(*) FROM contracts c
+WHERE c.archived_at IS NULL AND c.end_date >= :lo AND c.end_date < :hi
+"""
+_FIELDS = ['board', 'client', 'company', 'location', 'contact', 'end_date', 'balance']
+
+
+def _day(d):
+    return d if isinstance(d, str) else d.isoformat()
+
+
+def _today(today):
+    if today is None:
+        return date.today()
+    return date.fromisoformat(today) if isinstance(today, str) else today
+
+
+def _rows(conn, lo, hi, today):
+    out = []
+    for r in conn.execute(_LIVE_BY_END, {'lo': _day(lo), 'hi': _day(hi)}):
+        row = dict(zip(_FIELDS, r))
+        try:
+            row['days_left'] = (date.fromisoformat(row['end_date']) - today).days
+        except (TypeError, ValueError):
+            row['days_left'] = None
+        out.append(row)
+    return out
+
+
+def expiring_within(conn, days, today=None):
+    """Live contracts ending between today and today + days (inclusive), soonest first."""
+    today = _today(today)
+    return _rows(conn, today, today + timedelta(days=int(days) + 1), today)
+
+
+def expired_since(conn, since, today=None):
+    """Live contracts that ended on or after `since` and before today."""
+    today = _today(today)
+    return _rows(conn, since, today, today)
+
+
+def expiry_counts(conn, days, today=None):
+    """{'expiring': n within `days`, 'expired': n live contracts already past their end date}."""
+    today = _today(today)
+    soon = today + timedelta(days=int(days) + 1)
+    return {
+        'expiring': conn.execute(_COUNT_BY_END, {'lo': _day(today), 'hi': _day(soon)}).fetchone()[0],
+        # '0' sorts before every ISO date, so this counts every past end date
+        'expired': conn.execute(_COUNT_BY_END, {'lo': '0', 'hi': _day(today)}).fetchone()[0],
+    }
+
+
+# -------------------- DIGEST --------------------
+def build_digest(conn, days=None, since=None, today=None):
+    """Expiring-soon and newly-expired live contracts for one day.
+
+    `days` defaults to the saved "Alert before expiry" setting and `since`
+    to yesterday, so a daily run lists each expiry once.
+    """
+    today = _today(today)
+    days = saved_alert_days(conn) if days is None else int(days)
+    since = _today(since) if since is not None else today - timedelta(days=1)
+    return {
+        'date': today.isoformat(),
+        'alert_days': days,
+        'expired_since': since.isoformat(),
+        'expiring': expiring_within(conn, days, today),
+        'expired': expired_since(conn, since, today),
+    }
+
+
+def _line(row):
+    left = row['days_left']
+    when = "" if left is None else (f"in {left} day(s)" if left >= 0 else f"{-left} day(s) ago")
+    who = " — ".join(str(v) for v in (row['client'], row['company'], row['location']) if v)
+    balance = f"  balance {row['balance']:,.0f}" if row['balance'] else ""
+    contact = f"  {row['contact']}" if row['contact'] else ""
+    return f"  {row['end_date']}  {when:<15} Board {row['board']}  {who}{contact}{balance}"
+
+
+def format_digest(digest):
+    lines = [
+        f"Billboard expiry alerts — {digest['date']} (alert window {digest['alert_days']} days)",
+        "",
+        f"Expiring within {digest['alert_days']} days: {len(digest['expiring'])}",
+        *map(_line, digest['expiring']),
+        "",
+        f"Expired since {digest['expired_since']}: {len(digest['expired'])}",
+        *map(_line, digest['expired']),
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def _write_atomic(path, text):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def write_digest(digest, out_dir=ALERTS_DIR):
+    """Write alerts-<date>.txt and .json into `out_dir`; returns both paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    base = os.path.join(out_dir, f"alerts-{digest['date']}")
+    _write_atomic(base + '.txt', format_digest(digest))
+    _write_atomic(base + '.json', json.dumps(digest, indent=2, ensure_ascii=False))
+    return base + '.txt', base + '.json'
+
+
+def since_last_run(today, out_dir=ALERTS_DIR):
+    """Start of the "expired since" window for a run on `today`.
+
+    The date of the previous run, or, when re-run on the same day, the
+    window that run used; None before the first run.
+    """
+    try:
+        with open(os.path.join(out_dir, LAST_RUN_FILE), encoding='utf-8') as f:
+            state = json.load(f)
+        ran, since = date.fromisoformat(state['date']), date.fromisoformat(state['since'])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    return since if ran == _today(today) else ran
+
+
+def mark_run(digest, out_dir=ALERTS_DIR):
+    os.makedirs(out_dir, exist_ok=True)
+    state = {'date': digest['date'], 'since': digest['expired_since']}
+    _write_atomic(os.path.join(out_dir, LAST_RUN_FILE), json.dumps(state) + "\n")
@@ -0,0 +1,374 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from email.utils import formatdate
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from .alerts import expiring_within
+from .availability import count_free, free_boards, upcoming_bookings
+from .datacache import cache_for
+from .db import open_connection
+from .schema import DB_PATH, SCHEMA_VERSION, STATUS_SQL
+from .settings import alert_days
+
+
+API_HOST = "127.0.0.1"
+API_PORT = 8502
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+MAX_HEADER_BYTES = 16 * 1024     # request line + headers; larger requests get 431
+KEEPALIVE_SECONDS = 15           # idle time before a kept-alive connection is closed
+READ_WORKERS = 4                 # threads running queries, each on its own read-only connection
+CACHED_RESPONSES = 512           # JSON bodies kept per version, least recently used dropped first
+
+_STATUS_TEXT = {
+    200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    431: 'Request Header Fields Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable',
+}
+_logger = logging.getLogger(__name__)
+_BOARD_RE = re.compile(r'^/boards/(\d{1,9})$')
+
+# One row per board with its live contract, if any; the CASE tries the
+# disjoint STATUS_SQL buckets in turn
+_BOARD_FIELDS = [
+    'board', 'status', 'billboard_code', 'location', 'size', 'client', 'company', 'contact',
+    'start_date', 'end_date', 'rent', 'balance', 'payment_status',
+]
+_STATUS_CASE = "CASE " + " ".join(f"WHEN {sql} THEN '{name}'" for name, sql in STATUS_SQL.items()) + " END"
+_BOARD_SELECT = f"""
+SELECT b.id, {_STATUS_CASE},
+       c.billboard_code, c.location, c.billboard_size, c.client_name, c.company_name, c.contact_number,
+       c.start_date, c.end_date, c.rent_amount, c.balance, c.payment_status
+FROM billboards b
+LEFT JOIN contracts c ON c.billboard_id = b.id AND c.archived_at IS NULL
+"""
+
+
+class BadRequest(ValueError):
+    """A query parameter is missing or malformed; answered with 400."""
+
+
+class NotFound(LookupError):
+    """No such resource; answered with 404."""
+
+
+class Unavailable(RuntimeError):
+    """The database is missing or its schema is older than this code; answered with 503.
+
+    The API never creates or migrates the database: start the app or run
+    migrate_db.py first.
+    """
+
+
+# -------------------- QUERIES --------------------
+def _param(query, name, default=None, cast=str):
+    values = query.get(name)
+    if not values or values[-1] == '':
+        if default is None:
+            raise BadRequest(f"'{name}' is required")
+        return default
+    try:
+        return cast(values[-1])
+    except ValueError:
+        raise BadRequest(f"'{name}' is not valid: {values[-1]!r}") from None
+
+
+def _bucket_params(conn, today):
+    days = alert_days(conn)
+    return {'today': today.isoformat(), 'soon': (today + timedelta(days=days)).isoformat()}
+
+
+def _board_row(r, today):
+    row = dict(zip(_BOARD_FIELDS, r))
+    try:
+        row['days_left'] = (date.fromisoformat(row['end_date']) - today).days
+    except (TypeError, ValueError):
+        row['days_left'] = None
+    return row
+
+
+def boards(conn, query, today):
+    """One page of boards in number order, optionally limited to status buckets (?status=A,B)."""
+    page = max(_param(query, 'page', 1, int), 1)
+    page_size = min(max(_param(query, 'page_size', PAGE_SIZE, int), 1), MAX_PAGE_SIZE)
+    statuses = [s.strip() for v in query.get('status', []) for s in v.split(',') if s.strip()]
+    unknown = [s for s in statuses if s not in STATUS_SQL]
+    if unknown:
+        raise BadRequest(f"unknown status {unknown[0]!r}; expected one of {', '.join(STATUS_SQL)}")
+    params = _bucket_params(conn, today)
+    where = " WHERE " + " OR ".join(STATUS_SQL[s] for s in statuses) if statuses else ""
+    total = conn.execute(
+        "SELECT COUNT(*) FROM billboards b "
+        "LEFT JOIN contracts c ON c.billboard_id = b.id AND c.archived_at IS NULL" + where, params,
+    ).fetchone()[0]
+    params.update(limit=page_size, offset=(page - 1) * page_size)
+    rows = conn.execute(_BOARD_SELECT + where + " ORDER BY b.id LIMIT :limit OFFSET :offset", params)
+    return {
+        'date': today.isoformat(), 'total': total, 'page': page, 'page_size': page_size,
+        'boards': [_board_row(r, today) for r in rows],
+    }
+
+
+def board(conn, number, today):
+    """One board with its live contract and its bookings that have not ended."""
+    row = conn.execute(_BOARD_SELECT + " WHERE b.id = :b", {'b': number, **_bucket_params(conn, today)}).fetchone()
+    if row is None:
+        raise NotFound(f"no board {number}")
+    out = _board_row(row, today)
+    out['bookings'] = [b for b in upcoming_bookings(conn, today) if b['billboard_id'] == number]
+    return out
+
+
+def availability(conn, query, today):
+    """Boards free of live contracts and bookings for the whole of ?start=..&end=.. (inclusive)."""
+    start = _param(query, 'start', cast=date.fromisoformat)
+    end = _param(query, 'end', cast=date.fromisoformat)
+    if end < start:
+        raise BadRequest("the period ends before it starts")
+    limit = _param(query, 'limit', MAX_PAGE_SIZE, int)
+    return {
+        'start': start.isoformat(), 'end': end.isoformat(),
+        'free': count_free(conn, start, end),
+        'boards': free_boards(conn, start, end, limit=min(max(limit, 0), MAX_PAGE_SIZE)),
+    }
+
+
+def expiring(conn, query, today):
+    """Live contracts ending within ?days= (default: the app's "Alert before expiry" setting)."""
+    days = _param(query, 'days', alert_days(conn), int)
+    if days < 0:
+        raise BadRequest("'days' must not be negative")
+    return {'date': today.isoformat(), 'days': days, 'contracts': expiring_within(conn, days, today)}
+
+
+def route(path, query):
+    """(handler(conn, today) -> dict) for a GET path; NotFound for anything else."""
+    if path == '/boards':
+        return lambda conn, today: boards(conn, query, today)
+    m = _BOARD_RE.match(path)
+    if m:
+        return lambda conn, today: board(conn, int(m.group(1)), today)
+    if path == '/availability':
+        return lambda conn, today: availability(conn, query, today)
+    if path == '/expiring':
+        return lambda conn, today: expiring(conn, query, today)
+    raise NotFound(f"no such endpoint {path}")
+
+
+# -------------------- SERVER --------------------
+class ApiServer:
+    """Read-only JSON over HTTP/1.1 for one database, on asyncio streams.
+
+    Every response carries an ETag derived from the database version (the
+    shared VersionedCache's data_version, write counter, inode and mtime)
+    and the date, since statuses move with the day. A request whose
+    If-None-Match still matches gets 304 without touching the database;
+    otherwise the body is served from an LRU of encoded responses for the
+    current version, or queried in a worker thread on that thread's own
+    read-only connection. Concurrent misses for the same URL share one
+    query. Nothing here writes: a missing or outdated database is a 503.
+    """
+
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+        self._versions = cache_for(db_path)
+        self._bodies = OrderedDict()     # (path, query) -> (etag, body)
+        self._inflight = {}              # (path, query, etag) -> Future of the body
+        self._executor = ThreadPoolExecutor(READ_WORKERS, thread_name_prefix='api')
+        self._local = threading.local()
+        self._conns = []
+        self._conns_lock = threading.Lock()
+
+    def etag(self, today):
+        # a PRAGMA and a stat: cheap enough to run on the event loop
+        version = self._versions.version()
+        if version is None:
+            raise Unavailable(f"{self.db_path} does not exist")
+        digest = hashlib.blake2b(repr((version, today)).encode(), digest_size=12).hexdigest()
+        return f'"{digest}"'
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # sqlite3 would create a missing file, even for a query-only connection
+            if not os.path.exists(self.db_path):
+                raise Unavailable(f"{self.db_path} does not exist")
+            conn = self._local.conn = open_connection(self.db_path, readonly=True)
+            with self._conns_lock:
+                self._conns.append(conn)
+        return conn
+
+    def _load(self, handler, today):
+        conn = self._connection()
+        # one read snapshot for the schema check and all of the handler's queries
+        conn.execute("BEGIN")
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < SCHEMA_VERSION:
+                raise Unavailable(f"database schema v{version} is older than v{SCHEMA_VERSION}; open the app "
+                                  "or run migrate_db.py to upgrade it")
+            data = handler(conn, today)
+        finally:
+            conn.execute("ROLLBACK")
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode()
+
+    async def body(self, key, handler, etag, today):
+        hit = self._bodies.get(key)
+        if hit is not None and hit[0] == etag:
+            self._bodies.move_to_end(key)
+            return hit[1]
+        token = key + (etag,)
+        future = self._inflight.get(token)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._inflight[token] = loop.run_in_executor(self._executor, self._load, handler, today)
+            future.add_done_callback(lambda _: self._inflight.pop(token, None))
+        data = await asyncio.shield(future)
+        self._bodies[key] = (etag, data)
+        self._bodies.move_to_end(key)
+        while len(self._bodies) > CACHED_RESPONSES:
+            self._bodies.popitem(last=False)
+        return data
+
+    async def respond(self, method, target, headers):
+        """(status, extra headers, body) for one request."""
+        if method not in ('GET', 'HEAD'):
+            return 405, {'Allow': 'GET, HEAD'}, _error("only GET and HEAD are supported")
+        url = urlsplit(target)
+        path = unquote(url.path).rstrip('/') or '/'
+        if path == '/health':
+            return 200, {'Cache-Control': 'no-store'}, b'{"status":"ok"}'
+        try:
+            handler = route(path, parse_qs(url.query, keep_blank_values=True))
+            today = date.today()
+            etag = self.etag(today)
+            cache = {'ETag': etag, 'Cache-Control': 'no-cache'}
+            if _matches(headers.get('if-none-match'), etag):
+                return 304, cache, b''
+            return 200, cache, await self.body((path, url.query), handler, etag, today)
+        except BadRequest as e:
+            return 400, {}, _error(str(e))
+        except NotFound as e:
+            return 404, {}, _error(str(e))
+        except Unavailable as e:
+            return 503, {'Retry-After': '30'}, _error(str(e))
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEPALIVE_SECONDS)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await _send(writer, 431, {}, _error("request headers too large"), keep_alive=False)
+                    break
+                try:
+                    method, target, version, headers = _parse(head)
+                except ValueError:
+                    await _send(writer, 400, {}, _error("malformed request"), keep_alive=False)
+                    break
+                length = headers['content-length']
+                if length:
+                    await reader.readexactly(length)   # no endpoint takes a body
+                keep_alive = _keep_alive(version, headers)
+                try:
+                    status, extra, body = await self.respond(method, target, headers)
+                except Exception:
+                    _logger.exception("%s %s failed", method, target)
+                    status, extra, body = 500, {}, _error("internal error")
+                await _send(writer, status, extra, b'' if method == 'HEAD' else body, keep_alive,
+                            length=len(body))
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def serve(self, host=API_HOST, port=API_PORT, ready=None):
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_BYTES)
+        if ready is not None:
+            ready(server)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        with self._conns_lock:
+            conns, self._conns = self._conns, []
+        for conn in conns:
+            conn.close()
+
+
+def _error(message):
+    return json.dumps({'error': message}).encode()
+
+
+def _matches(if_none_match, etag):
+    # weak comparison, as RFC 9110 asks for If-None-Match
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(',')]
+    return '*' in tags or any(t.removeprefix('W/') == etag for t in tags)
+
+
+def _parse(head):
+    lines = head.decode('latin-1').split('\r\n')
+    method, target, version = lines[0].split(' ')
+    if not version.startswith('HTTP/1.'):
+        raise ValueError(version)
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+    headers['content-length'] = int(headers.get('content-length') or 0)
+    if headers['content-length'] < 0:
+        raise ValueError(headers['content-length'])
+    return method, target, version, headers
+
+
+def _keep_alive(version, headers):
+    connection = headers.get('connection', '').lower()
+    if version == 'HTTP/1.0':
+        return connection == 'keep-alive'
+    return connection != 'close'
+
+
+async def _send(writer, status, extra, body, keep_alive, length=None):
+    lines = [
+        f"HTTP/1.1 {status} {_STATUS_TEXT[status]}",
+        f"Date: {formatdate(usegmt=True)}",
+        "Server: billboards-api",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+    ]
+    if status != 304:
+        lines += ["Content-Type: application/json; charset=utf-8",
+                  f"Content-Length: {len(body) if length is None else length}"]
+    lines += [f"{name}: {value}" for name, value in extra.items()]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + body)
+    await writer.drain()
+
+
+def run(db_path=DB_PATH, host=API_HOST, port=API_PORT):
+    """Serve until interrupted (Ctrl+C)."""
+    api = ApiServer(db_path)
+    try:
+        asyncio.run(api.serve(host, port, ready=lambda s: _logger.info(
+            "Serving %s on http://%s:%s (Ctrl+C to stop)", db_path, host, port)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.close()
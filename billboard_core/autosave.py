@@ -0,0 +1,154 @@
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from . import perf
+from .db import transaction
+from .persistence import DB_PATH, apply_changes, is_empty_changes, merge_changes
+
+
+COALESCE_SECONDS = 0.3    # a batch closes once no edit has arrived for this long...
+MAX_BATCH_SECONDS = 2.0   # ...or this long after its first edit
+RETRIES = 5               # attempts for a batch that hits "database is locked"
+
+
+class WriteBehind:
+    """One background writer per database: sessions submit change sets and return at once.
+
+    Edits arriving less than COALESCE_SECONDS apart (up to MAX_BATCH_SECONDS
+    in total), plus anything queued while a write is running, are written as
+    one transaction. Consecutive change sets of the same journal action
+    (session and label) are merged first; the others are applied in order,
+    so each keeps its own entry in the change journal. Sequence
+    numbers let each session see whether its own last submission is still
+    pending, saved, or failed.
+    """
+
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+        self.id_map = {}          # temporary archive id -> real id
+        self._queue = queue.Queue()
+        self._cond = threading.Condition()
+        self._submitted = 0
+        self._done = 0
+        self._saved_at = None
+        self._failed = []         # (first seq, last seq, message) of failed batches
+        self._thread = None
+        self._closed = False
+
+    # ---- session side ----
+    def submit(self, changeset):
+        """Queue a change set; returns its sequence number."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("autosave writer is shut down")
+            self._submitted += 1
+            seq = self._submitted
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="autosave-writer", daemon=True)
+                self._thread.start()
+            # enqueue under the lock so queue order matches sequence order
+            self._queue.put((seq, changeset))
+        return seq
+
+    def status(self, first, last):
+        """State of a session's submissions first..last (inclusive).
+
+        ('failed', message) if any of them was in a batch that failed, else
+        ('pending', n queued) until the last one is written, then
+        ('saved', time of the most recent write).
+        """
+        with self._cond:
+            for lo, hi, msg in reversed(self._failed):
+                if lo <= last and first <= hi:
+                    return 'failed', msg
+            if self._done < last:
+                return 'pending', self._submitted - self._done
+            return 'saved', self._saved_at
+
+    def flush(self, timeout=None):
+        """Block until everything submitted so far is written; False on timeout."""
+        with self._cond:
+            target = self._submitted
+            return self._cond.wait_for(lambda: self._done >= target, timeout)
+
+    def close(self, timeout=30):
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+
+    # ---- writer thread ----
+    def _take_batch(self):
+        first, changeset = self._queue.get()
+        last, batch = first, [changeset]
+        cutoff = time.monotonic() + MAX_BATCH_SECONDS
+        while True:
+            wait = min(COALESCE_SECONDS, cutoff - time.monotonic())
+            try:
+                last, later = self._queue.get(timeout=max(wait, 0))
+            except queue.Empty:
+                return first, last, [c for c in batch if not is_empty_changes(c)]
+            if later.get('journal') == batch[-1].get('journal'):
+                batch[-1] = merge_changes(batch[-1], later)
+            else:
+                batch.append(later)
+
+    def _write(self, batch):
+        for attempt in range(RETRIES):
+            id_map = dict(self.id_map)
+            try:
+                with transaction(self.db_path) as conn:
+                    for changeset in batch:
+                        apply_changes(conn, changeset, id_map)
+            except sqlite3.OperationalError as e:
+                # another process held the lock past the busy timeout
+                if 'locked' not in str(e) and 'busy' not in str(e) or attempt == RETRIES - 1:
+                    raise
+                time.sleep(0.1 * 2 ** attempt)
+            else:
+                self.id_map = id_map
+                return
+
+    def _run(self):
+        while True:
+            first, last, batch = self._take_batch()
+            error = None
+            try:
+                if batch:
+                    run = perf.begin('autosave', changes=sum(len(c['live']) + len(c['archive']) for c in batch))
+                    try:
+                        with perf.phase('apply_changes'):
+                            self._write(batch)
+                    finally:
+                        perf.end(run)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            with self._cond:
+                self._done = last
+                if error is None:
+                    self._saved_at = datetime.now()
+                else:
+                    self._failed = self._failed[-19:] + [(first, last, error)]
+                self._cond.notify_all()
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def writer_for(db_path=DB_PATH):
+    key = os.path.abspath(db_path)
+    with _writers_lock:
+        if key not in _writers:
+            _writers[key] = WriteBehind(db_path)
+        return _writers[key]
+
+
+@atexit.register
+def _flush_all():
+    for writer in list(_writers.values()):
+        writer.close()
@@ -0,0 +1,229 @@
+from datetime import date, datetime, timedelta
+
+from .db import commit
+from .schema import (
+    ARCHIVED, BOOKED, DATA_COLUMNS, INTERVALS_SQL, LIVE, LIVE_UPSERT, OPEN_END, has_calendar_index,
+)
+
+
+KIND_NAMES = {LIVE: 'Live', BOOKED: 'Booking', ARCHIVED: 'Archived'}
+BOOKING_FIELDS = [
+    'id', 'billboard_id', 'client_name', 'company_name', 'contact_number',
+    'start_date', 'end_date', 'rent_amount', 'remarks',
+]
+_JULIAN_OFFSET = 1721424    # date.toordinal() -> julian day number as stored in board_calendar
+
+
+class BookingConflict(ValueError):
+    """The requested period overlaps a live contract or another booking on the board."""
+
+    def __init__(self, board, conflicts):
+        self.board = board
+        self.conflicts = conflicts
+        spans = ", ".join(f"{c['kind']} {c['start']} → {c['end']}" for c in conflicts)
+        super().__init__(f"Board {board} is taken: {spans}")
+
+
+def _date(d):
+    if isinstance(d, datetime):
+        return d.date()
+    if isinstance(d, date):
+        return d
+    return date.fromisoformat(str(d)[:10])
+
+
+def day_number(d):
+    return _date(d).toordinal() + _JULIAN_OFFSET
+
+
+def _from_day(n):
+    return date.fromordinal(n - _JULIAN_OFFSET).isoformat()
+
+
+def _source(conn):
+    # the R*Tree when there is one, else the same boxes computed on the fly
+    return "board_calendar" if has_calendar_index(conn) else f"({INTERVALS_SQL})"
+
+
+def _span(start, end):
+    lo, hi = day_number(start), day_number(end)
+    if hi < lo:
+        raise ValueError("the period ends before it starts")
+    return lo, hi
+
+
+# -------------------- QUERIES --------------------
+def overlapping(conn, board, start, end, kinds=(LIVE, BOOKED), exclude=None):
+    """Contracts and bookings on `board` that overlap [start, end] (both inclusive).
+
+    Each is a dict of kind, id (contract id, or booking id), start, end and
+    client. `exclude` is a calendar id to ignore (negative for a booking).
+    """
+    lo, hi = _span(start, end)
+    rows = conn.execute(
+        f"SELECT id, day_min, day_max, kind_min FROM {_source(conn)} "
+        "WHERE board_min <= :b AND board_max >= :b AND day_min <= :hi AND day_max >= :lo "
+        "AND kind_min >= :kmin AND kind_max <= :kmax",
+        {'b': int(board), 'lo': lo, 'hi': hi, 'kmin': min(kinds), 'kmax': max(kinds)},
+    ).fetchall()
+    out = []
+    for rowid, d0, d1, kind in rows:
+        if kind not in kinds or rowid == exclude:
+            continue
+        table = 'bookings' if kind == BOOKED else 'contracts'
+        client = conn.execute(f"SELECT client_name FROM {table} WHERE id = ?", (abs(rowid),)).fetchone()
+        out.append({
+            'kind': KIND_NAMES[kind], 'id': abs(rowid), 'client': client[0] if client else None,
+            'start': _from_day(d0) if d0 > 0 else None,
+            'end': _from_day(d1) if d1 < OPEN_END else None,
+        })
+    return sorted(out, key=lambda c: c['start'] or '')
+
+
+def _taken_sql(conn):
+    return (
+        f"SELECT board_min FROM {_source(conn)} "
+        f"WHERE day_min <= :hi AND day_max >= :lo AND kind_max <= {BOOKED}"
+    )
+
+
+def free_boards(conn, start, end, limit=None):
+    """Boards with no live contract or booking anywhere in [start, end], in order."""
+    lo, hi = _span(start, end)
+    sql = f"SELECT id FROM billboards WHERE id NOT IN ({_taken_sql(conn)}) ORDER BY id"
+    params = {'lo': lo, 'hi': hi}
+    if limit is not None:
+        sql += " LIMIT :limit"
+        params['limit'] = int(limit)
+    return [r[0] for r in conn.execute(sql, params)]
+
+
+def count_free(conn, start, end):
+    lo, hi = _span(start, end)
+    taken = conn.execute(
+        f"SELECT COUNT(DISTINCT board_min) FROM ({_taken_sql(conn)})", {'lo': lo, 'hi': hi}
+    ).fetchone()[0]
+    return conn.execute("SELECT COUNT(*) FROM billboards").fetchone()[0] - taken
+
+
+def occupancy_by_month(conn, first_month, months, kinds=(LIVE, BOOKED, ARCHIVED)):
+    """[(YYYY-MM, boards occupied at any point in the month)] for `months` months from `first_month`."""
+    month = _date(first_month).replace(day=1)
+    out = []
+    for _ in range(int(months)):
+        following = (month + timedelta(days=32)).replace(day=1)
+        n = conn.execute(
+            f"SELECT COUNT(DISTINCT board_min) FROM {_source(conn)} "
+            "WHERE day_min <= :hi AND day_max >= :lo AND kind_min >= :kmin AND kind_max <= :kmax",
+            {'lo': day_number(month), 'hi': day_number(following) - 1, 'kmin': min(kinds), 'kmax': max(kinds)},
+        ).fetchone()[0]
+        out.append((month.strftime('%Y-%m'), n))
+        month = following
+    return out
+
+
+def booking_conflicts(conn):
+    """Bookings that overlap a live contract or an earlier booking on the same board.
+
+    Bookings are checked when made; this catches contracts extended or added
+    over a booking afterwards.
+    """
+    out = []
+    for booking in upcoming_bookings(conn, since=date.min):
+        clashes = [
+            c for c in overlapping(conn, booking['billboard_id'], booking['start_date'], booking['end_date'],
+                                   exclude=-booking['id'])
+            if c['kind'] == KIND_NAMES[LIVE] or c['id'] < booking['id']
+        ]
+        if clashes:
+            out.append({'booking': booking, 'conflicts': clashes})
+    return out
+
+
+def upcoming_bookings(conn, since=None):
+    """Bookings ending on or after `since` (default today), soonest first."""
+    since = _date(since or date.today()).isoformat()
+    rows = conn.execute(
+        f"SELECT {', '.join(BOOKING_FIELDS)} FROM bookings WHERE end_date >= ? ORDER BY start_date, id",
+        (since,),
+    )
+    return [dict(zip(BOOKING_FIELDS, r)) for r in rows]
+
+
+# -------------------- BOOKINGS --------------------
+def book_board(conn, board, start, end, client, company=None, contact=None, rent=None, remarks=None):
+    """Reserve `board` for [start, end]; returns the booking id.
+
+    Raises BookingConflict when the period overlaps the board's live
+    contract or another booking.
+    """
+    _span(start, end)
+    if not str(client or '').strip():
+        raise ValueError("a booking needs a client name")
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if conn.execute("SELECT 1 FROM billboards WHERE id = ?", (int(board),)).fetchone() is None:
+            raise ValueError(f"Billboard {board} does not exist")
+        conflicts = overlapping(conn, board, start, end)
+        if conflicts:
+            raise BookingConflict(board, conflicts)
+        booking_id = conn.execute(
+            "INSERT INTO bookings (billboard_id, client_name, company_name, contact_number, "
+            "start_date, end_date, rent_amount, remarks) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (int(board), str(client).strip(), company or None, contact or None,
+             _date(start).isoformat(), _date(end).isoformat(), rent, remarks or None),
+        ).lastrowid
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    commit(conn)
+    return booking_id
+
+
+def cancel_booking(conn, booking_id):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        deleted = conn.execute("DELETE FROM bookings WHERE id = ?", (booking_id,)).rowcount
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    commit(conn)
+    return deleted > 0
+
+
+def activate_due_bookings(conn, today=None):
+    """Turn bookings that are running today into live contracts on free boards.
+
+    Bookings that ended without being activated are left alone. Returns
+    (activated booking ids, ids still waiting because the board has a live
+    contract).
+    """
+    today = _date(today or date.today())
+    activated, blocked = [], []
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        due = conn.execute(
+            f"SELECT {', '.join(BOOKING_FIELDS)} FROM bookings WHERE start_date <= :today AND end_date >= :today "
+            "ORDER BY start_date, id",
+            {'today': today.isoformat()},
+        ).fetchall()
+        for row in due:
+            b = dict(zip(BOOKING_FIELDS, row))
+            if conn.execute(
+                "SELECT 1 FROM contracts WHERE billboard_id = ? AND archived_at IS NULL", (b['billboard_id'],)
+            ).fetchone():
+                blocked.append(b['id'])
+                continue
+            values = dict.fromkeys(DATA_COLUMNS)
+            values.update({k: b[k] for k in BOOKING_FIELDS if k in values})
+            values['days_remaining'] = (_date(b['end_date']) - today).days
+            if b['rent_amount'] is not None:
+                values['balance'] = b['rent_amount']
+            conn.execute(LIVE_UPSERT, [b['billboard_id']] + [values[c] for c in DATA_COLUMNS])
+            conn.execute("DELETE FROM bookings WHERE id = ?", (b['id'],))
+            activated.append(b['id'])
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    commit(conn)
+    return activated, blocked
@@ -0,0 +1,161 @@
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+
+from .datacache import cache_for, note_write
+from .db import open_connection, writing
+from .schema import DB_PATH, ensure_schema
+
+
+BACKUP_DIR = "backups"
+KEEP_BACKUPS = 20         # newest snapshots kept; older ones are deleted
+STEP_PAGES = 256          # pages copied per backup step (1 MiB at the default 4 KiB page)
+STEP_PAUSE = 0.005        # seconds between steps, so the writer gets the database in between
+COMPRESS_LEVEL = 6
+
+_NAME_RE = re.compile(r'^(?P<stem>.+)-(?P<at>\d{8}-\d{6})(?:-(?P<n>\d+))?-(?P<reason>[a-z0-9-]+)\.db\.gz$')
+
+
+def _stem(db_path):
+    return os.path.splitext(os.path.basename(db_path))[0]
+
+
+def _slug(reason):
+    return re.sub(r'[^a-z0-9]+', '-', str(reason).lower()).strip('-') or 'manual'
+
+
+def _copy_pages(src, dst, progress=None):
+    def step(status, remaining, total):
+        if progress is not None:
+            progress(total - remaining, total)
+        time.sleep(STEP_PAUSE)
+    src.backup(dst, pages=STEP_PAGES, progress=step)
+
+
+def _check(conn):
+    result = conn.execute("PRAGMA quick_check").fetchone()[0]
+    if result != 'ok':
+        raise ValueError(f"backup failed its integrity check: {result}")
+
+
+def create_backup(db_path=DB_PATH, backup_dir=BACKUP_DIR, reason='manual', keep=KEEP_BACKUPS, progress=None):
+    """Snapshot the live database into a gzipped file in `backup_dir` and return its path.
+
+    Uses SQLite's online backup API a few pages at a time from a reader
+    that holds one read transaction, so the copy is a consistent snapshot
+    while sessions keep reading and (WAL) writing. `progress(copied, total)`
+    is called after each step. The oldest snapshots beyond `keep` are
+    deleted.
+    """
+    os.makedirs(backup_dir, exist_ok=True)
+    at = datetime.now().strftime('%Y%m%d-%H%M%S')
+    path = os.path.join(backup_dir, f"{_stem(db_path)}-{at}-{_slug(reason)}.db.gz")
+    n = 1
+    while os.path.exists(path):
+        n += 1
+        path = os.path.join(backup_dir, f"{_stem(db_path)}-{at}-{n}-{_slug(reason)}.db.gz")
+    raw = f"{path}.{os.getpid()}.tmp"
+    packed = raw + '.gz'
+    try:
+        src = open_connection(db_path, readonly=True)
+        try:
+            # pin one snapshot for the whole copy; commits made meanwhile
+            # would otherwise restart it
+            src.execute("BEGIN")
+            src.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+            dst = sqlite3.connect(raw)
+            try:
+                _copy_pages(src, dst, progress)
+                _check(dst)
+            finally:
+                dst.close()
+        finally:
+            src.close()
+        with open(raw, 'rb') as f_in, gzip.open(packed, 'wb', compresslevel=COMPRESS_LEVEL) as f_out:
+            shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+        os.replace(packed, path)
+    finally:
+        for tmp in (raw, packed):
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    rotate(backup_dir, keep, db_path)
+    return path
+
+
+def list_backups(backup_dir=BACKUP_DIR, db_path=DB_PATH):
+    """Snapshots of `db_path`, newest first: dicts of name, path, taken (datetime), reason, bytes."""
+    try:
+        names = os.listdir(backup_dir)
+    except OSError:
+        return []
+    out = []
+    for name in names:
+        m = _NAME_RE.match(name)
+        if m is None or m.group('stem') != _stem(db_path):
+            continue
+        path = os.path.join(backup_dir, name)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            continue
+        taken = datetime.strptime(m.group('at'), '%Y%m%d-%H%M%S')
+        out.append(((taken, int(m.group('n') or 1)), {
+            'name': name, 'path': path, 'taken': taken, 'reason': m.group('reason'), 'bytes': size,
+        }))
+    return [b for _, b in sorted(out, key=lambda o: o[0], reverse=True)]
+
+
+def rotate(backup_dir=BACKUP_DIR, keep=KEEP_BACKUPS, db_path=DB_PATH):
+    """Delete all but the newest `keep` snapshots; returns the paths removed."""
+    removed = []
+    for b in list_backups(backup_dir, db_path)[keep:]:
+        try:
+            os.remove(b['path'])
+            removed.append(b['path'])
+        except OSError:
+            pass
+    return removed
+
+
+def restore_backup(path, db_path=DB_PATH, backup_dir=BACKUP_DIR):
+    """Replace the live database's contents with a snapshot, in one transaction.
+
+    The snapshot is unpacked next to the database and checked, then the
+    current database is itself snapshotted into `backup_dir` (pass None to
+    skip). The copy over the live database uses the backup API in a
+    single step, through the pool's writer connection: other connections
+    see either the old database or the restored one, never a mix, and
+    stay usable afterwards (no file is swapped under them). Raises
+    ValueError for a file that is not a readable snapshot.
+    """
+    raw = f"{os.path.abspath(db_path)}.restore.{os.getpid()}.tmp"
+    try:
+        try:
+            with gzip.open(path, 'rb') as f_in, open(raw, 'wb') as f_out:
+                shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+        except (OSError, EOFError) as e:
+            raise ValueError(f"cannot read backup {os.path.basename(path)}: {e}") from e
+        src = sqlite3.connect(raw)
+        try:
+            try:
+                _check(src)
+                src.execute("SELECT 1 FROM contracts LIMIT 1").fetchall()
+            except sqlite3.DatabaseError as e:
+                raise ValueError(f"{os.path.basename(path)} is not a billboard database: {e}") from e
+            if backup_dir is not None:
+                # after unpacking, so rotation cannot remove the snapshot being restored
+                create_backup(db_path, backup_dir, reason='before restore')
+            with writing(db_path) as conn:
+                src.backup(conn)
+                ensure_schema(conn)    # a snapshot from an older release is upgraded in place
+        finally:
+            src.close()
+    finally:
+        if os.path.exists(raw):
+            os.remove(raw)
+    note_write(db_path)
+    cache_for(db_path).clear()
@@ -0,0 +1,76 @@
+import os
+import sqlite3
+import threading
+
+
+# Commits made by this process, per database file. PRAGMA data_version
+# already sees them (they come from other connections than the watcher);
+# the counter also covers a replaced file whose watcher is stale.
+_write_counts = {}
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def _key(db_path):
+    return os.path.abspath(db_path)
+
+
+def note_write(db_path):
+    key = _key(db_path)
+    with _caches_lock:
+        _write_counts[key] = _write_counts.get(key, 0) + 1
+
+
+class VersionedCache:
+    """Values derived from one SQLite file, shared process-wide until it changes.
+
+    The version is (data_version seen by a dedicated watcher connection,
+    this process's write counter, file mtime). Loads run under a lock, so
+    concurrent sessions wait for one load instead of each repeating it.
+    Cached values are shared: callers must not modify them in place (take
+    a shallow DataFrame.copy(); frames.py turns on pandas Copy-on-Write,
+    which makes that enough).
+    """
+
+    def __init__(self, db_path):
+        self.db_path = _key(db_path)
+        self._lock = threading.RLock()
+        self._conn = None
+        self._entries = {}
+
+    def version(self):
+        with self._lock:
+            try:
+                stat = os.stat(self.db_path)
+            except OSError:
+                return None
+            if self._conn is None:
+                self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            return (data_version, _write_counts.get(self.db_path, 0), stat.st_ino, stat.st_mtime_ns)
+
+    def get(self, name, loader):
+        with self._lock:
+            version = self.version()
+            hit = self._entries.get(name)
+            if hit is not None and version is not None and hit[0] == version:
+                return hit[1]
+            value = loader()
+            # a write during the load changes the version, so the next get reloads
+            self._entries[name] = (version, value)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def cache_for(db_path):
+    key = _key(db_path)
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = VersionedCache(key)
+        return _caches[key]
@@ -0,0 +1,214 @@
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from . import perf
+from .datacache import note_write
+from .schema import DB_PATH, ensure_schema
+
+
+# Connection tuning, applied to every connection this module opens
+CACHE_KIB = 16 * 1024              # page cache per connection (PRAGMA cache_size, negative = KiB)
+MMAP_BYTES = 256 * 1024 * 1024     # memory-mapped reads (PRAGMA mmap_size)
+BUSY_SECONDS = 5.0                 # wait this long on a lock held by another process
+STATEMENT_CACHE = 256              # prepared statements kept per connection
+MAX_IDLE_READERS = 8               # idle read connections kept per database
+
+
+def _tune(conn, readonly):
+    conn.execute(f"PRAGMA cache_size = -{CACHE_KIB}")
+    conn.execute(f"PRAGMA mmap_size = {MMAP_BYTES}")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA foreign_keys = ON")
+    if readonly:
+        conn.execute("PRAGMA query_only = ON")
+
+
+class _Cursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=(), /):
+        if not perf.ACTIVE:
+            return super().execute(sql, parameters)
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            perf.statement(sql, time.perf_counter() - started)
+
+
+class _Connection(sqlite3.Connection):
+    """Reports each statement's time to perf while timing is on; one flag check otherwise."""
+
+    def cursor(self, factory=_Cursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=(), /):
+        if not perf.ACTIVE:
+            return super().execute(sql, parameters)
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            perf.statement(sql, time.perf_counter() - started)
+
+    def executemany(self, sql, parameters, /):
+        if not perf.ACTIVE:
+            return super().executemany(sql, parameters)
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, parameters)
+        finally:
+            perf.statement(sql, time.perf_counter() - started)
+
+
+def open_connection(db_path=None, readonly=False):
+    """A new tuned connection in autocommit mode; the caller closes it.
+
+    Transactions are explicit (BEGIN IMMEDIATE ... COMMIT). Statements are
+    prepared once and reused from the connection's statement cache, so keep
+    connections open (see ConnectionPool) rather than opening one per query.
+    """
+    conn = sqlite3.connect(
+        db_path or DB_PATH, timeout=BUSY_SECONDS, isolation_level=None,
+        check_same_thread=False, cached_statements=STATEMENT_CACHE, factory=_Connection,
+    )
+    try:
+        _tune(conn, readonly)
+    except Exception:
+        conn.close()
+        raise
+    return conn
+
+
+def commit(conn):
+    """COMMIT, and tell the shared frame cache that this database changed."""
+    conn.execute("COMMIT")
+    note_write(conn.execute("PRAGMA database_list").fetchone()[2])
+
+
+class ConnectionPool:
+    """Long-lived connections to one database file: one writer, pooled readers.
+
+    The database runs in WAL mode, so readers see the last committed state
+    and never wait for the writer. The single writer connection is shared
+    by every thread under a lock, which serialises this process's writes
+    instead of having them fight over the database lock. A reader is
+    checked out by one thread at a time and returned to the pool
+    afterwards. The writer is opened first and creates or upgrades the
+    schema, once per pool.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or DB_PATH
+        self._lock = threading.Lock()
+        self._write_lock = threading.RLock()
+        self._open_lock = threading.Lock()
+        self._writer = None
+        self._idle = []
+        self._generation = 0
+
+    def _writer_conn(self):
+        # separate from _write_lock: readers only wait here while the schema is set up
+        with self._open_lock:
+            if self._writer is None:
+                conn = open_connection(self.db_path)
+                try:
+                    conn.execute("PRAGMA journal_mode = WAL")
+                    ensure_schema(conn)
+                except Exception:
+                    conn.close()
+                    raise
+                self._writer = conn
+            return self._writer
+
+    @contextmanager
+    def reader(self):
+        """A read-only connection for the duration of the block."""
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+            generation = self._generation
+        if conn is None:
+            if self._writer is None:
+                self._writer_conn()
+            conn = open_connection(self.db_path, readonly=True)
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            with self._lock:
+                keep = generation == self._generation and len(self._idle) < MAX_IDLE_READERS
+                if keep:
+                    self._idle.append(conn)
+            if not keep:
+                conn.close()
+
+    @contextmanager
+    def writer(self):
+        """The writer connection, held exclusively; the caller manages transactions."""
+        with self._write_lock:
+            conn = self._writer_conn()
+            try:
+                yield conn
+            finally:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+
+    @contextmanager
+    def transaction(self):
+        """The writer inside BEGIN IMMEDIATE; commits on success, rolls back on error."""
+        with self.writer() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            commit(conn)
+
+    def close(self):
+        """Close every idle connection and the writer; readers in use close when returned."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._generation += 1
+        for conn in idle:
+            conn.close()
+        with self._write_lock, self._open_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def pool_for(db_path=None):
+    key = os.path.abspath(db_path or DB_PATH)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(key)
+        return _pools[key]
+
+
+def reading(db_path=None):
+    return pool_for(db_path).reader()
+
+
+def writing(db_path=None):
+    return pool_for(db_path).writer()
+
+
+def transaction(db_path=None):
+    return pool_for(db_path).transaction()
+
+
+@atexit.register
+def close_all():
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close()
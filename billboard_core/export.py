@@ -0,0 +1,140 @@
+import csv
+import gzip
+import importlib.util
+import io
+import tempfile
+
+import pandas as pd
+
+from .persistence import ARCHIVED_AT, ARCHIVE_KEY, CONTRACTS_SELECT
+from .reports import contract_filter
+from .schema import CONTRACT_COLUMNS, DATE_COLUMNS, INTEGER_COLUMNS, REAL_COLUMNS
+
+
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'CSV (gzip)': ('csv.gz', 'application/gzip'),
+}
+# pyarrow is optional: Parquet is only offered where it is installed
+if importlib.util.find_spec('pyarrow') is not None:
+    EXPORT_FORMATS['Parquet'] = ('parquet', 'application/vnd.apache.parquet')
+CHUNK_ROWS = 5000
+
+
+# -------------------- READ --------------------
+def archive_cursor(conn, **filters):
+    """Cursor over archived contracts, UI-named columns, oldest first.
+
+    `filters` are passed to reports.contract_filter (statuses, search,
+    start_from, end_by, alert_days).
+    """
+    where, params = contract_filter(conn, archived=True, **filters)
+    return conn.execute(CONTRACTS_SELECT + where + " ORDER BY c.id", params)
+
+
+def iter_chunks(cursor, chunk_rows=CHUNK_ROWS):
+    """(columns, rows) batches of at most `chunk_rows`; one batch in memory at a time."""
+    columns = [d[0] for d in cursor.description]
+    while True:
+        rows = cursor.fetchmany(chunk_rows)
+        if not rows:
+            return
+        yield columns, rows
+
+
+# -------------------- WRITE --------------------
+def write_csv(cursor, out, chunk_rows=CHUNK_ROWS):
+    """Write UTF-8 CSV to the binary file `out`; returns the row count."""
+    text = io.TextIOWrapper(out, encoding='utf-8', newline='')
+    writer = csv.writer(text)
+    writer.writerow([d[0] for d in cursor.description])
+    count = 0
+    for _, rows in iter_chunks(cursor, chunk_rows):
+        writer.writerows(rows)
+        count += len(rows)
+    text.flush()
+    text.detach()
+    return count
+
+
+def _arrow_schema():
+    import pyarrow as pa
+
+    fields = [pa.field('Billboard Number', pa.int64())]
+    for ui, col in CONTRACT_COLUMNS.items():
+        if col in DATE_COLUMNS:
+            fields.append(pa.field(ui, pa.date32()))
+        elif col in REAL_COLUMNS:
+            fields.append(pa.field(ui, pa.float64()))
+        elif col in INTEGER_COLUMNS:
+            fields.append(pa.field(ui, pa.int64()))
+        else:
+            fields.append(pa.field(ui, pa.string()))
+    fields += [pa.field(ARCHIVED_AT, pa.timestamp('s')), pa.field(ARCHIVE_KEY, pa.int64())]
+    return pa.schema(fields)
+
+
+def _typed_chunk(chunk):
+    # Parquet needs one schema for every chunk; values that don't parse become null
+    out = pd.DataFrame(index=chunk.index)
+    out['Billboard Number'] = pd.to_numeric(chunk['Billboard Number'], errors='coerce').astype('Int64')
+    for ui, col in CONTRACT_COLUMNS.items():
+        s = chunk[ui]
+        if col in DATE_COLUMNS:
+            out[ui] = pd.to_datetime(s, errors='coerce', format='ISO8601').dt.date
+        elif col in REAL_COLUMNS:
+            out[ui] = pd.to_numeric(s, errors='coerce').astype('Float64')
+        elif col in INTEGER_COLUMNS:
+            out[ui] = pd.to_numeric(s, errors='coerce').round().astype('Int64')
+        else:
+            out[ui] = s.astype('string')
+    out[ARCHIVED_AT] = pd.to_datetime(chunk[ARCHIVED_AT], errors='coerce', format='mixed')
+    out[ARCHIVE_KEY] = chunk[ARCHIVE_KEY].astype('Int64')
+    return out
+
+
+def write_parquet(cursor, out, chunk_rows=CHUNK_ROWS):
+    """Write one Parquet row group per chunk; returns the row count (needs pyarrow)."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet export needs pyarrow (pip install pyarrow)") from e
+
+    schema = _arrow_schema()
+    count = 0
+    with pq.ParquetWriter(out, schema) as writer:
+        for columns, rows in iter_chunks(cursor, chunk_rows):
+            chunk = _typed_chunk(pd.DataFrame.from_records(rows, columns=columns))
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            count += len(rows)
+    return count
+
+
+def export_archive(conn, out, fmt='CSV', chunk_rows=CHUNK_ROWS, **filters):
+    """Stream the (filtered) archive into the binary file `out`; returns the row count."""
+    cursor = archive_cursor(conn, **filters)
+    try:
+        if fmt == 'Parquet':
+            return write_parquet(cursor, out, chunk_rows)
+        if fmt == 'CSV (gzip)':
+            with gzip.GzipFile(fileobj=out, mode='wb') as gz:
+                return write_csv(cursor, gz, chunk_rows)
+        return write_csv(cursor, out, chunk_rows)
+    finally:
+        cursor.close()
+
+
+def export_archive_bytes(conn, fmt='CSV', **filters):
+    """export_archive spooled through a temp file, returned as bytes for a download.
+
+    Rows are read and encoded a chunk at a time, but the finished file is
+    returned whole: st.download_button converts whatever it is given (file
+    objects included) to bytes, so a download costs about the size of the
+    exported file in memory. Call export_archive with a real file to keep
+    memory flat, as a script would.
+    """
+    with tempfile.TemporaryFile() as tmp:
+        export_archive(conn, tmp, fmt, **filters)
+        tmp.seek(0)
+        return tmp.read()
@@ -0,0 +1,121 @@
+from datetime import date
+
+from .db import commit
+from .schema import FINANCE_REBUILD
+
+
+PAYMENT_METHODS = ['Cash', 'Bank transfer', 'Cheque', 'Online']
+PAYMENT_FIELDS = ['id', 'paid_on', 'amount', 'method', 'note', 'recorded_at']
+
+
+def _day(d):
+    if d is None:
+        return date.today().isoformat()
+    return d if isinstance(d, str) else d.isoformat()
+
+
+def _month(d):
+    return _day(d)[:7]
+
+
+def live_contract(conn, board):
+    """(contract id, client name, balance) of the live contract on `board`, or None."""
+    return conn.execute(
+        "SELECT id, client_name, balance FROM contracts WHERE billboard_id = ? AND archived_at IS NULL",
+        (int(board),),
+    ).fetchone()
+
+
+# -------------------- LEDGER --------------------
+def record_payment(conn, contract_id, amount, paid_on=None, method=None, note=None):
+    """Add a payment (negative for a refund) to a contract; returns the payment id.
+
+    Triggers update the contract's balance and every finance aggregate in
+    the same transaction.
+    """
+    amount = float(amount)
+    if amount != amount or amount == 0:
+        raise ValueError("payment amount must be a non-zero number")
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if conn.execute("SELECT 1 FROM contracts WHERE id = ?", (contract_id,)).fetchone() is None:
+            raise ValueError(f"no contract with id {contract_id}")
+        payment_id = conn.execute(
+            "INSERT INTO payments (contract_id, paid_on, amount, method, note) VALUES (?, ?, ?, ?, ?)",
+            (contract_id, _day(paid_on), amount, method or None, note or None),
+        ).lastrowid
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    commit(conn)
+    return payment_id
+
+
+def delete_payment(conn, payment_id):
+    """Remove a payment recorded by mistake; returns True if it existed."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        deleted = conn.execute("DELETE FROM payments WHERE id = ?", (payment_id,)).rowcount
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    commit(conn)
+    return deleted > 0
+
+
+def payments_for(conn, contract_id):
+    """The contract's payments, newest first, as dicts of PAYMENT_FIELDS."""
+    rows = conn.execute(
+        f"SELECT {', '.join(PAYMENT_FIELDS)} FROM payments WHERE contract_id = ? "
+        "ORDER BY paid_on DESC, id DESC",
+        (contract_id,),
+    )
+    return [dict(zip(PAYMENT_FIELDS, r)) for r in rows]
+
+
+# -------------------- KPIs --------------------
+def finance_kpis(conn, today=None, months=12):
+    """Finance figures from the materialized aggregates, at any archive size.
+
+    outstanding: positive balances on live contracts; overdue: the part on
+    contracts already past their end date; booked_rent, received (advances
+    plus payments) and partner_share over live contracts; this_month and
+    `monthly` [(YYYY-MM, received)] for the last `months` months with
+    receipts, oldest first.
+    """
+    today = _day(today)
+    live = conn.execute(
+        "SELECT COALESCE(SUM(rent), 0), COALESCE(SUM(received), 0), "
+        "COALESCE(SUM(outstanding), 0), COALESCE(SUM(partner_share), 0) FROM finance_live"
+    ).fetchone()
+    # '' (no end date) sorts first, hence the lower bound
+    overdue = conn.execute(
+        "SELECT COALESCE(SUM(outstanding), 0) FROM finance_live WHERE end_date > '' AND end_date < ?",
+        (today,),
+    ).fetchone()[0]
+    monthly = conn.execute(
+        "SELECT month, received FROM finance_monthly WHERE month > '' AND month <= ? "
+        "ORDER BY month DESC LIMIT ?",
+        (_month(today), int(months)),
+    ).fetchall()[::-1]
+    this_month = dict(monthly).get(_month(today), 0.0)
+    return {
+        'booked_rent': live[0], 'received': live[1], 'outstanding': live[2], 'partner_share': live[3],
+        'overdue': overdue, 'this_month': this_month, 'monthly': monthly,
+    }
+
+
+def rebuild_finance(conn):
+    """Recompute paid totals and the finance aggregates from scratch.
+
+    The triggers keep them current; this is for repairs and for checking
+    that they agree.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for stmt in FINANCE_REBUILD:
+            conn.execute(stmt)
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    commit(conn)
@@ -0,0 +1,235 @@
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from .schema import CONTRACT_COLUMNS, DATE_COLUMNS, INTEGER_COLUMNS, REAL_COLUMNS
+
+
+# Sessions get shallow copies of the process-wide cached frames (datacache),
+# which only stay independent under Copy-on-Write: always on from pandas 3,
+# opt-in before that
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.options.mode.copy_on_write = True
+
+
+# -------------------- TYPE CONVERSION --------------------
+def is_blank(v):
+    if v is None or v is pd.NA or v is pd.NaT:
+        return True
+    if isinstance(v, float) and np.isnan(v):
+        return True
+    return isinstance(v, str) and v.strip() == ""
+
+
+def _blank_mask(s):
+    # typed columns are blank exactly where NA; only text needs a look inside
+    if pd.api.types.is_numeric_dtype(s) or pd.api.types.is_datetime64_any_dtype(s):
+        return s.isna()
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        empty = np.flatnonzero(s.cat.categories.astype(str).str.strip() == "")
+        return s.isna() | s.cat.codes.isin(empty)
+    if pd.api.types.is_string_dtype(s) and not pd.api.types.is_object_dtype(s):
+        return (s.isna() | s.str.strip().eq("")).fillna(True).astype(bool)
+    return s.isna() | s.astype(str).str.strip().eq("")
+
+
+def to_text(s):
+    """Nullable string column; empty or whitespace-only cells become NA."""
+    s = s.astype('string')
+    return s.mask(s.str.strip().eq("").fillna(False))
+
+
+def to_number(s):
+    """Numbers from a column that may hold text such as "5,000"; anything else becomes NA."""
+    if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+        return s
+    return pd.to_numeric(to_text(s).str.replace(',', '', regex=False), errors='coerce')
+
+
+def as_category(s, known=()):
+    """Categorical text column: the `known` choices first, then any other values present."""
+    s = to_text(s)
+    known = list(known)
+    extra = sorted(set(s.dropna().unique()) - set(known))
+    return pd.Series(pd.Categorical(s, categories=known + extra), index=s.index)
+
+
+def _keep_unparsed(parsed, original, blank):
+    # values SQLite can't type stay as text rather than being lost
+    out = parsed.astype(object)
+    bad = parsed.isna() & ~blank
+    out[bad] = original[bad].astype(str)
+    out[blank] = None
+    return out
+
+
+def to_contract_frame(df):
+    """UI-named frame -> contracts-named frame of SQLite-ready values."""
+    out = pd.DataFrame(index=df.index)
+    for ui_col, col in CONTRACT_COLUMNS.items():
+        if ui_col not in df.columns:
+            out[col] = None
+            continue
+        s = df[ui_col]
+        blank = _blank_mask(s)
+        if col in DATE_COLUMNS:
+            if pd.api.types.is_datetime64_any_dtype(s):
+                parsed = s
+            else:
+                parsed = pd.to_datetime(s.where(~blank), errors='coerce', format='mixed')
+            out[col] = _keep_unparsed(parsed.dt.strftime('%Y-%m-%d'), s, blank)
+        elif col in REAL_COLUMNS or col in INTEGER_COLUMNS:
+            if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+                parsed = s.astype('Float64')
+            else:
+                parsed = pd.to_numeric(
+                    s.where(~blank).astype(str).str.replace(',', '', regex=False), errors='coerce'
+                )
+            if col in INTEGER_COLUMNS:
+                parsed = parsed.round()
+            out[col] = _keep_unparsed(parsed, s, blank)
+            if col in INTEGER_COLUMNS:
+                out[col] = [int(v) if isinstance(v, float) else v for v in out[col]]
+        else:
+            out[col] = s.astype(object).where(~blank, None)
+            if not _is_typed_text(s):
+                out[col] = [str(v) if v is not None else None for v in out[col]]
+    return out
+
+
+def _is_typed_text(s):
+    # string and categorical columns already hold str (or NA) in every cell
+    return isinstance(s.dtype, pd.CategoricalDtype) or (
+        pd.api.types.is_string_dtype(s) and not pd.api.types.is_object_dtype(s)
+    )
+
+
+def sql_value(v):
+    if v is None:
+        return None
+    if isinstance(v, pd.Timestamp):
+        return None if pd.isna(v) else v.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(v, (datetime, date)):
+        return v.isoformat(sep=' ') if isinstance(v, datetime) else v.isoformat()
+    if isinstance(v, np.generic):
+        v = v.item()
+    if isinstance(v, bool):
+        return int(v)
+    if isinstance(v, float) and np.isnan(v):
+        return None
+    if v is pd.NA or v is pd.NaT:
+        return None
+    return v
+
+
+def board_numbers(s):
+    """to_board_number over a column; integer columns skip the per-cell parse."""
+    if pd.api.types.is_integer_dtype(s):
+        return s.astype(object).where(s.notna(), None).tolist()
+    return [to_board_number(v) for v in s]
+
+
+def to_board_number(v):
+    try:
+        if is_blank(v):
+            return None
+        return int(float(str(v).replace(',', '')))
+    except (TypeError, ValueError):
+        return None
+
+
+def contains(s, text):
+    """Case-insensitive substring match over a text or categorical column; NA never matches."""
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        hits = np.flatnonzero(s.cat.categories.astype(str).str.contains(text, case=False, regex=False))
+        return pd.Series(s.cat.codes.isin(hits), index=s.index)
+    if not pd.api.types.is_string_dtype(s) or pd.api.types.is_object_dtype(s):
+        s = s.astype('string')
+    return s.str.contains(text, case=False, regex=False).fillna(False).astype(bool)
+
+
+# -------------------- DISPLAY --------------------
+def fmt_money(val):
+    try:
+        if is_blank(val):
+            return ""
+        return f"{float(val):,.0f}"
+    except (TypeError, ValueError):
+        return str(val)
+
+
+def widen_categories(frame, rows):
+    """Add to `frame`'s categorical columns, in place, any values of `rows` they lack."""
+    for c in frame.columns:
+        if c in rows.columns and isinstance(frame[c].dtype, pd.CategoricalDtype):
+            new = pd.Index(rows[c].dropna().unique()).difference(frame[c].cat.categories)
+            if len(new):
+                frame[c] = frame[c].cat.add_categories(new)
+    return frame
+
+
+def overlay(frame, rows, key='Billboard Number'):
+    """Replace rows of `frame` in place with same-keyed rows from `rows`."""
+    if rows is None or rows.empty or frame.empty:
+        return frame
+    pos = pd.Series(range(len(frame)), index=frame[key].to_numpy())
+    rows = rows[rows[key].isin(pos.index)].drop_duplicates(key, keep='last')
+    if rows.empty:
+        return frame
+    widen_categories(frame, rows)
+    labels = frame.index[pos[rows[key]].to_numpy()]
+    # one assignment per column: cell-by-cell writes are slow on arrow-backed text
+    for c in (c for c in frame.columns if c in rows.columns):
+        frame.loc[labels, c] = _cast(rows[c], frame[c].dtype).to_numpy()
+    return frame
+
+
+def _cast(s, dtype):
+    if s.dtype == dtype:
+        return s
+    try:
+        return s.astype(dtype)
+    except (TypeError, ValueError):
+        return s
+
+
+def append_rows(frame, rows):
+    """`frame` with `rows` added at the end, keeping `frame`'s column types."""
+    rows = rows.reindex(columns=frame.columns)
+    if frame.empty:
+        return rows.reset_index(drop=True)
+    frame = widen_categories(frame.copy(deep=False), rows)
+    for c in frame.columns:
+        rows[c] = _cast(rows[c], frame[c].dtype)
+    return pd.concat([frame, rows], ignore_index=True)
+
+
+def apply_editor_delta(frame, edited, delta, ignore=('Select', 'Status', 'Days Remaining')):
+    """Copy the cells a st.data_editor change set touched from `edited` into `frame`, in place.
+
+    `delta` is the editor's widget state: {'edited_rows': {position: {column:
+    value}}, 'added_rows': [...], 'deleted_rows': [positions]}, positions
+    counting rows of `frame`. Values are read from `edited`, which holds them
+    already converted to the column types. Work is proportional to the
+    number of edits, not to the size of the frame.
+
+    Returns (labels of rows with a data cell changed, labels of deleted rows,
+    added rows as a frame). Changes only to `ignore` columns are applied but
+    do not count.
+    """
+    labels = frame.index
+    changed = []
+    for pos, cells in (delta.get('edited_rows') or {}).items():
+        label = labels[int(pos)]
+        if label not in edited.index:
+            continue    # edited, then deleted
+        cols = [c for c in cells if c in frame.columns]
+        for c in cols:
+            frame.at[label, c] = edited.at[label, c]
+        if any(c not in ignore for c in cols):
+            changed.append(label)
+    deleted = [labels[int(pos)] for pos in delta.get('deleted_rows') or ()]
+    n_added = len(delta.get('added_rows') or ())
+    added = edited.iloc[len(edited) - n_added:] if n_added else edited.iloc[0:0]
+    return changed, deleted, added
@@ -0,0 +1,259 @@
+import base64
+import hashlib
+import io
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .frames import is_blank
+
+
+# Originals are stored once per distinct content, under their SHA-256; an
+# "Image / Link" cell refers to one as "img:<sha256>" (other text is a URL)
+IMAGE_DIR = "images"
+IMAGE_REF = "img:"
+MAX_UPLOAD_BYTES = 25 * 1024 * 1024
+FORMATS = {'JPEG': 'image/jpeg', 'PNG': 'image/png', 'WEBP': 'image/webp', 'GIF': 'image/gif'}
+UPLOAD_TYPES = ['jpg', 'jpeg', 'png', 'webp', 'gif']
+
+# Thumbnails: longest side in px, kept in an LRU disk cache capped at THUMB_CACHE_BYTES
+THUMB_DIR = "thumb_cache"
+THUMB_SIZES = {'small': 96, 'medium': 320, 'large': 800}
+THUMB_CACHE_BYTES = 256 * 1024 * 1024
+THUMB_QUALITY = 80
+THUMB_WORKERS = 4
+# bump when rendering changes so cached thumbnails are re-rendered
+THUMB_VERSION = 1
+
+_REF_RE = re.compile(r'^img:([0-9a-f]{64})$')
+_lock = threading.RLock()
+_pool = None
+_inflight = {}      # (cache dir, key, px) -> Future of a render in progress
+_caches = {}        # cache dir -> ThumbCache
+
+
+# -------------------- STORE --------------------
+def ref_key(link):
+    """Store key of an "Image / Link" value; None for empty cells, URLs and other text."""
+    if is_blank(link):
+        return None
+    m = _REF_RE.match(str(link).strip())
+    return m.group(1) if m else None
+
+
+def _original_path(key, image_dir):
+    return os.path.join(image_dir, key[:2], key)
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def image_format(data):
+    """Pillow format name of image bytes; ValueError unless it is a supported image."""
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        with Image.open(io.BytesIO(data)) as im:
+            fmt = im.format
+            im.verify()
+    except (UnidentifiedImageError, OSError, SyntaxError) as e:
+        raise ValueError("not a readable image") from e
+    if fmt not in FORMATS:
+        raise ValueError(f"{fmt} images are not supported")
+    return fmt
+
+
+def image_mime(data):
+    return FORMATS[image_format(data)]
+
+
+def store_image(data, image_dir=IMAGE_DIR):
+    """Add a photo to the store and return its "img:<sha256>" reference.
+
+    Identical uploads are stored once. Raises ValueError for files over
+    MAX_UPLOAD_BYTES and for anything Pillow cannot read as JPEG, PNG,
+    WebP or GIF.
+    """
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise ValueError(f"photos are limited to {MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+    image_format(data)
+    key = hashlib.sha256(data).hexdigest()
+    path = _original_path(key, image_dir)
+    if not os.path.exists(path):
+        _write_atomic(path, data)
+    return IMAGE_REF + key
+
+
+def read_original(key, image_dir=IMAGE_DIR):
+    try:
+        with open(_original_path(key, image_dir), 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+# -------------------- THUMBNAILS --------------------
+def render_thumbnail(data, px):
+    """JPEG bytes of the image scaled to fit px x px, upright per its EXIF orientation."""
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as im:
+        im.draft('RGB', (px, px))   # JPEG decodes at a reduced scale when it can
+        im = ImageOps.exif_transpose(im)
+        im.thumbnail((px, px))
+        if im.mode in ('RGBA', 'LA', 'P'):
+            im = im.convert('RGBA')
+            flat = Image.new('RGB', im.size, 'white')
+            flat.paste(im, mask=im.getchannel('A'))
+            im = flat
+        elif im.mode != 'RGB':
+            im = im.convert('RGB')
+        out = io.BytesIO()
+        im.save(out, 'JPEG', quality=THUMB_QUALITY, optimize=True)
+    return out.getvalue()
+
+
+class ThumbCache:
+    """Files under `directory`, evicted least recently used first past `max_bytes`.
+
+    A hit refreshes the file's mtime, so mtime order is use order. The total
+    size is scanned once, then tracked as files are added and evicted.
+    """
+
+    def __init__(self, directory, max_bytes=THUMB_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._bytes = None
+        self._lock = threading.Lock()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name[:2], name)
+
+    def get(self, name):
+        path = self._path(name)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        return data
+
+    def put(self, name, data):
+        _write_atomic(self._path(name), data)
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = sum(size for _, _, size in self._files())
+            else:
+                self._bytes += len(data)
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _files(self):
+        for root, _, names in os.walk(self.directory):
+            for n in names:
+                path = os.path.join(root, n)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield path, st.st_mtime, st.st_size
+
+    def _evict(self):
+        # down to 80% of the cap, so a full cache does not evict on every put
+        files = sorted(self._files(), key=lambda f: f[1])
+        total = sum(size for _, _, size in files)
+        for path, _, size in files:
+            if total <= self.max_bytes * 0.8:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._bytes = total
+
+    def size(self):
+        with self._lock:
+            return sum(size for _, _, size in self._files())
+
+
+def thumb_cache(thumb_dir=THUMB_DIR):
+    """The process-wide cache for `thumb_dir`."""
+    with _lock:
+        cache = _caches.get(thumb_dir)
+        if cache is None:
+            cache = _caches[thumb_dir] = ThumbCache(thumb_dir)
+        return cache
+
+
+def _thumb_name(key, px):
+    return f"{key}-{px}-v{THUMB_VERSION}.jpg"
+
+
+def _render_into(cache, key, px, image_dir):
+    data = read_original(key, image_dir)
+    if data is None:
+        return None
+    thumb = render_thumbnail(data, px)
+    cache.put(_thumb_name(key, px), thumb)
+    return thumb
+
+
+def _submit(cache, key, px, image_dir):
+    # one render per thumbnail however many sessions ask for it at once
+    global _pool
+    token = (cache.directory, key, px)
+    with _lock:
+        future = _inflight.get(token)
+        if future is None:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(THUMB_WORKERS, thread_name_prefix='thumbs')
+            future = _inflight[token] = _pool.submit(_render_into, cache, key, px, image_dir)
+            future.add_done_callback(lambda _: _inflight.pop(token, None))
+    return future
+
+
+def thumbnails(keys, size='small', image_dir=IMAGE_DIR, thumb_dir=THUMB_DIR):
+    """{key: JPEG thumbnail} for store keys, None where the original is missing or unreadable.
+
+    Cached thumbnails are read from disk; misses are rendered concurrently
+    in a shared thread pool (Pillow releases the GIL while decoding and
+    resizing) and cached for next time.
+    """
+    px = THUMB_SIZES[size]
+    cache = thumb_cache(thumb_dir)
+    out, pending = {}, {}
+    for key in {k for k in keys if k}:
+        data = cache.get(_thumb_name(key, px))
+        if data is not None:
+            out[key] = data
+        else:
+            pending[key] = _submit(cache, key, px, image_dir)
+    for key, future in pending.items():
+        try:
+            out[key] = future.result()
+        except (OSError, ValueError, SyntaxError):
+            out[key] = None
+    return out
+
+
+def thumbnail(key, size='small', image_dir=IMAGE_DIR, thumb_dir=THUMB_DIR):
+    return thumbnails([key], size, image_dir, thumb_dir).get(key)
+
+
+def data_url(jpeg):
+    return "data:image/jpeg;base64," + base64.b64encode(jpeg).decode('ascii')
+
+
+def thumbnail_urls(links, size='small', image_dir=IMAGE_DIR, thumb_dir=THUMB_DIR):
+    """Inline (data: URL) thumbnails aligned with "Image / Link" values; None where there is no stored photo."""
+    keys = [ref_key(v) for v in links]
+    thumbs = thumbnails(keys, size, image_dir, thumb_dir)
+    return [data_url(thumbs[k]) if k and thumbs.get(k) else None for k in keys]
@@ -0,0 +1,310 @@
+import csv
+import io
+import os
+import re
+from datetime import date, datetime
+
+from .db import reading, transaction
+from .schema import (
+    CONTRACT_COLUMNS, DATA_COLUMNS, DATE_COLUMNS, DEFAULT_COLS, INTEGER_COLUMNS, LIVE_UPSERT, REAL_COLUMNS, roll_over,
+)
+
+
+BATCH_ROWS = 5000        # rows per transaction
+ERROR_SAMPLE = 200       # errors kept in the result for display; the report file has all of them
+ERROR_FIELDS = ['Row', 'Column', 'Value', 'Error']
+DATE_FORMATS = (
+    '%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y', '%Y/%m/%d',
+    '%d %b %Y', '%d-%b-%Y', '%d %B %Y', '%b %d, %Y', '%Y-%m-%d %H:%M:%S',
+)
+BOARD_COL = 'Billboard Number'
+
+# extra header spellings seen in client sheets -> DEFAULT_COLS name
+COLUMN_ALIASES = {
+    'board': BOARD_COL, 'boardno': BOARD_COL, 'boardnumber': BOARD_COL, 'billboardno': BOARD_COL,
+    'billboard': BOARD_COL, 'code': 'Billboard ID', 'boardid': 'Billboard ID',
+    'address': 'Location', 'size': 'Billboard Size', 'client': 'Client Name',
+    'company': 'Company Name', 'phone': 'Contact Number', 'contact': 'Contact Number',
+    'mobile': 'Contact Number', 'startdate': 'Contract Start Date', 'start': 'Contract Start Date',
+    'enddate': 'Contract End Date', 'end': 'Contract End Date', 'duration': 'Rental Duration',
+    'rent': 'Rent Amount (PKR)', 'rentamount': 'Rent Amount (PKR)', 'advance': 'Advance Received (PKR)',
+    'balance': 'Balance / Credit (PKR)', 'remarks': 'Remarks / Notes', 'notes': 'Remarks / Notes',
+    'image': 'Image / Link', 'link': 'Image / Link', 'partnershare': 'Partner’s share',
+}
+
+
+def _norm(name):
+    # "Rent Amount (PKR)", "rent_amount_pkr" and "RENT AMOUNT PKR" all compare equal
+    return re.sub(r'[^0-9a-z]', '', str(name or '').casefold())
+
+
+_LOOKUP = {**COLUMN_ALIASES, **{_norm(c): c for c in DEFAULT_COLS}}
+
+
+def map_columns(header):
+    """({position: DEFAULT_COLS name}, [unrecognised headers]); the first of duplicate columns wins."""
+    mapping, unknown = {}, []
+    for i, name in enumerate(header):
+        col = _LOOKUP.get(_norm(name))
+        if col is None or col in mapping.values():
+            if str(name or '').strip():
+                unknown.append(str(name))
+            continue
+        mapping[i] = col
+    return mapping, unknown
+
+
+# -------------------- READ --------------------
+def _iter_csv(source):
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, encoding='utf-8-sig', newline='') as f:
+            yield from csv.reader(f)
+        return
+    text = io.TextIOWrapper(source, encoding='utf-8-sig', newline='')
+    try:
+        yield from csv.reader(text)
+    finally:
+        text.detach()
+
+
+def _iter_xlsx(source, sheet=None):
+    try:
+        from openpyxl import load_workbook
+    except ImportError as e:
+        raise ImportError("XLSX import needs openpyxl (pip install openpyxl)") from e
+    # read-only mode streams rows instead of loading the whole sheet
+    wb = load_workbook(source, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet] if sheet else wb.active
+        for row in ws.iter_rows(values_only=True):
+            yield list(row)
+    finally:
+        wb.close()
+
+
+def iter_rows(source, fmt=None, sheet=None):
+    """Rows (lists of cell values, header first) from a CSV or XLSX path or binary file."""
+    if fmt is None:
+        name = source if isinstance(source, (str, os.PathLike)) else getattr(source, 'name', '')
+        fmt = 'xlsx' if str(name).lower().endswith(('.xlsx', '.xlsm')) else 'csv'
+    if fmt == 'xlsx':
+        return _iter_xlsx(source, sheet)
+    if fmt == 'csv':
+        return _iter_csv(source)
+    raise ValueError(f"unsupported import format: {fmt}")
+
+
+# -------------------- VALIDATE --------------------
+def _blank(v):
+    return v is None or (isinstance(v, str) and not v.strip())
+
+
+def _text(v):
+    if isinstance(v, float) and v.is_integer():
+        v = int(v)      # Excel stores codes and phone numbers as floats
+    if isinstance(v, datetime):
+        return v.strftime('%Y-%m-%d')
+    return str(v).strip()
+
+
+def _parse_board(v):
+    try:
+        n = float(str(v).replace(',', '').strip())
+    except ValueError:
+        raise ValueError("not a board number") from None
+    if not n.is_integer() or n < 1:
+        raise ValueError("board number must be a whole number from 1")
+    return int(n)
+
+
+_last_format = [DATE_FORMATS[0]]
+
+
+def _parse_date(v):
+    if isinstance(v, datetime):
+        return v.date()
+    if isinstance(v, date):
+        return v
+    text = str(v).strip()
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        pass
+    # a file normally sticks to one format: try the last one that worked first
+    for fmt in [_last_format[0], *DATE_FORMATS]:
+        try:
+            parsed = datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+        _last_format[0] = fmt
+        return parsed
+    raise ValueError("not a date (use YYYY-MM-DD or DD/MM/YYYY)")
+
+
+def _parse_amount(v):
+    if isinstance(v, (int, float)) and not isinstance(v, bool):
+        amount = float(v)
+    else:
+        text = re.sub(r'(?i)pkr|rs\.?|,|\s', '', str(v))
+        try:
+            amount = float(text)
+        except ValueError:
+            raise ValueError("not an amount") from None
+    if amount != amount or amount < 0:
+        raise ValueError("amount must be zero or more")
+    return amount
+
+
+def validate_row(cells, mapping, today=None):
+    """(board, LIVE_UPSERT values, [(column, value, error)]) for one data row.
+
+    Balance is recomputed as rent - advance whenever a rent is given, and
+    Days Remaining from the end date, as in Quick Add.
+    """
+    today = today or date.today()
+    raw = {col: cells[i] for i, col in mapping.items() if i < len(cells) and not _blank(cells[i])}
+    values = dict.fromkeys(DATA_COLUMNS)
+    errors = []
+    board = None
+    if BOARD_COL not in raw:
+        errors.append((BOARD_COL, '', "board number is required"))
+    else:
+        try:
+            board = _parse_board(raw[BOARD_COL])
+        except ValueError as e:
+            errors.append((BOARD_COL, raw[BOARD_COL], str(e)))
+
+    for ui, col in CONTRACT_COLUMNS.items():
+        if ui not in raw:
+            continue
+        v = raw[ui]
+        try:
+            if col in DATE_COLUMNS:
+                values[col] = _parse_date(v)
+            elif col in REAL_COLUMNS:
+                values[col] = _parse_amount(v)
+            elif col in INTEGER_COLUMNS:
+                pass        # days_remaining is derived below
+            else:
+                values[col] = _text(v)
+        except ValueError as e:
+            errors.append((ui, v, str(e)))
+
+    start, end = values['start_date'], values['end_date']
+    if start and end and end < start:
+        errors.append(('Contract End Date', raw.get('Contract End Date'), "ends before it starts"))
+    if values['rent_amount'] is not None:
+        values['balance'] = values['rent_amount'] - (values['advance_received'] or 0.0)
+    if end:
+        values['days_remaining'] = (end - today).days
+    for col in DATE_COLUMNS:
+        if values[col]:
+            values[col] = values[col].isoformat()
+    return board, [board] + [values[c] for c in DATA_COLUMNS], errors
+
+
+# -------------------- IMPORT --------------------
+def _occupied(conn, boards):
+    marks = ", ".join('?' * len(boards))
+    return {r[0] for r in conn.execute(
+        f"SELECT billboard_id FROM contracts WHERE archived_at IS NULL AND billboard_id IN ({marks})", boards
+    )}
+
+
+def _write_batch(conn, batch, replace):
+    """Insert one batch inside the caller's transaction; returns (rows written, boards created, skipped)."""
+    boards = [values[0] for _, values in batch]
+    skipped = []
+    if not replace:
+        taken = _occupied(conn, boards)
+        skipped = [line for line, values in batch if values[0] in taken]
+        batch = [(line, values) for line, values in batch if values[0] not in taken]
+    else:
+        roll_over(conn, (values for _, values in batch))
+    created = conn.executemany(
+        "INSERT OR IGNORE INTO billboards (id, name, location) VALUES (?, ?, '')",
+        ((b, f"Billboard {b}") for b in sorted({values[0] for _, values in batch})),
+    ).rowcount
+    conn.executemany(LIVE_UPSERT, (values for _, values in batch))
+    if created > 0:
+        count = conn.execute("SELECT COUNT(*) FROM billboards").fetchone()[0]
+        conn.execute("DELETE FROM summary")
+        conn.execute('INSERT INTO summary ("Total Boards") VALUES (?)', (count,))
+    return len(batch), max(created, 0), skipped
+
+
+def import_contracts(source, fmt=None, sheet=None, replace=False, dry_run=False, db_path=None,
+                     errors=None, batch_rows=BATCH_ROWS, progress=None, today=None):
+    """Stream live contracts from a CSV/XLSX file into the database.
+
+    Rows are validated one at a time and written BATCH_ROWS per
+    transaction, so memory stays flat whatever the file size. Boards not
+    yet in the inventory are created. A board that already has a live
+    contract is skipped unless `replace` (a row for a different client or
+    start date then archives that contract, payments and all); a board
+    listed twice in the file keeps its first row. `errors` is an optional text file that receives a
+    CSV report of every rejected row; `progress(rows read)` is called after
+    each batch. With `dry_run` nothing is written.
+
+    Returns counts: rows, imported, rejected (rows; one row can have
+    several errors), boards_created, plus unknown_columns and the first
+    ERROR_SAMPLE errors.
+    """
+    result = {'rows': 0, 'imported': 0, 'rejected': 0, 'boards_created': 0,
+              'unknown_columns': [], 'errors': []}
+    report = csv.writer(errors) if errors is not None else None
+    if report:
+        report.writerow(ERROR_FIELDS)
+
+    def reject(line, problems):
+        result['rejected'] += 1
+        for column, value, message in problems:
+            if report:
+                report.writerow([line, column, '' if value is None else value, message])
+            if len(result['errors']) < ERROR_SAMPLE:
+                result['errors'].append(dict(zip(ERROR_FIELDS, [line, column, value, message])))
+
+    rows = iter_rows(source, fmt, sheet)
+    header = next(rows, None)
+    if header is None:
+        raise ValueError("the file is empty")
+    mapping, result['unknown_columns'] = map_columns(header)
+    if BOARD_COL not in mapping.values():
+        raise ValueError(f"no '{BOARD_COL}' column found in the header")
+
+    def flush(batch):
+        if dry_run:
+            with reading(db_path) as conn:
+                taken = set() if replace else _occupied(conn, [v[0] for _, v in batch])
+            skipped = [line for line, values in batch if values[0] in taken]
+            written = len(batch) - len(skipped)
+        else:
+            with transaction(db_path) as conn:
+                written, created, skipped = _write_batch(conn, batch, replace)
+            result['boards_created'] += created
+        for line in skipped:
+            reject(line, [(BOARD_COL, None, "board already has a live contract (use replace)")])
+        result['imported'] += written
+        if progress:
+            progress(result['rows'])
+
+    seen = set()
+    batch = []
+    for line, cells in enumerate(rows, start=2):
+        if all(_blank(c) for c in cells):
+            continue
+        result['rows'] += 1
+        board, values, problems = validate_row(cells, mapping, today)
+        if board is not None and board in seen:
+            problems.append((BOARD_COL, board, "board appears earlier in the file"))
+        if problems:
+            reject(line, problems)
+            continue
+        seen.add(board)
+        batch.append((line, values))
+        if len(batch) >= batch_rows:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+    return result
@@ -0,0 +1,115 @@
+import pandas as pd
+
+from .db import commit
+from .persistence import DASHBOARD_SELECT, DASHBOARD_SQL, to_ui_frame
+from .reports import contract_filter
+
+
+# -------------------- PAGING --------------------
+def dashboard_page(conn, page, page_size, statuses=None, search=None, alert_days=7, today=None):
+    """One page of the dashboard (billboards LEFT JOIN live contracts) plus the total row count."""
+    where, params = contract_filter(
+        conn, statuses=statuses, search=search, alert_days=alert_days, today=today
+    )
+    total = conn.execute(
+        "SELECT COUNT(*) FROM billboards b "
+        "LEFT JOIN contracts c ON c.billboard_id = b.id AND c.archived_at IS NULL" + where,
+        params,
+    ).fetchone()[0]
+    params.update(limit=int(page_size), offset=max(int(page) - 1, 0) * int(page_size))
+    df = pd.read_sql_query(
+        DASHBOARD_SELECT + where + " ORDER BY b.id LIMIT :limit OFFSET :offset", conn, params=params
+    )
+    return to_ui_frame(df), total
+
+
+def dashboard_rows(conn, numbers):
+    """Dashboard rows for specific board numbers (in board order)."""
+    numbers = sorted({int(n) for n in numbers})
+    if not numbers:
+        return to_ui_frame(pd.read_sql_query(DASHBOARD_SELECT + " WHERE 0", conn))
+    marks = ", ".join("?" * len(numbers))
+    df = pd.read_sql_query(
+        DASHBOARD_SELECT + f" WHERE b.id IN ({marks}) ORDER BY b.id", conn, params=numbers
+    )
+    return to_ui_frame(df)
+
+
+def read_dashboard(conn):
+    return to_ui_frame(pd.read_sql_query(DASHBOARD_SQL, conn))
+
+
+# -------------------- SLOTS --------------------
+def first_free_board(conn, exclude=()):
+    """Lowest board number with no live contract, skipping `exclude`."""
+    exclude = sorted({int(n) for n in exclude})
+    sql = (
+        "SELECT b.id FROM billboards b WHERE NOT EXISTS ("
+        "SELECT 1 FROM contracts c WHERE c.billboard_id = b.id AND c.archived_at IS NULL)"
+    )
+    if exclude:
+        sql += f" AND b.id NOT IN ({', '.join('?' * len(exclude))})"
+    row = conn.execute(sql + " ORDER BY b.id LIMIT 1", exclude).fetchone()
+    return row[0] if row else None
+
+
+def board_is_occupied(conn, number):
+    return conn.execute(
+        "SELECT 1 FROM contracts WHERE billboard_id = ? AND archived_at IS NULL", (int(number),)
+    ).fetchone() is not None
+
+
+# -------------------- INVENTORY SIZE --------------------
+def board_count(conn):
+    return conn.execute("SELECT COUNT(*) FROM billboards").fetchone()[0]
+
+
+def board_exists(conn, number):
+    return conn.execute("SELECT 1 FROM billboards WHERE id = ?", (int(number),)).fetchone() is not None
+
+
+def set_inventory_size(conn, n_boards):
+    """Grow or shrink the master list to boards 1..n_boards.
+
+    Boards above n_boards that still have contracts (live or archived) or
+    bookings are kept. Returns (board count, number of boards above
+    n_boards that could not be removed for that reason).
+    """
+    n_boards = int(n_boards)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(
+            """
+            WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < :n)
+            INSERT OR IGNORE INTO billboards (id, name, location)
+            SELECT n, 'Billboard ' || n, '' FROM seq
+            """,
+            {'n': n_boards},
+        )
+        conn.execute(
+            "DELETE FROM billboards WHERE id > ? "
+            "AND NOT EXISTS (SELECT 1 FROM contracts c WHERE c.billboard_id = billboards.id) "
+            "AND NOT EXISTS (SELECT 1 FROM bookings b WHERE b.billboard_id = billboards.id)",
+            (n_boards,),
+        )
+        count = board_count(conn)
+        kept = conn.execute("SELECT COUNT(*) FROM billboards WHERE id > ?", (n_boards,)).fetchone()[0]
+        conn.execute("DELETE FROM summary")
+        conn.execute('INSERT INTO summary ("Total Boards") VALUES (?)', (count,))
+        commit(conn)
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return count, kept
+
+
+def clear_live_contracts(conn):
+    """Empty every board on the dashboard (archived contracts are untouched); returns the contracts removed."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        removed = conn.execute("DELETE FROM contracts WHERE archived_at IS NULL").rowcount
+        commit(conn)
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return removed
@@ -0,0 +1,242 @@
+import itertools
+import json
+from datetime import date, datetime
+
+from .schema import DATA_COLUMNS
+
+
+# Cells journaled per row. days_remaining is derived from end_date and
+# refreshed daily, so it is never a change of its own
+LIVE_COLUMNS = [c for c in DATA_COLUMNS if c != 'days_remaining']
+ARCHIVE_COLUMNS = ['billboard_id'] + LIVE_COLUMNS + ['archived_at']
+CHECKPOINT_EVERY = 50     # events on a row between full-state checkpoints
+UNDO_DEPTH = 50           # actions a session can undo
+SCAN_ACTIONS = 1000       # a session's latest actions replayed to find its undo/redo stacks
+_CHUNK = 500
+
+_temp_ids = itertools.count(-1, -1)
+
+
+def _columns(target):
+    return LIVE_COLUMNS if target == 'live' else ARCHIVE_COLUMNS
+
+
+# -------------------- RECORDING --------------------
+def read_rows(conn, target, keys):
+    """{key: {column: value}} as stored now; live rows by board, archived rows by contract id."""
+    cols = _columns(target)
+    if target == 'live':
+        sql = (f"SELECT billboard_id, {', '.join(cols)} FROM contracts "
+               "WHERE archived_at IS NULL AND billboard_id IN ({})")
+    else:
+        sql = f"SELECT id, {', '.join(cols)} FROM contracts WHERE archived_at IS NOT NULL AND id IN ({{}})"
+    keys = [k for k in dict.fromkeys(keys) if k is not None]
+    out = {}
+    for i in range(0, len(keys), _CHUNK):
+        chunk = keys[i:i + _CHUNK]
+        for row in conn.execute(sql.format(", ".join("?" * len(chunk))), chunk):
+            out[row[0]] = dict(zip(cols, row[1:]))
+    return out
+
+
+def _empty(target):
+    return dict.fromkeys(_columns(target))
+
+
+def _days_left(end_date):
+    try:
+        return (date.fromisoformat(str(end_date)[:10]) - date.today()).days
+    except ValueError:
+        return None
+
+
+def record(conn, meta, target, before, after):
+    """Journal the cells that differ between two images of the same rows.
+
+    `before` and `after` map row keys to {column: value} (missing = no such
+    row). `meta` is {'session', 'label'} plus, for undo and redo, 'kind'
+    and 'reverts'. The action row is created on the first event; its id is
+    returned and kept in meta['action_id'], so the next target's events
+    join the same action.
+    """
+    for key in sorted(set(before) | set(after)):
+        old_row, new_row = before.get(key) or _empty(target), after.get(key) or _empty(target)
+        cells = [(c, old_row[c], new_row[c]) for c in _columns(target) if old_row[c] != new_row[c]]
+        if not cells:
+            continue
+        if meta.get('action_id') is None:
+            meta['action_id'] = conn.execute(
+                "INSERT INTO journal_actions (at, session, label, kind, reverts) VALUES (?, ?, ?, ?, ?)",
+                (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), meta.get('session'), meta.get('label') or 'Edit',
+                 meta.get('kind', 'do'), meta.get('reverts')),
+            ).lastrowid
+        board = key if target == 'live' else (new_row['billboard_id'] or old_row['billboard_id'])
+        first = None
+        for col, old, new in cells:
+            event = conn.execute(
+                "INSERT INTO journal (action_id, target, row_key, board, col, old_value, new_value) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (meta['action_id'], target, key, board, col, old, new),
+            ).lastrowid
+            first = first or event
+        _checkpoint(conn, target, key, first, old_row)
+    return meta.get('action_id')
+
+
+def _checkpoint(conn, target, key, first_event, state):
+    # the row's state before `first_event`, on its first change and then
+    # once CHECKPOINT_EVERY events have accumulated since the last one
+    last = conn.execute(
+        "SELECT MAX(before_event) FROM journal_checkpoints WHERE target = ? AND row_key = ?", (target, key),
+    ).fetchone()[0]
+    if last is not None:
+        since = conn.execute(
+            "SELECT COUNT(*) FROM journal WHERE target = ? AND row_key = ? AND id >= ? AND id < ?",
+            (target, key, last, first_event),
+        ).fetchone()[0]
+        if since < CHECKPOINT_EVERY:
+            return
+    conn.execute(
+        "INSERT INTO journal_checkpoints (target, row_key, before_event, state) VALUES (?, ?, ?, ?)",
+        (target, key, first_event, json.dumps(state)),
+    )
+
+
+# -------------------- HISTORY --------------------
+def board_history(conn, board, limit=200):
+    """A board's latest journal events, newest first, both as a live board and in the archive."""
+    rows = conn.execute(
+        "SELECT j.id, a.id, a.at, a.session, a.label, j.target, j.row_key, j.col, j.old_value, j.new_value "
+        "FROM journal j JOIN journal_actions a ON a.id = j.action_id "
+        "WHERE j.board = ? ORDER BY j.id DESC LIMIT ?",
+        (int(board), limit),
+    ).fetchall()
+    fields = ['event', 'action_id', 'at', 'session', 'action', 'target', 'row_key', 'column', 'old', 'new']
+    return [dict(zip(fields, r)) for r in rows]
+
+
+def state_at(conn, target, key, event_id):
+    """A row's {column: value} just after journal event `event_id`, replayed from the nearest checkpoint.
+
+    None if the row has no journal before that event.
+    """
+    cp = conn.execute(
+        "SELECT before_event, state FROM journal_checkpoints "
+        "WHERE target = ? AND row_key = ? AND before_event <= ? ORDER BY before_event DESC LIMIT 1",
+        (target, key, event_id),
+    ).fetchone()
+    if cp is None:
+        return None
+    state = json.loads(cp[1])
+    for col, new in conn.execute(
+        "SELECT col, new_value FROM journal WHERE target = ? AND row_key = ? AND id >= ? AND id <= ? ORDER BY id",
+        (target, key, cp[0], event_id),
+    ):
+        state[col] = new
+    return state
+
+
+# -------------------- UNDO / REDO --------------------
+def stacks(conn, session):
+    """(undo stack, redo stack) of a session's 'do' action ids, replayed from its journal, top last."""
+    rows = conn.execute(
+        "SELECT id, kind, reverts FROM journal_actions WHERE session = ? ORDER BY id DESC LIMIT ?",
+        (session, SCAN_ACTIONS),
+    ).fetchall()
+    done, undone = [], []
+    for action, kind, reverts in reversed(rows):
+        if kind == 'do':
+            done.append(action)
+            undone.clear()
+        elif kind == 'undo' and reverts in done:
+            done.remove(reverts)
+            undone.append(reverts)
+        elif kind == 'redo' and reverts in undone:
+            undone.remove(reverts)
+            done.append(reverts)
+    return done[-UNDO_DEPTH:], undone
+
+
+def labels(conn, session):
+    """(label of the action Undo would revert, label Redo would reapply); None where there is none."""
+    done, undone = stacks(conn, session)
+    out = []
+    for stack in (done, undone):
+        row = conn.execute("SELECT label FROM journal_actions WHERE id = ?", (stack[-1],)).fetchone() if stack else None
+        out.append(row[0] if row else None)
+    return tuple(out)
+
+
+def undo(conn, session):
+    """Revert the session's latest action; None if there is nothing to undo.
+
+    Runs inside the caller's transaction. Returns {'label', 'cells',
+    'skipped'}: cells changed again since (by anyone) are left as they are.
+    """
+    done, _ = stacks(conn, session)
+    return _replay(conn, session, done[-1], 'undo') if done else None
+
+
+def redo(conn, session):
+    """Reapply the session's latest undone action; None if there is nothing to redo."""
+    _, undone = stacks(conn, session)
+    return _replay(conn, session, undone[-1], 'redo') if undone else None
+
+
+def _replay(conn, session, action_id, kind):
+    from .persistence import apply_changes
+
+    label = conn.execute("SELECT label FROM journal_actions WHERE id = ?", (action_id,)).fetchone()[0]
+    events = conn.execute(
+        "SELECT target, row_key, col, old_value, new_value FROM journal WHERE action_id = ? ORDER BY id",
+        (action_id,),
+    ).fetchall()
+    if kind == 'undo':
+        # last change first, back to each cell's value before the action
+        events = [(t, k, c, new, old) for t, k, c, old, new in reversed(events)]
+    wanted = {}
+    for target, key, col, expect, value in events:
+        wanted.setdefault((target, key), []).append((col, expect, value))
+
+    current = {
+        target: read_rows(conn, target, [k for t, k in wanted if t == target]) for target in ('live', 'archive')
+    }
+    live, archive, cells, skipped = {}, {}, 0, 0
+    for (target, key), changes in wanted.items():
+        before = current[target].get(key) or _empty(target)
+        row = dict(before)
+        # balance last: whether the triggers own it depends on the rent put back,
+        # and on the contract staying the same (another client or start date is a new row)
+        for col, expect, value in sorted(changes, key=lambda c: c[0] == 'balance'):
+            same = (row['client_name'], row['start_date']) == (before['client_name'], before['start_date'])
+            if col == 'balance' and row['rent_amount'] is not None and same:
+                continue    # follows rent, advance and payments (finance triggers)
+            if row[col] == expect:
+                row[col] = value
+                cells += 1
+            else:
+                skipped += 1    # changed again since this action
+        blank = all(row[c] is None for c in LIVE_COLUMNS)
+        row['days_remaining'] = _days_left(row['end_date'])
+        if target == 'live':
+            live[key] = None if blank else [key] + [row.get(c) for c in DATA_COLUMNS]
+        elif blank:
+            archive[key] = None
+        else:
+            values = [row.get(c) for c in ['billboard_id'] + DATA_COLUMNS + ['archived_at']]
+            if key in current['archive'] or not conn.execute("SELECT 1 FROM contracts WHERE id = ?", (key,)).fetchone():
+                archive[key] = values
+            else:
+                # the contract is live again: a temporary id makes apply_changes
+                # archive it in place, keeping its id and payments
+                archive[next(_temp_ids)] = values
+
+    meta = {'session': session, 'label': f"{kind.capitalize()}: {label}", 'kind': kind, 'reverts': action_id}
+    recorded = apply_changes(conn, {'live': live, 'archive': archive, 'summary': None, 'journal': meta}, {})
+    if recorded is None:
+        # nothing could be changed; still recorded, so the stacks move on
+        conn.execute(
+            "INSERT INTO journal_actions (at, session, label, kind, reverts) VALUES (?, ?, ?, ?, ?)",
+            (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), session, meta['label'], kind, action_id),
+        )
+    return {'label': label, 'cells': cells, 'skipped': skipped}
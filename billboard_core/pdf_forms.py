@@ -0,0 +1,209 @@
+import hashlib
+import io
+import json
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime
+from multiprocessing import get_context
+
+import pandas as pd
+
+from .frames import is_blank
+
+
+# Same rows, in the same order, as the HTML preview in the Print panel
+FORM_FIELDS = [
+    ('Billboard Number', 'Billboard Number'),
+    ('Client Name', 'Client Name'),
+    ('Company Name', 'Company Name'),
+    ('Location', 'Location'),
+    ('Billboard Size', 'Billboard Size'),
+    ('Start Date', 'Contract Start Date'),
+    ('End Date', 'Contract End Date'),
+    ('Rent Amount (PKR)', 'Rent Amount (PKR)'),
+    ('Advance Received (PKR)', 'Advance Received (PKR)'),
+    ('Balance (PKR)', 'Balance / Credit (PKR)'),
+    ('Payment Status', 'Payment Status'),
+    ('Contract Status', 'Contract Status'),
+    ('Remarks', 'Remarks / Notes'),
+]
+MONEY_FIELDS = {'Rent Amount (PKR)', 'Advance Received (PKR)', 'Balance / Credit (PKR)'}
+
+# bump when the layout changes so cached PDFs are re-rendered
+FORM_VERSION = 1
+PDF_CACHE_DIR = "pdf_cache"
+POOL_MIN_FORMS = 8
+
+
+# -------------------- RECORD -> FORM VALUES --------------------
+def _display(col, v):
+    if is_blank(v) or (not isinstance(v, str) and pd.isna(v)):
+        return '—'
+    if isinstance(v, (pd.Timestamp, datetime, date)):
+        return v.strftime('%Y-%m-%d')
+    if col in MONEY_FIELDS:
+        try:
+            return f"{float(str(v).replace(',', '')):,.0f}"
+        except ValueError:
+            return str(v)
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    return str(v)
+
+
+def form_values(record):
+    """[(label, text)] exactly as drawn on the form."""
+    return [(label, _display(col, record.get(col))) for label, col in FORM_FIELDS]
+
+
+def form_key(values):
+    payload = json.dumps([FORM_VERSION, values], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+# -------------------- RENDERING --------------------
+def _draw_form(c, values):
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.utils import simpleSplit
+
+    width, height = A4
+    left, right = 50, width - 50
+    label_w = 170
+    y = height - 60
+
+    c.setFillColor(colors.HexColor('#1e40af'))
+    c.roundRect(left, y - 34, right - left, 40, 8, stroke=0, fill=1)
+    c.setFillColor(colors.white)
+    c.setFont('Helvetica-Bold', 18)
+    c.drawCentredString(width / 2, y - 20, 'Billboard Contract Form')
+    y -= 50
+
+    c.setStrokeColor(colors.HexColor('#d6d6d6'))
+    for label, text in values:
+        lines = simpleSplit(text, 'Helvetica', 11, right - left - label_w - 16) or ['']
+        row_h = 12 + 14 * len(lines)
+        c.setFillColor(colors.HexColor('#f3f4f6'))
+        c.rect(left, y - row_h, label_w, row_h, stroke=1, fill=1)
+        c.rect(left + label_w, y - row_h, right - left - label_w, row_h, stroke=1, fill=0)
+        c.setFillColor(colors.black)
+        c.setFont('Helvetica-Bold', 11)
+        c.drawString(left + 8, y - 18, label)
+        c.setFont('Helvetica', 11)
+        for i, line in enumerate(lines):
+            c.drawString(left + label_w + 8, y - 18 - 14 * i, line)
+        y -= row_h
+
+    c.setFont('Helvetica', 9)
+    c.setFillColor(colors.HexColor('#555555'))
+    c.drawString(left, y - 20, f"Billboard {values[0][1]}")
+    c.showPage()
+
+
+def render_pages(forms):
+    """One PDF with a page per form (a list of form_values lists)."""
+    from reportlab.pdfgen import canvas
+
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pageCompression=1)
+    c.setTitle('Billboard Contract Forms')
+    for values in forms:
+        _draw_form(c, values)
+    c.save()
+    return buf.getvalue()
+
+
+def render_form(values):
+    return render_pages([values])
+
+
+# -------------------- CACHE --------------------
+def _cache_path(key, cache_dir):
+    return os.path.join(cache_dir, key[:2], key + '.pdf')
+
+
+def cache_get(key, cache_dir=PDF_CACHE_DIR):
+    try:
+        with open(_cache_path(key, cache_dir), 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def cache_put(key, data, cache_dir=PDF_CACHE_DIR):
+    path = _cache_path(key, cache_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def contract_pdf(record, cache_dir=PDF_CACHE_DIR):
+    """Single-form PDF for a record, rendered at most once per distinct content."""
+    values = form_values(record)
+    key = form_key(values)
+    data = cache_get(key, cache_dir)
+    if data is None:
+        data = render_form(values)
+        cache_put(key, data, cache_dir)
+    return data
+
+
+# -------------------- BATCH --------------------
+def _render_missing(forms, workers=None):
+    # big batches go to a process pool; spawn avoids forking the server's threads
+    workers = workers or min(os.cpu_count() or 1, 4)
+    if len(forms) < POOL_MIN_FORMS or workers < 2:
+        return [render_form(v) for v in forms]
+    try:
+        with ProcessPoolExecutor(workers, mp_context=get_context('spawn')) as pool:
+            chunk = max(1, len(forms) // (workers * 4))
+            return list(pool.map(render_form, forms, chunksize=chunk))
+    except BrokenProcessPool:
+        return [render_form(v) for v in forms]
+
+
+def contract_pdfs(records, cache_dir=PDF_CACHE_DIR, workers=None):
+    """Single-form PDFs for many records; only cache misses are rendered."""
+    forms = [form_values(r) for r in records]
+    keys = [form_key(v) for v in forms]
+    out = {k: cache_get(k, cache_dir) for k in set(keys)}
+    missing = [k for k, data in out.items() if data is None]
+    if missing:
+        by_key = dict(zip(keys, forms))
+        for k, data in zip(missing, _render_missing([by_key[k] for k in missing], workers)):
+            cache_put(k, data, cache_dir)
+            out[k] = data
+    return [out[k] for k in keys]
+
+
+def batch_pdf(records, cache_dir=PDF_CACHE_DIR):
+    """One multi-page PDF, cached on the hashes of its forms."""
+    forms = [form_values(r) for r in records]
+    key = hashlib.sha256("".join(form_key(v) for v in forms).encode()).hexdigest()
+    data = cache_get(key, cache_dir)
+    if data is None:
+        data = render_pages(forms)
+        cache_put(key, data, cache_dir)
+    return data
+
+
+def batch_zip(records, cache_dir=PDF_CACHE_DIR, workers=None):
+    """ZIP of one PDF per record, named after the board number."""
+    records = list(records)
+    buf = io.BytesIO()
+    names = set()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for record, data in zip(records, contract_pdfs(records, cache_dir, workers)):
+            name = f"Billboard_{_display('Billboard Number', record.get('Billboard Number'))}_Contract"
+            n = 2
+            base = name
+            while name in names:
+                name = f"{base}_{n}"
+                n += 1
+            names.add(name)
+            zf.writestr(name + '.pdf', data)
+    return buf.getvalue()
@@ -0,0 +1,279 @@
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+
+LOG_DIR = "logs"
+LOG_FILE = "perf.jsonl"
+LOG_BYTES = 5 * 1024 * 1024     # rotate the log at this size
+LOG_BACKUPS = 3                 # perf.jsonl.1 .. .3 are kept
+RECENT_RUNS = 500               # runs kept in memory for the Admin panel
+TOP_STATEMENTS = 10             # statements logged per run, by total time
+SLOW_MS = 500.0                 # default slow-operation threshold
+PERCENTILES = (50, 90, 99)
+
+# Hot paths check this flag and nothing else while timing is off
+ACTIVE = False
+
+_slow_ms = SLOW_MS
+_local = threading.local()
+_recent = deque(maxlen=RECENT_RUNS)
+_lock = threading.Lock()
+_log_path = None
+_logger = logging.getLogger(__name__)
+_logger.propagate = False
+
+
+class _Noop:
+    """Stands in for a phase while timing is off; `p.rows = n` is ignored."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NOOP = _Noop()
+
+
+class _Phase:
+    __slots__ = ('run', 'name', 'rows', 'started')
+
+    def __init__(self, run, name, rows):
+        self.run, self.name, self.rows = run, name, rows
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        ms = (time.perf_counter() - self.started) * 1000
+        self.run.phases.append({'name': self.name, 'ms': round(ms, 3), 'rows': self.rows})
+        return False
+
+
+class Run:
+    """Timings for one unit of work (a rerun, an autosave batch) on one thread."""
+    __slots__ = ('kind', 'meta', 'started', 'phases', 'statements', 'ended')
+
+    def __init__(self, kind, meta):
+        self.kind, self.meta = kind, meta
+        self.started = time.perf_counter()
+        self.phases = []
+        self.statements = {}    # normalised SQL -> [count, total s, worst s]
+        self.ended = False
+
+
+# -------------------- CONFIG --------------------
+def configure(enabled, slow_ms=None, log_dir=LOG_DIR):
+    """Turn timing on or off for the whole process; the log opens on first use."""
+    global ACTIVE, _slow_ms
+    if slow_ms is not None:
+        _slow_ms = float(slow_ms)
+    if enabled:
+        _open_log(log_dir)
+    ACTIVE = bool(enabled)
+
+
+def slow_ms():
+    return _slow_ms
+
+
+def log_path():
+    return _log_path
+
+
+def _open_log(log_dir):
+    global _log_path
+    path = os.path.abspath(os.path.join(log_dir, LOG_FILE))
+    with _lock:
+        if _log_path == path:
+            return
+        for handler in list(_logger.handlers):
+            _logger.removeHandler(handler)
+            handler.close()
+        os.makedirs(log_dir, exist_ok=True)
+        handler = RotatingFileHandler(
+            path, maxBytes=LOG_BYTES, backupCount=LOG_BACKUPS, encoding='utf-8', delay=True,
+        )
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        _logger.addHandler(handler)
+        _logger.setLevel(logging.INFO)
+        _log_path = path
+        if not _recent:
+            _recent.extend(read_log(path, RECENT_RUNS))
+
+
+def read_log(path, limit=None):
+    """The last `limit` records of a JSON-lines log (current file only)."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            lines = deque(f, maxlen=limit)
+    except OSError:
+        return []
+    out = []
+    for line in lines:
+        try:
+            out.append(json.loads(line))
+        except ValueError:
+            continue    # a line cut short by a crash
+    return out
+
+
+# -------------------- RECORDING --------------------
+def begin(kind, **meta):
+    """Start timing a run on this thread; None while timing is off."""
+    if not ACTIVE:
+        return None
+    run = Run(kind, meta)
+    _local.run = run
+    return run
+
+
+def annotate(**meta):
+    run = getattr(_local, 'run', None)
+    if run is not None:
+        run.meta.update(meta)
+
+
+def phase(name, rows=None):
+    """Context manager timing one phase of the current run; set `.rows` inside if known."""
+    if not ACTIVE:
+        return _NOOP
+    run = getattr(_local, 'run', None)
+    return _NOOP if run is None else _Phase(run, name, rows)
+
+
+def statement(sql, seconds):
+    """Add one SQLite statement's time (to first row) to the current run."""
+    run = getattr(_local, 'run', None)
+    if run is None:
+        return
+    key = " ".join(sql.split())[:160]
+    entry = run.statements.get(key)
+    if entry is None:
+        run.statements[key] = [1, seconds, seconds]
+    else:
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+
+
+def rows_of(result):
+    """Row count of a query result (a frame, a list, or a tuple led by one), else None."""
+    if isinstance(result, tuple) and result:
+        result = result[0]
+    try:
+        return len(result)
+    except TypeError:
+        return None
+
+
+def end(run, **meta):
+    """Finish `run`, log it and keep it for the panel; returns the record.
+
+    A run is recorded once; ending it again (or ending None) does nothing.
+    """
+    if run is None or run.ended:
+        return None
+    run.ended = True
+    if getattr(_local, 'run', None) is run:
+        _local.run = None
+    ms = (time.perf_counter() - run.started) * 1000
+    statements = sorted(run.statements.items(), key=lambda kv: -kv[1][1])
+    record = {
+        'at': datetime.now().isoformat(timespec='seconds'), 'kind': run.kind, **run.meta, **meta,
+        'ms': round(ms, 3), 'slow': ms >= _slow_ms, 'phases': run.phases,
+        'sql_count': sum(v[0] for _, v in statements),
+        'sql_ms': round(sum(v[1] for _, v in statements) * 1000, 3),
+        'sql': [
+            {'sql': sql, 'n': n, 'ms': round(total * 1000, 3), 'max_ms': round(worst * 1000, 3)}
+            for sql, (n, total, worst) in statements[:TOP_STATEMENTS]
+        ],
+    }
+    with _lock:
+        _recent.append(record)
+    if _logger.handlers:
+        _logger.info(json.dumps(record, default=str))
+    return record
+
+
+# -------------------- REPORTING --------------------
+def recent(kind=None):
+    with _lock:
+        runs = list(_recent)
+    return [r for r in runs if kind is None or r.get('kind') == kind]
+
+
+def _percentile(ordered, q):
+    # nearest rank
+    return ordered[max(math.ceil(q / 100 * len(ordered)) - 1, 0)]
+
+
+def _stats(name, values, rows=()):
+    ordered = sorted(values)
+    out = {'phase': name, 'runs': len(ordered)}
+    out.update({f"p{q} ms": round(_percentile(ordered, q), 1) for q in PERCENTILES})
+    out['max ms'] = round(ordered[-1], 1)
+    out['slow'] = sum(v >= _slow_ms for v in ordered)
+    counted = [r for r in rows if r is not None]
+    out['avg rows'] = round(sum(counted) / len(counted)) if counted else None
+    return out
+
+
+def phase_stats(kind='rerun'):
+    """Percentiles per phase, plus the whole run and its SQL time, over recent runs."""
+    runs = recent(kind)
+    if not runs:
+        return []
+    times, rows = {}, {}
+    for r in runs:
+        for p in r['phases']:
+            times.setdefault(p['name'], []).append(p['ms'])
+            rows.setdefault(p['name'], []).append(p.get('rows'))
+    out = [_stats(f"({kind})", [r['ms'] for r in runs]), _stats("(sql)", [r.get('sql_ms', 0) for r in runs])]
+    out += sorted((_stats(name, v, rows[name]) for name, v in times.items()), key=lambda s: -s['p90 ms'])
+    return out
+
+
+def statement_stats(kind=None, limit=20):
+    """Statements by total time over recent runs (each run logs its TOP_STATEMENTS)."""
+    totals = {}
+    for r in recent(kind):
+        for s in r.get('sql', ()):
+            t = totals.setdefault(s['sql'], {'sql': s['sql'], 'n': 0, 'ms': 0.0, 'max ms': 0.0})
+            t['n'] += s['n']
+            t['ms'] += s['ms']
+            t['max ms'] = max(t['max ms'], s['max_ms'])
+    ordered = sorted(totals.values(), key=lambda t: -t['ms'])[:limit]
+    for t in ordered:
+        t['ms'] = round(t['ms'], 1)
+    return ordered
+
+
+def slow_runs(limit=20):
+    """The latest runs at or over the slow threshold, newest first, with their slowest phase."""
+    out = []
+    for r in reversed(recent()):
+        if r['ms'] < _slow_ms:
+            continue
+        worst = max(r['phases'], key=lambda p: p['ms'], default=None)
+        out.append({
+            'at': r['at'], 'kind': r['kind'], 'view': r.get('view'), 'ms': round(r['ms'], 1),
+            'slowest phase': worst and worst['name'], 'phase ms': worst and round(worst['ms'], 1),
+            'sql ms': round(r.get('sql_ms', 0), 1),
+        })
+        if len(out) >= limit:
+            break
+    return out
@@ -0,0 +1,527 @@
+import itertools
+from datetime import datetime
+
+import pandas as pd
+
+from . import journal
+from .datacache import cache_for
+from .db import open_connection, reading, transaction
+from .frames import as_category, board_numbers, is_blank, sql_value, to_board_number, to_contract_frame, to_number, to_text
+from .schema import (
+    DB_PATH, CONTRACT_COLUMNS, DATE_COLUMNS, REAL_COLUMNS, INTEGER_COLUMNS,
+    DATA_COLUMNS, LIVE_UPSERT, PAYMENT_STATUSES, CONTRACT_STATUSES, ensure_schema, roll_over,
+)
+
+
+# Row keys used for incremental (UPSERT) persistence
+DASHBOARD_KEY = 'Billboard Number'
+ARCHIVE_KEY = 'Archive ID'
+ARCHIVED_AT = 'Archived At'
+
+_UI_SELECT = ", ".join(f'c.{col} AS "{ui}"' for ui, col in CONTRACT_COLUMNS.items())
+# repetitive text is held as categoricals; the statuses always offer the standard choices
+CATEGORY_UI_COLS = {
+    'Location': (), 'Payment Status': PAYMENT_STATUSES, 'Contract Status': CONTRACT_STATUSES,
+}
+
+DASHBOARD_SELECT = f"""
+SELECT b.id AS "Billboard Number", {_UI_SELECT}
+FROM billboards b
+LEFT JOIN contracts c ON c.billboard_id = b.id AND c.archived_at IS NULL
+"""
+DASHBOARD_SQL = DASHBOARD_SELECT + "ORDER BY b.id"
+CONTRACTS_SELECT = f"""
+SELECT c.billboard_id AS "Billboard Number", {_UI_SELECT},
+       c.archived_at AS "{ARCHIVED_AT}", c.id AS "{ARCHIVE_KEY}"
+FROM contracts c
+"""
+SAVED_SQL = CONTRACTS_SELECT + "WHERE c.archived_at IS NOT NULL ORDER BY c.id"
+
+
+# -------------------- INIT --------------------
+def connect(db_path=None):
+    """A standalone tuned connection with the schema in place; the caller closes it.
+
+    The app and the autosave writer use the pooled connections in db instead.
+    """
+    conn = open_connection(db_path)
+    try:
+        ensure_schema(conn)
+    except Exception:
+        conn.close()
+        raise
+    return conn
+
+
+def init_db_if_missing(conn):
+    ensure_schema(conn)
+
+
+# -------------------- LOAD --------------------
+def to_ui_frame(df):
+    """Type a query result for the UI, in place.
+
+    Amounts are Float64, Days Remaining Int64, dates datetime64, the
+    CATEGORY_UI_COLS categoricals and other text nullable strings; empty
+    cells are NA throughout, never "". Text that does not parse in a number
+    or date column loads as NA.
+    """
+    for ui, col in CONTRACT_COLUMNS.items():
+        if col in DATE_COLUMNS:
+            df[ui] = pd.to_datetime(df[ui], errors='coerce', format='ISO8601')
+        elif col in REAL_COLUMNS:
+            df[ui] = to_number(df[ui]).astype('Float64')
+        elif col in INTEGER_COLUMNS:
+            df[ui] = to_number(df[ui]).round().astype('Int64')
+        elif ui in CATEGORY_UI_COLS:
+            df[ui] = as_category(df[ui], CATEGORY_UI_COLS[ui])
+        else:
+            df[ui] = to_text(df[ui])
+    return df
+
+
+def read_saved(conn):
+    return to_ui_frame(pd.read_sql_query(SAVED_SQL, conn))
+
+
+def read_summary(conn):
+    return pd.read_sql_query('SELECT * FROM summary', conn)
+
+
+def shared(name, loader, db_path=None):
+    """loader(conn), computed once per process and DB version and shared.
+
+    The result must be treated as read-only by callers.
+    """
+    def load():
+        with reading(db_path) as conn:
+            return loader(conn)
+    return cache_for(db_path or DB_PATH).get(name, load)
+
+
+def _load_store(conn):
+    saved = read_saved(conn)
+    summary = read_summary(conn)
+    return saved, summary, snapshot(None, summary, saved)
+
+
+def read_sheets_sqlite(db_path=None):
+    dashboard, summary, saved = shared('sheets', lambda conn: (
+        to_ui_frame(pd.read_sql_query(DASHBOARD_SQL, conn)), read_summary(conn), read_saved(conn),
+    ), db_path)
+    return dashboard.copy(deep=False), summary.copy(deep=False), saved.copy(deep=False)
+
+
+def read_store(db_path=None):
+    """(saved, summary, baseline) for a new session, shared until the DB changes.
+
+    Frames are copy-on-write views and the baseline dict is a fresh copy, so
+    sessions can modify what they get without affecting each other.
+    """
+    saved, summary, baseline = shared('store', _load_store, db_path)
+    return saved.copy(deep=False), summary.copy(deep=False), dict(baseline)
+
+
+# -------------------- DATA MODEL HELPERS --------------------
+def clear_rows(df, rows, keep=('Billboard Number', 'Select')):
+    """Blank (NA) every data cell of `rows` in place."""
+    if len(rows) == 0:
+        return df
+    for col in df.columns:
+        if col not in keep:
+            df.loc[rows, col] = None
+    return df
+
+
+def blank_rows(numbers, like):
+    """Empty dashboard rows for `numbers`, typed like the `like` frame."""
+    rows = like.iloc[[0] * len(numbers)].reset_index(drop=True) if len(like) else like.reindex(range(len(numbers)))
+    clear_rows(rows, list(rows.index), keep=(DASHBOARD_KEY, 'Select'))
+    rows[DASHBOARD_KEY] = list(numbers)
+    if 'Select' in rows.columns:
+        rows['Select'] = False
+    return rows
+
+
+def row_is_blank(row, skip=('Billboard Number', 'Select', 'Status')):
+    return all(is_blank(row[c]) for c in row.index if c not in skip)
+
+
+# -------------------- CHANGE TRACKING --------------------
+def row_hashes(df, key):
+    """One 64-bit hash per row over the values as SQLite stores them, indexed by the row key."""
+    if df is None or df.empty or key not in df.columns:
+        return pd.Series(dtype='uint64')
+    # days_remaining is refreshed daily from end_date; it alone never makes a row dirty
+    rec = to_contract_frame(df).drop(columns='days_remaining')
+    if key == ARCHIVE_KEY:
+        if DASHBOARD_KEY in df.columns:
+            rec['billboard_id'] = board_numbers(df[DASHBOARD_KEY])
+        if ARCHIVED_AT in df.columns:
+            at = df[ARCHIVED_AT]
+            if pd.api.types.is_string_dtype(at) and not pd.api.types.is_object_dtype(at):
+                rec['archived_at'] = at.astype(object).where(at.notna(), None)
+            else:
+                rec['archived_at'] = [sql_value(v) for v in at]
+    hashes = pd.util.hash_pandas_object(rec.astype(object), index=False)
+    hashes.index = df[key].to_numpy()
+    return hashes
+
+
+def _summary_hash(summary_df):
+    if summary_df is None or summary_df.empty:
+        return None
+    return int(pd.util.hash_pandas_object(summary_df.astype(object), index=False).sum())
+
+
+def snapshot(dashboard_df, summary_df, saved_df):
+    """Baseline of what is on disk; pass it back to save_to_db to diff against."""
+    return {
+        'dashboard': row_hashes(dashboard_df, DASHBOARD_KEY),
+        'saveddata': row_hashes(saved_df, ARCHIVE_KEY),
+        'summary': _summary_hash(summary_df),
+    }
+
+
+def diff_rows(df, key, baseline_hashes, current=None):
+    """Return (rows to upsert, keys to delete) relative to the baseline.
+
+    `current` may pass in row_hashes(df, key) when the caller already has it.
+    """
+    if df is None or key not in df.columns:
+        return pd.DataFrame(), []
+    if current is None:
+        current = row_hashes(df, key)
+    if baseline_hashes is None:
+        return df, []
+    known = current.index.isin(baseline_hashes.index)
+    changed = ~known
+    old = baseline_hashes.reindex(current.index[known])
+    changed[known] = old.to_numpy() != current.to_numpy()[known]
+    deleted = baseline_hashes.index.difference(current.index).tolist()
+    return df[changed], deleted
+
+
+# -------------------- SAVE --------------------
+_ARCHIVE_COLS = ['billboard_id'] + DATA_COLUMNS + ['archived_at']
+_ARCHIVE_INSERT = (
+    f"INSERT INTO contracts ({', '.join(_ARCHIVE_COLS)}) "
+    f"VALUES ({', '.join('?' * len(_ARCHIVE_COLS))})"
+)
+_ARCHIVE_UPSERT = (
+    f"INSERT INTO contracts (id, {', '.join(_ARCHIVE_COLS)}) "
+    f"VALUES ({', '.join('?' * (len(_ARCHIVE_COLS) + 1))}) "
+    f"ON CONFLICT(id) DO UPDATE SET "
+    + ", ".join(f"{c}=excluded.{c}" for c in _ARCHIVE_COLS)
+    + " WHERE contracts.archived_at IS NOT NULL"
+)
+
+# Archiving and restoring update the row in place, so a contract keeps its id
+# (and with it its payments) when it moves between the dashboard and archive
+_ARCHIVE_IN_PLACE = (
+    f"UPDATE contracts SET {', '.join(f'{c}=?' for c in _ARCHIVE_COLS)} "
+    "WHERE billboard_id = ? AND archived_at IS NULL RETURNING id"
+)
+_RESTORE_IN_PLACE = (
+    f"UPDATE contracts SET billboard_id=?, {', '.join(f'{c}=?' for c in DATA_COLUMNS)}, archived_at=NULL "
+    "WHERE id = ? AND archived_at IS NOT NULL"
+)
+
+
+def _ensure_boards(conn, board_ids):
+    conn.executemany(
+        "INSERT OR IGNORE INTO billboards (id, name, location) VALUES (?, ?, '')",
+        ((b, f"Billboard {b}") for b in sorted({b for b in board_ids if b is not None})),
+    )
+
+
+def _live_values(rows):
+    # {board: [billboard_id, *DATA_COLUMNS]} or {board: None} for boards left empty
+    rec = to_contract_frame(rows)
+    rec.insert(0, 'billboard_id', [to_board_number(v) for v in rows[DASHBOARD_KEY]])
+    rec = rec[rec['billboard_id'].notna()]
+    empty = rec[DATA_COLUMNS].isna().all(axis=1).to_numpy()
+    out = {}
+    for r, is_empty in zip(rec.itertuples(index=False, name=None), empty):
+        values = [sql_value(v) for v in r]
+        out[values[0]] = None if is_empty else values
+    return out
+
+
+def _archive_values(rows):
+    # [_ARCHIVE_COLS values] per row, in row order
+    rec = to_contract_frame(rows)
+    rec.insert(0, 'billboard_id', [to_board_number(v) for v in rows.get(DASHBOARD_KEY, [None] * len(rows))])
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    rec['archived_at'] = [now if is_blank(v) else sql_value(v) for v in rows[ARCHIVED_AT]]
+    return [[sql_value(v) for v in r] for r in rec[_ARCHIVE_COLS].itertuples(index=False, name=None)]
+
+
+_temp_ids = itertools.count(-1, -1)
+
+
+def _stamp_new_archive_rows(saved_df):
+    # new archive rows get their Archived At time and a temporary negative
+    # Archive ID now; the real id is assigned when the row is inserted
+    if ARCHIVE_KEY not in saved_df.columns:
+        saved_df[ARCHIVE_KEY] = pd.Series(pd.NA, index=saved_df.index, dtype='Int64')
+    if ARCHIVED_AT not in saved_df.columns:
+        saved_df[ARCHIVED_AT] = None
+    new = saved_df[ARCHIVE_KEY].map(is_blank)
+    if new.any():
+        ids = saved_df[ARCHIVE_KEY].astype(object)
+        ids[new] = [next(_temp_ids) for _ in range(int(new.sum()))]
+        saved_df[ARCHIVE_KEY] = ids.astype('Int64')
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        stamp = new & saved_df[ARCHIVED_AT].map(is_blank)
+        if stamp.any():
+            saved_df[ARCHIVED_AT] = saved_df[ARCHIVED_AT].astype(object)
+            saved_df.loc[stamp, ARCHIVED_AT] = now
+
+
+def changes(dashboard_df, summary_df, saved_df, baseline=None):
+    """Diff the frames against `baseline` into a self-contained change set.
+
+    Returns (changes, new baseline). The change set only holds SQL-ready
+    values, so it can be applied later or on another thread:
+    {'live': {board: values | None}, 'archive': {archive id: values | None},
+    'summary': [totals] | None}, where None deletes. New archive rows are
+    keyed by temporary negative ids (see apply_changes). Later change sets
+    override earlier ones key by key, so a burst can be merged with
+    merge_changes before writing.
+    """
+    if baseline is None:
+        base_dash = None
+        base_saved = pd.Series(0, dtype='uint64', index=pd.Index([], dtype='int64'))
+        base_summary = None
+    else:
+        base_dash, base_saved, base_summary = (
+            baseline['dashboard'], baseline['saveddata'], baseline['summary']
+        )
+
+    # each frame is hashed once, for both the diff and the new baseline
+    dash_hashes = row_hashes(dashboard_df, DASHBOARD_KEY)
+    live = {}
+    dash_rows, dash_deleted = diff_rows(dashboard_df, DASHBOARD_KEY, base_dash, dash_hashes)
+    if not dash_rows.empty:
+        live.update(_live_values(dash_rows))
+    live.update({sql_value(k): None for k in dash_deleted})
+
+    archive = {}
+    saved_hashes = row_hashes(None, ARCHIVE_KEY)
+    if saved_df is not None:
+        _stamp_new_archive_rows(saved_df)
+        saved_hashes = row_hashes(saved_df, ARCHIVE_KEY)
+        saved_rows, saved_deleted = diff_rows(saved_df, ARCHIVE_KEY, base_saved, saved_hashes)
+        if not saved_rows.empty:
+            archive.update(zip(
+                (int(k) for k in saved_rows[ARCHIVE_KEY]), _archive_values(saved_rows)
+            ))
+        archive.update({int(k): None for k in saved_deleted})
+        if baseline is None:
+            # no baseline: the frame is the whole archive
+            on_disk = set(_archived_ids()) - set(int(k) for k in saved_df[ARCHIVE_KEY])
+            archive.update({k: None for k in on_disk})
+
+    new_baseline = {'dashboard': dash_hashes, 'saveddata': saved_hashes, 'summary': _summary_hash(summary_df)}
+    summary = None
+    if summary_df is not None and new_baseline['summary'] != base_summary and 'Total Boards' in summary_df.columns:
+        summary = [sql_value(v) for v in summary_df['Total Boards']]
+    return {'live': live, 'archive': archive, 'summary': summary}, new_baseline
+
+
+def _merge_hashes(base, hashes):
+    if base is None:
+        return hashes
+    return pd.concat([base[~base.index.isin(hashes.index)], hashes])
+
+
+def row_changes(baseline, live_rows=None, archive_rows=None):
+    """Change set for just these rows, without diffing whole frames.
+
+    `live_rows` are dashboard rows as they now stand (a blank row deletes
+    its board's contract); `archive_rows` are new or edited archive rows,
+    stamped with temporary ids here when new. Returns (changes, new
+    baseline) like changes(), with only these rows' hashes replaced, so
+    cost follows the number of rows given rather than the size of the
+    dashboard or archive.
+    """
+    baseline = dict(baseline or snapshot(None, None, None))
+    live, archive = {}, {}
+    if live_rows is not None and len(live_rows):
+        live_rows = live_rows[live_rows[DASHBOARD_KEY].notna()]
+        live.update(_live_values(live_rows))
+        baseline['dashboard'] = _merge_hashes(baseline['dashboard'], row_hashes(live_rows, DASHBOARD_KEY))
+    if archive_rows is not None and len(archive_rows):
+        _stamp_new_archive_rows(archive_rows)
+        archive.update(zip((int(k) for k in archive_rows[ARCHIVE_KEY]), _archive_values(archive_rows)))
+        baseline['saveddata'] = _merge_hashes(baseline['saveddata'], row_hashes(archive_rows, ARCHIVE_KEY))
+    return {'live': live, 'archive': archive, 'summary': None}, baseline
+
+
+def _archived_ids():
+    with reading() as conn:
+        return [r[0] for r in conn.execute("SELECT id FROM contracts WHERE archived_at IS NOT NULL")]
+
+
+def merge_changes(first, later):
+    """Combine two change sets; `later` wins for any key both touch."""
+    return {
+        'live': {**first['live'], **later['live']},
+        'archive': {**first['archive'], **later['archive']},
+        'summary': later['summary'] if later['summary'] is not None else first['summary'],
+        'journal': later.get('journal'),
+    }
+
+
+def is_empty_changes(changeset):
+    return not (changeset['live'] or changeset['archive'] or changeset['summary'] is not None)
+
+
+def _move_in_place(conn, live, archive, id_map):
+    """Turn archive/restore pairs in a change set into in-place updates.
+
+    A new archive row for a board whose live contract changes in the same
+    set is that contract being archived; a deleted archive row whose client
+    and start date reappear live on its board is being restored. A
+    different contract live on that board (an undone overwrite) makes way:
+    it is archived if it has payments and deleted otherwise. Returns the
+    archive keys and boards written here, and the ids of contracts archived
+    to make way.
+    """
+    moved, restored, displaced = set(), set(), []
+    for key, values in archive.items():
+        if values is not None and key < 0 and key not in id_map and values[0] in live:
+            row = conn.execute(_ARCHIVE_IN_PLACE, values + [values[0]]).fetchone()
+            if row is not None:
+                id_map[key] = row[0]
+                moved.add(key)
+    client, start = DATA_COLUMNS.index('client_name') + 1, DATA_COLUMNS.index('start_date') + 1
+    for key, values in archive.items():
+        real = id_map.get(key, key if key > 0 else None)
+        if values is not None or real is None:
+            continue
+        row = conn.execute(
+            "SELECT billboard_id, client_name, start_date FROM contracts WHERE id = ? AND archived_at IS NOT NULL",
+            (real,),
+        ).fetchone()
+        target = live.get(row[0]) if row else None
+        if target is None or row[0] in restored or (target[client], target[start]) != tuple(row[1:]):
+            continue
+        current = conn.execute(
+            "SELECT id, client_name, start_date, paid_total FROM contracts "
+            "WHERE billboard_id = ? AND archived_at IS NULL", (row[0],),
+        ).fetchone()
+        if current is not None:
+            if tuple(current[1:3]) == tuple(row[1:]):
+                continue
+            if current[3]:
+                conn.execute(
+                    "UPDATE contracts SET archived_at = ? WHERE id = ?",
+                    (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), current[0]),
+                )
+                displaced.append(current[0])
+            else:
+                conn.execute("DELETE FROM contracts WHERE id = ?", (current[0],))
+        conn.execute(_RESTORE_IN_PLACE, target + [real])
+        moved.add(key)
+        restored.add(row[0])
+    return moved, restored, displaced
+
+
+def apply_changes(conn, changeset, id_map):
+    """Write a change set inside the caller's transaction.
+
+    `id_map` maps temporary (negative) archive ids to the ids SQLite
+    assigned; it is updated with rows inserted here. A change set carrying
+    'journal' meta ({'session', 'label'}) is recorded cell by cell in the
+    change journal, in the same transaction; its action id is returned.
+    """
+    live, archive = changeset['live'], changeset['archive']
+    meta = changeset.get('journal')
+    if meta is not None:
+        meta = dict(meta)     # a retried write records afresh
+        def real_ids():
+            return [id_map.get(k, k if k > 0 else None) for k in archive]
+        before = journal.read_rows(conn, 'live', live), journal.read_rows(conn, 'archive', real_ids())
+    _ensure_boards(conn, (v[0] for v in live.values() if v is not None))
+    _ensure_boards(conn, (v[0] for v in archive.values() if v is not None))
+    moved, restored, displaced = _move_in_place(conn, live, archive, id_map)
+
+    upserts = [v for k, v in live.items() if v is not None and k not in restored]
+    displaced += roll_over(conn, upserts)
+    conn.executemany(LIVE_UPSERT, upserts)
+    conn.executemany(
+        "DELETE FROM contracts WHERE billboard_id = ? AND archived_at IS NULL",
+        ((k,) for k, v in live.items() if v is None),
+    )
+
+    for key, values in archive.items():
+        real = id_map.get(key, key if key > 0 else None)
+        if key in moved:
+            continue
+        if values is None:
+            if real is not None:
+                conn.execute("DELETE FROM contracts WHERE id = ? AND archived_at IS NOT NULL", (real,))
+        elif real is None:
+            # new archive rows take their id from SQLite, never from the frame
+            id_map[key] = conn.execute(_ARCHIVE_INSERT, values).lastrowid
+        else:
+            conn.execute(_ARCHIVE_UPSERT, [real] + values)
+
+    if changeset['summary'] is not None:
+        conn.execute("DELETE FROM summary")
+        conn.executemany('INSERT INTO summary ("Total Boards") VALUES (?)', ((v,) for v in changeset['summary']))
+
+    if meta is not None:
+        journal.record(conn, meta, 'live', before[0], journal.read_rows(conn, 'live', live))
+        # contracts archived to make way for another were not in the archive before
+        journal.record(conn, meta, 'archive', before[1], journal.read_rows(conn, 'archive', real_ids() + displaced))
+        return meta.get('action_id')
+
+
+def resolve_archive_ids(saved_df, baseline, id_map):
+    """Swap temporary archive ids for real ones once their rows are written."""
+    if saved_df is None or ARCHIVE_KEY not in saved_df.columns or not id_map:
+        return False
+    ids = saved_df[ARCHIVE_KEY]
+    temp = ids.notna() & (ids < 0) & ids.isin(list(id_map))
+    if not temp.any():
+        return False
+    saved_df.loc[temp, ARCHIVE_KEY] = ids[temp].map(id_map).astype('Int64')
+    if baseline is not None and baseline.get('saveddata') is not None:
+        hashes = baseline['saveddata']
+        baseline['saveddata'] = hashes.rename(index=lambda k: id_map.get(k, k))
+    return True
+
+
+def save_to_db(dashboard_df, summary_df, saved_df, baseline=None):
+    """Write only the rows that changed since `baseline`, in one transaction.
+
+    New archive rows get their Archive ID assigned in place. Returns the new
+    baseline. `dashboard_df` may hold any subset of boards (e.g. one page);
+    only boards in the baseline but missing from the frame are deleted, so
+    without a baseline every row is simply upserted.
+    """
+    changeset, new_baseline = changes(dashboard_df, summary_df, saved_df, baseline)
+    id_map = {}
+    with transaction() as conn:
+        apply_changes(conn, changeset, id_map)
+    resolve_archive_ids(saved_df, new_baseline, id_map)
+    return new_baseline
+
+
+def rewrite_db(dashboard_df, summary_df, saved_df):
+    """Write every row and delete every contract not in the frames. Admin-only; use save_to_db otherwise.
+
+    Live rows are matched by board and archived rows by Archive ID, so
+    contracts that survive keep their ids and payments.
+    """
+    changeset, new_baseline = changes(dashboard_df, summary_df, saved_df)
+    id_map = {}
+    with transaction() as conn:
+        on_disk = [r[0] for r in conn.execute("SELECT billboard_id FROM contracts WHERE archived_at IS NULL")]
+        changeset['live'].update({b: None for b in on_disk if b not in changeset['live']})
+        apply_changes(conn, changeset, id_map)
+    resolve_archive_ids(saved_df, new_baseline, id_map)
+    return new_baseline
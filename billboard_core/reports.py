@@ -0,0 +1,94 @@
+import re
+from datetime import datetime
+
+import pandas as pd
+
+from .persistence import ARCHIVED_AT, ARCHIVE_KEY, CONTRACTS_SELECT, to_ui_frame
+from .schema import STATUS_SQL, has_search_index
+
+
+# -------------------- TEXT SEARCH --------------------
+def _fts_query(text):
+    # every word must match as a prefix, e.g. "ali kh" -> "ali"* "kh"*
+    words = re.findall(r"\w+", str(text))
+    return " ".join(f'"{w}"*' for w in words)
+
+
+def search_clause(conn, text, params, alias="c"):
+    """WHERE fragment matching client/company/location/billboard ID against `text`.
+
+    Uses the contracts_fts index when the database has one, else falls back
+    to a LIKE scan. Adds its parameters to `params` (a dict).
+    """
+    query = _fts_query(text)
+    if query and has_search_index(conn):
+        params['fts'] = query
+        return f"{alias}.id IN (SELECT rowid FROM contracts_fts WHERE contracts_fts MATCH :fts)"
+    params['search'] = f"%{text}%"
+    return (
+        f"({alias}.client_name LIKE :search OR {alias}.company_name LIKE :search "
+        f"OR {alias}.location LIKE :search OR {alias}.billboard_code LIKE :search)"
+    )
+
+
+# -------------------- SUMMARY --------------------
+def summary_metrics(conn):
+    """Total / booked / available board counts."""
+    total = conn.execute("SELECT COUNT(*) FROM billboards").fetchone()[0]
+    booked = conn.execute(
+        "SELECT COUNT(*) FROM contracts WHERE archived_at IS NULL "
+        "AND billboard_id IS NOT NULL AND TRIM(COALESCE(client_name, '')) <> ''"
+    ).fetchone()[0]
+    return {'total': total, 'booked': booked, 'available': total - booked}
+
+
+def contract_filter(conn, statuses=None, search=None, start_from=None, end_by=None,
+                    archived=None, alert_days=7, today=None):
+    """(" WHERE ..." or "", params) over contracts aliased `c`.
+
+    archived=True/False restricts to archived/live contracts; None keeps both.
+    """
+    today = pd.Timestamp(today or datetime.today().date()).normalize()
+    params = {
+        'today': today.strftime('%Y-%m-%d'),
+        'soon': (today + pd.Timedelta(days=int(alert_days))).strftime('%Y-%m-%d'),
+    }
+    clauses = []
+    if archived is not None:
+        clauses.append("c.archived_at IS NOT NULL" if archived else "c.archived_at IS NULL")
+    if statuses:
+        clauses.append("(" + " OR ".join(STATUS_SQL[s] for s in statuses) + ")")
+    if search:
+        clauses.append(search_clause(conn, search, params))
+    if start_from:
+        params['start_from'] = pd.Timestamp(start_from).strftime('%Y-%m-%d')
+        clauses.append("c.start_date >= :start_from")
+    if end_by:
+        params['end_by'] = pd.Timestamp(end_by).strftime('%Y-%m-%d')
+        clauses.append("c.end_date <= :end_by")
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def summary_page(conn, search=None, start_from=None, end_by=None, page=1, page_size=100):
+    """One page of live + archived contracts matching the Summary filters, plus the match count."""
+    where, params = contract_filter(conn, search=search, start_from=start_from, end_by=end_by)
+    total = conn.execute("SELECT COUNT(*) FROM contracts c" + where, params).fetchone()[0]
+    params.update(limit=int(page_size), offset=max(int(page) - 1, 0) * int(page_size))
+    df = pd.read_sql_query(
+        CONTRACTS_SELECT + where
+        + " ORDER BY c.archived_at IS NOT NULL, c.billboard_id, c.id LIMIT :limit OFFSET :offset",
+        conn, params=params,
+    )
+    df = to_ui_frame(df)
+    # Archive ID only identifies archived rows
+    df[ARCHIVE_KEY] = df[ARCHIVE_KEY].where(df[ARCHIVED_AT].notna()).astype('Int64')
+    return df, total
+
+
+def live_contracts(conn, statuses=None, alert_days=7, today=None):
+    """Live contracts in the given status buckets, in board order."""
+    where, params = contract_filter(
+        conn, statuses=statuses, archived=False, alert_days=alert_days, today=today
+    )
+    df = pd.read_sql_query(CONTRACTS_SELECT + where + " ORDER BY c.billboard_id", conn, params=params)
+    return to_ui_frame(df).drop(columns=[ARCHIVED_AT, ARCHIVE_KEY])
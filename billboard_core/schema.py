@@ -0,0 +1,662 @@
+import sqlite3
+from datetime import date, datetime
+
+
+# -------------------- CONFIG --------------------
+DB_PATH = "billboards.db"
+DEFAULT_COLS = [
+    'Billboard Number', 'Billboard ID', 'Location', 'Billboard Size',
+    'Client Name', 'Company Name', 'Contact Number', 'Email',
+    'Contract Start Date', 'Contract End Date', 'Rental Duration',
+    'Rent Amount (PKR)', 'Advance Received (PKR)', 'Balance / Credit (PKR)',
+    'Payment Status', 'Contract Status', 'Days Remaining',
+    'Remarks / Notes', 'Image / Link', 'Partner’s share'
+]
+MAX_BOARDS = 50
+PAYMENT_STATUSES = ['Pending', 'Paid', 'Partial', 'Overdue']
+CONTRACT_STATUSES = ['Active', 'Completed', 'Cancelled']
+
+SCHEMA_VERSION = 8
+
+# UI column -> contracts column
+CONTRACT_COLUMNS = {
+    'Billboard ID': 'billboard_code',
+    'Location': 'location',
+    'Billboard Size': 'billboard_size',
+    'Client Name': 'client_name',
+    'Company Name': 'company_name',
+    'Contact Number': 'contact_number',
+    'Email': 'email',
+    'Contract Start Date': 'start_date',
+    'Contract End Date': 'end_date',
+    'Rental Duration': 'rental_duration',
+    'Rent Amount (PKR)': 'rent_amount',
+    'Advance Received (PKR)': 'advance_received',
+    'Balance / Credit (PKR)': 'balance',
+    'Payment Status': 'payment_status',
+    'Contract Status': 'contract_status',
+    'Days Remaining': 'days_remaining',
+    'Remarks / Notes': 'remarks',
+    'Image / Link': 'image_link',
+    'Partner’s share': 'partner_share',
+}
+DATE_COLUMNS = {'start_date', 'end_date'}
+REAL_COLUMNS = {'rent_amount', 'advance_received', 'balance'}
+INTEGER_COLUMNS = {'days_remaining'}
+DATA_COLUMNS = list(CONTRACT_COLUMNS.values())
+
+# Status buckets over live contracts aliased `c`: the same buckets as
+# status.compute_statuses, expressed over the indexed end_date
+STATUS_SQL = {
+    'Available': "c.end_date IS NULL",
+    'Expired': "c.end_date < :today",
+    'Expiring Soon': "c.end_date BETWEEN :today AND :soon",
+    'Booked': "c.end_date > :soon",
+}
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS billboards (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    location TEXT NOT NULL,
+    width REAL,
+    height REAL,
+    is_digital INTEGER DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS contracts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    billboard_id INTEGER REFERENCES billboards(id),
+    billboard_code TEXT,
+    location TEXT,
+    billboard_size TEXT,
+    client_name TEXT,
+    company_name TEXT,
+    contact_number TEXT,
+    email TEXT,
+    start_date DATE,
+    end_date DATE,
+    rental_duration TEXT,
+    rent_amount REAL,
+    advance_received REAL,
+    balance REAL,
+    payment_status TEXT,
+    contract_status TEXT,
+    days_remaining INTEGER,
+    remarks TEXT,
+    image_link TEXT,
+    partner_share TEXT,
+    archived_at TIMESTAMP
+);
+
+-- one live (non-archived) contract per board
+CREATE UNIQUE INDEX IF NOT EXISTS ux_contracts_live_board
+    ON contracts (billboard_id) WHERE archived_at IS NULL;
+CREATE INDEX IF NOT EXISTS ix_contracts_board ON contracts (billboard_id, archived_at);
+CREATE INDEX IF NOT EXISTS ix_contracts_client ON contracts (client_name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS ix_contracts_start ON contracts (start_date);
+CREATE INDEX IF NOT EXISTS ix_contracts_end ON contracts (end_date);
+
+CREATE TABLE IF NOT EXISTS summary (
+    "Total Boards" INTEGER
+);
+"""
+
+# v2: full-text index over the searchable contract fields, kept in sync by triggers
+SEARCH_COLUMNS = ['client_name', 'company_name', 'location', 'billboard_code']
+_search_cols = ", ".join(SEARCH_COLUMNS)
+_new_cols = ", ".join("new." + c for c in SEARCH_COLUMNS)
+_old_cols = ", ".join("old." + c for c in SEARCH_COLUMNS)
+SEARCH_SQL = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS contracts_fts USING fts5(
+    {_search_cols}, content='contracts', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS contracts_fts_ai AFTER INSERT ON contracts BEGIN
+    INSERT INTO contracts_fts (rowid, {_search_cols}) VALUES (new.id, {_new_cols});
+END;
+
+CREATE TRIGGER IF NOT EXISTS contracts_fts_ad AFTER DELETE ON contracts BEGIN
+    INSERT INTO contracts_fts (contracts_fts, rowid, {_search_cols}) VALUES ('delete', old.id, {_old_cols});
+END;
+
+CREATE TRIGGER IF NOT EXISTS contracts_fts_au AFTER UPDATE OF {_search_cols} ON contracts BEGIN
+    INSERT INTO contracts_fts (contracts_fts, rowid, {_search_cols}) VALUES ('delete', old.id, {_old_cols});
+    INSERT INTO contracts_fts (rowid, {_search_cols}) VALUES (new.id, {_new_cols});
+END;
+
+INSERT INTO contracts_fts (contracts_fts) VALUES ('rebuild');
+"""
+
+# v3: live contracts ordered by end date, for expiry alerts, and app-wide settings
+EXPIRY_SQL = """
+CREATE INDEX IF NOT EXISTS ix_contracts_live_end
+    ON contracts (end_date, billboard_id) WHERE archived_at IS NULL;
+
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# v4: payments ledger. Money totals are materialized and kept current by
+# triggers, so finance figures never scan contracts or payments:
+#   contracts.paid_total  sum of the contract's payments; balance follows it
+#   finance_live          live contracts bucketed by end date (overdue = buckets before today)
+#   finance_monthly       money received per month: payments by date, advances by start month
+#   advances              (v8) ledger of advances received, so deleting a contract keeps them
+def _partner_share(r):
+    # "10%" is a share of the rent, anything else an amount ("5,000")
+    return (
+        f"CASE WHEN instr({r}.partner_share, '%') > 0 "
+        f"THEN COALESCE({r}.rent_amount, 0) * CAST(TRIM({r}.partner_share) AS REAL) / 100 "
+        f"ELSE CAST(REPLACE({r}.partner_share, ',', '') AS REAL) END"
+    )
+
+
+def _live_bucket(r, sign):
+    # add (sign '') or take away (sign '-') one contract's share of finance_live
+    return f"""
+    INSERT INTO finance_live (end_date, contracts, rent, received, outstanding, partner_share)
+    SELECT COALESCE({r}.end_date, ''), {sign}1, {sign}COALESCE({r}.rent_amount, 0),
+           {sign}(COALESCE({r}.advance_received, 0) + {r}.paid_total),
+           {sign}MAX(COALESCE({r}.balance, 0), 0), {sign}COALESCE({_partner_share(r)}, 0)
+    WHERE {r}.archived_at IS NULL
+    ON CONFLICT(end_date) DO UPDATE SET
+        contracts = contracts + excluded.contracts, rent = rent + excluded.rent,
+        received = received + excluded.received, outstanding = outstanding + excluded.outstanding,
+        partner_share = partner_share + excluded.partner_share;
+    DELETE FROM finance_live WHERE end_date = COALESCE({r}.end_date, '') AND contracts = 0;"""
+
+
+def _received(month, amount, sign):
+    return f"""
+    INSERT INTO finance_monthly (month, received) SELECT {month}, {sign}{amount} WHERE {amount} <> 0
+    ON CONFLICT(month) DO UPDATE SET received = received + excluded.received;"""
+
+
+_ADVANCE_MONTH = "COALESCE(substr({r}.start_date, 1, 7), '')"
+# Payments outlive their contract (v7: SET NULL, was CASCADE): clearing the
+# dashboard or the archive must not rewrite the money received in past months
+_PAYMENTS_TABLE = """
+CREATE TABLE IF NOT EXISTS {name} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    contract_id INTEGER REFERENCES contracts(id) ON DELETE SET NULL,
+    paid_on DATE NOT NULL,
+    amount REAL NOT NULL,
+    method TEXT,
+    note TEXT,
+    recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);"""
+# An advance is money received once entered: the contract posts it to this
+# ledger (and a correction whenever its advance or start month changes),
+# and removing the contract leaves the entries in place
+_ADVANCE = "COALESCE({r}.advance_received, 0)"
+_ADVANCES_SQL = """
+CREATE TABLE IF NOT EXISTS advances (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    contract_id INTEGER REFERENCES contracts(id) ON DELETE SET NULL,
+    month TEXT NOT NULL,
+    amount REAL NOT NULL,
+    recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS ix_advances_contract ON advances (contract_id);"""
+
+
+def _post_advance(r, sign):
+    return f"""
+    INSERT INTO advances (contract_id, month, amount)
+    SELECT new.id, {_ADVANCE_MONTH.format(r=r)}, {sign}{_ADVANCE.format(r=r)} WHERE {_ADVANCE.format(r=r)} <> 0;"""
+
+
+_FINANCE_COLS = "end_date, rent_amount, advance_received, balance, partner_share, paid_total, archived_at"
+
+FINANCE_SQL = f"""{_PAYMENTS_TABLE.format(name='payments')}
+CREATE INDEX IF NOT EXISTS ix_payments_contract ON payments (contract_id, paid_on);
+{_ADVANCES_SQL}
+
+CREATE TABLE IF NOT EXISTS finance_live (
+    end_date TEXT PRIMARY KEY,
+    contracts INTEGER NOT NULL,
+    rent REAL NOT NULL,
+    received REAL NOT NULL,
+    outstanding REAL NOT NULL,
+    partner_share REAL NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS finance_monthly (
+    month TEXT PRIMARY KEY,
+    received REAL NOT NULL
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS payments_ai AFTER INSERT ON payments BEGIN
+    UPDATE contracts SET paid_total = paid_total + new.amount, balance = COALESCE(balance, 0) - new.amount
+    WHERE id = new.contract_id;{_received("substr(new.paid_on, 1, 7)", "new.amount", "")}
+END;
+
+CREATE TRIGGER IF NOT EXISTS payments_ad AFTER DELETE ON payments BEGIN
+    UPDATE contracts SET paid_total = paid_total - old.amount, balance = COALESCE(balance, 0) + old.amount
+    WHERE id = old.contract_id;{_received("substr(old.paid_on, 1, 7)", "old.amount", "-")}
+END;
+
+CREATE TRIGGER IF NOT EXISTS payments_au AFTER UPDATE OF contract_id, paid_on, amount ON payments BEGIN
+    UPDATE contracts SET paid_total = paid_total - old.amount, balance = COALESCE(balance, 0) + old.amount
+    WHERE id = old.contract_id;
+    UPDATE contracts SET paid_total = paid_total + new.amount, balance = COALESCE(balance, 0) - new.amount
+    WHERE id = new.contract_id;{_received("substr(old.paid_on, 1, 7)", "old.amount", "-")}{_received("substr(new.paid_on, 1, 7)", "new.amount", "")}
+END;
+
+-- balance is rent - advance - payments whenever a rent is set
+CREATE TRIGGER IF NOT EXISTS contracts_balance_au AFTER UPDATE OF rent_amount, advance_received ON contracts
+WHEN new.rent_amount IS NOT NULL BEGIN
+    UPDATE contracts SET balance = new.rent_amount - COALESCE(new.advance_received, 0) - new.paid_total
+    WHERE id = new.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS advances_ai AFTER INSERT ON advances BEGIN{_received("new.month", "new.amount", "")}
+END;
+
+CREATE TRIGGER IF NOT EXISTS finance_live_ai AFTER INSERT ON contracts BEGIN{_live_bucket("new", "")}{_post_advance("new", "")}
+END;
+
+CREATE TRIGGER IF NOT EXISTS finance_live_ad AFTER DELETE ON contracts BEGIN{_live_bucket("old", "-")}
+END;
+
+CREATE TRIGGER IF NOT EXISTS finance_live_au AFTER UPDATE OF {_FINANCE_COLS} ON contracts BEGIN{_live_bucket("old", "-")}{_live_bucket("new", "")}
+END;
+
+CREATE TRIGGER IF NOT EXISTS finance_advance_au AFTER UPDATE OF advance_received, start_date ON contracts
+WHEN {_ADVANCE.format(r="old")} <> {_ADVANCE.format(r="new")}
+  OR {_ADVANCE_MONTH.format(r="old")} <> {_ADVANCE_MONTH.format(r="new")} BEGIN{_post_advance("old", "-")}{_post_advance("new", "")}
+END;
+"""
+
+# Recompute every materialized figure from contracts and the payment and advance ledgers
+FINANCE_REBUILD = [
+    "UPDATE contracts SET paid_total = COALESCE("
+    "(SELECT SUM(amount) FROM payments p WHERE p.contract_id = contracts.id), 0)",
+    "DELETE FROM finance_live",
+    f"""INSERT INTO finance_live (end_date, contracts, rent, received, outstanding, partner_share)
+    SELECT COALESCE(c.end_date, ''), COUNT(*), SUM(COALESCE(c.rent_amount, 0)),
+           SUM(COALESCE(c.advance_received, 0) + c.paid_total),
+           SUM(MAX(COALESCE(c.balance, 0), 0)), SUM(COALESCE({_partner_share("c")}, 0))
+    FROM contracts c WHERE c.archived_at IS NULL GROUP BY 1""",
+    "DELETE FROM finance_monthly",
+    """INSERT INTO finance_monthly (month, received)
+    SELECT month, SUM(amount) FROM (
+        SELECT month, amount FROM advances
+        UNION ALL
+        SELECT substr(p.paid_on, 1, 7), p.amount FROM payments p
+    ) GROUP BY month""",
+]
+
+# v5: future bookings, and every contract and booking as a (board, day range,
+# kind) box in an R*Tree, so availability and overlap checks are range lookups.
+# Days are julian day numbers; open ends run to OPEN_END (live) or the
+# archive date (archived).
+LIVE, BOOKED, ARCHIVED = 0, 1, 2
+OPEN_END = 5373483      # 9999-12-31
+
+
+def _day_sql(col):
+    return f"CAST(julianday(substr({col}, 1, 10)) AS INTEGER)"
+
+
+def _interval(r, booking=False):
+    # (id, board_min, board_max, day_min, day_max, kind_min, kind_max) for one row
+    if booking:
+        start, end, kind, rowid = _day_sql(f"{r}.start_date"), _day_sql(f"{r}.end_date"), BOOKED, f"-{r}.id"
+    else:
+        end = (f"COALESCE({_day_sql(f'{r}.end_date')}, CASE WHEN {r}.archived_at IS NULL "
+               f"THEN {OPEN_END} ELSE {_day_sql(f'{r}.archived_at')} END)")
+        start = f"COALESCE({_day_sql(f'{r}.start_date')}, CASE WHEN {r}.archived_at IS NULL THEN 0 ELSE {end} END)"
+        kind = f"CASE WHEN {r}.archived_at IS NULL THEN {LIVE} ELSE {ARCHIVED} END"
+        rowid = f"{r}.id"
+    return (f"{rowid}, {r}.billboard_id, {r}.billboard_id, MIN({start}, {end}), MAX({start}, {end}), "
+            f"{kind}, {kind}")
+
+
+CALENDAR_COLUMNS = "id, board_min, board_max, day_min, day_max, kind_min, kind_max"
+# the same boxes computed from the tables; the fallback when SQLite lacks R*Tree
+INTERVALS_SQL = f"""
+WITH intervals ({CALENDAR_COLUMNS}) AS (
+    SELECT {_interval("c")} FROM contracts c WHERE c.billboard_id IS NOT NULL
+    UNION ALL
+    SELECT {_interval("k", booking=True)} FROM bookings k
+)
+SELECT * FROM intervals
+"""
+
+BOOKINGS_SQL = """
+CREATE TABLE IF NOT EXISTS bookings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    billboard_id INTEGER NOT NULL REFERENCES billboards(id),
+    client_name TEXT,
+    company_name TEXT,
+    contact_number TEXT,
+    start_date DATE NOT NULL,
+    end_date DATE NOT NULL,
+    rent_amount REAL,
+    remarks TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CHECK (end_date >= start_date)
+);
+CREATE INDEX IF NOT EXISTS ix_bookings_start ON bookings (start_date);
+"""
+
+CALENDAR_SQL = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS board_calendar USING rtree_i32({CALENDAR_COLUMNS});
+
+CREATE TRIGGER IF NOT EXISTS calendar_contracts_ai AFTER INSERT ON contracts
+WHEN new.billboard_id IS NOT NULL BEGIN
+    INSERT INTO board_calendar ({CALENDAR_COLUMNS}) VALUES ({_interval("new")});
+END;
+
+CREATE TRIGGER IF NOT EXISTS calendar_contracts_ad AFTER DELETE ON contracts BEGIN
+    DELETE FROM board_calendar WHERE id = old.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS calendar_contracts_au
+AFTER UPDATE OF billboard_id, start_date, end_date, archived_at ON contracts BEGIN
+    DELETE FROM board_calendar WHERE id = old.id;
+    INSERT INTO board_calendar ({CALENDAR_COLUMNS}) SELECT {_interval("new")} WHERE new.billboard_id IS NOT NULL;
+END;
+
+CREATE TRIGGER IF NOT EXISTS calendar_bookings_ai AFTER INSERT ON bookings BEGIN
+    INSERT INTO board_calendar ({CALENDAR_COLUMNS}) VALUES ({_interval("new", booking=True)});
+END;
+
+CREATE TRIGGER IF NOT EXISTS calendar_bookings_ad AFTER DELETE ON bookings BEGIN
+    DELETE FROM board_calendar WHERE id = -old.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS calendar_bookings_au AFTER UPDATE OF billboard_id, start_date, end_date ON bookings BEGIN
+    DELETE FROM board_calendar WHERE id = -old.id;
+    INSERT INTO board_calendar ({CALENDAR_COLUMNS}) VALUES ({_interval("new", booking=True)});
+END;
+
+INSERT INTO board_calendar ({CALENDAR_COLUMNS}) {INTERVALS_SQL};
+"""
+
+# v6: append-only change journal. Every write made for a user action is
+# recorded cell by cell (old and new value) under one journal_actions row;
+# undo and redo are actions too, so nothing is ever updated or deleted.
+# A checkpoint holds a row's full state before one of its events, so any
+# past state is rebuilt by replaying the events after the nearest one
+JOURNAL_SQL = """
+CREATE TABLE IF NOT EXISTS journal_actions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    at TIMESTAMP NOT NULL,
+    session TEXT,
+    label TEXT NOT NULL,
+    kind TEXT NOT NULL DEFAULT 'do' CHECK (kind IN ('do', 'undo', 'redo')),
+    reverts INTEGER REFERENCES journal_actions(id)
+);
+CREATE INDEX IF NOT EXISTS ix_journal_actions_session ON journal_actions (session, id);
+
+CREATE TABLE IF NOT EXISTS journal (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    action_id INTEGER NOT NULL REFERENCES journal_actions(id),
+    target TEXT NOT NULL CHECK (target IN ('live', 'archive')),
+    row_key INTEGER NOT NULL,
+    board INTEGER,
+    col TEXT NOT NULL,
+    old_value,
+    new_value
+);
+CREATE INDEX IF NOT EXISTS ix_journal_row ON journal (target, row_key, id);
+CREATE INDEX IF NOT EXISTS ix_journal_board ON journal (board, id);
+CREATE INDEX IF NOT EXISTS ix_journal_action ON journal (action_id, id);
+
+CREATE TABLE IF NOT EXISTS journal_checkpoints (
+    target TEXT NOT NULL,
+    row_key INTEGER NOT NULL,
+    before_event INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    PRIMARY KEY (target, row_key, before_event)
+) WITHOUT ROWID;
+"""
+
+# Insert or update the live contract on a board (one per board while
+# archived_at IS NULL). Run roll_over() on the same rows first, so a
+# different contract never takes over the previous one's id and payments.
+LIVE_UPSERT = (
+    f"INSERT INTO contracts (billboard_id, {', '.join(DATA_COLUMNS)}) "
+    f"VALUES ({', '.join('?' * (len(DATA_COLUMNS) + 1))}) "
+    f"ON CONFLICT(billboard_id) WHERE archived_at IS NULL DO UPDATE SET "
+    + ", ".join(f"{c}=excluded.{c}" for c in DATA_COLUMNS)
+)
+
+# A board's live contract with a client, about to be replaced by one for a
+# different client or start date: it is archived, keeping its id and payments
+LIVE_ROLLOVER = (
+    "UPDATE contracts SET archived_at = ? WHERE billboard_id = ? AND archived_at IS NULL "
+    "AND TRIM(COALESCE(client_name, '')) <> '' "
+    "AND (TRIM(COALESCE(client_name, '')) <> TRIM(COALESCE(?, '')) OR start_date IS NOT ?) "
+    "RETURNING id"
+)
+_CLIENT, _START = DATA_COLUMNS.index('client_name') + 1, DATA_COLUMNS.index('start_date') + 1
+
+LEGACY_TABLES = ('dashboard', 'saveddata')
+
+
+def roll_over(conn, rows):
+    """Archive the live contracts that LIVE_UPSERT `rows` would replace with a new one.
+
+    `rows` are LIVE_UPSERT parameter lists (board first). Editing a
+    contract keeps its row; a new client or start date on the board means
+    a new contract, so the old one moves to the archive with its payments
+    and the upsert then inserts a fresh row. Returns the archived ids.
+    """
+    at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    archived = []
+    for values in rows:
+        start = values[_START]
+        row = conn.execute(
+            LIVE_ROLLOVER, (at, values[0], values[_CLIENT], start.isoformat() if isinstance(start, date) else start),
+        ).fetchone()
+        if row is not None:
+            archived.append(row[0])
+    return archived
+
+
+# -------------------- SCHEMA --------------------
+def _tables(conn):
+    return {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+
+
+def _statements(script):
+    # executescript() would commit the open transaction, so split by hand;
+    # complete_statement keeps trigger bodies in one piece
+    stmt = ""
+    for line in script.splitlines(keepends=True):
+        stmt += line
+        if sqlite3.complete_statement(stmt):
+            yield stmt
+            stmt = ""
+
+
+def has_search_index(conn):
+    return 'contracts_fts' in _tables(conn)
+
+
+def has_calendar_index(conn):
+    return 'board_calendar' in _tables(conn)
+
+
+def _create_tables(conn, n_boards):
+    legacy = _tables(conn) & set(LEGACY_TABLES)
+    for stmt in _statements(SCHEMA_SQL):
+        conn.execute(stmt)
+    if legacy:
+        _migrate_legacy(conn)
+    conn.executemany(
+        "INSERT OR IGNORE INTO billboards (id, name, location) VALUES (?, ?, '')",
+        ((n, f"Billboard {n}") for n in range(1, n_boards + 1)),
+    )
+    if conn.execute("SELECT COUNT(*) FROM summary").fetchone()[0] == 0:
+        conn.execute('INSERT INTO summary ("Total Boards") VALUES (?)', (n_boards,))
+
+
+def _create_search_index(conn):
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)")
+        conn.execute("DROP TABLE temp.fts5_probe")
+    except sqlite3.OperationalError:
+        return  # SQLite built without FTS5: searches fall back to LIKE
+    for stmt in _statements(SEARCH_SQL):
+        conn.execute(stmt)
+
+
+def _create_expiry_index(conn):
+    for stmt in _statements(EXPIRY_SQL):
+        conn.execute(stmt)
+
+
+def _create_finance(conn):
+    columns = {r[1] for r in conn.execute("PRAGMA table_info(contracts)")}
+    if 'paid_total' not in columns:
+        conn.execute("ALTER TABLE contracts ADD COLUMN paid_total REAL NOT NULL DEFAULT 0")
+    for stmt in _statements(FINANCE_SQL):
+        conn.execute(stmt)
+    for stmt in FINANCE_REBUILD:
+        conn.execute(stmt)
+
+
+def _create_calendar(conn):
+    for stmt in _statements(BOOKINGS_SQL):
+        conn.execute(stmt)
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp.rtree_probe USING rtree_i32(id, a, b)")
+        conn.execute("DROP TABLE temp.rtree_probe")
+    except sqlite3.OperationalError:
+        return  # SQLite built without R*Tree: availability falls back to INTERVALS_SQL
+    for stmt in _statements(CALENDAR_SQL):
+        conn.execute(stmt)
+
+
+def _create_journal(conn):
+    for stmt in _statements(JOURNAL_SQL):
+        conn.execute(stmt)
+
+
+def _keep_payments(conn):
+    # SQLite cannot change a foreign key in place: rebuild payments with
+    # ON DELETE SET NULL. Dropping the old table fires none of its triggers,
+    # which are then recreated from FINANCE_SQL along with its index.
+    actions = [r[6] for r in conn.execute("PRAGMA foreign_key_list(payments)")]
+    if actions == ['SET NULL']:
+        return
+    conn.execute(_PAYMENTS_TABLE.format(name='payments_v7'))
+    conn.execute("INSERT INTO payments_v7 SELECT id, contract_id, paid_on, amount, method, note, recorded_at FROM payments")
+    conn.execute("DROP TABLE payments")
+    conn.execute("ALTER TABLE payments_v7 RENAME TO payments")
+    for stmt in _statements(FINANCE_SQL):
+        conn.execute(stmt)
+
+
+def _ledger_advances(conn):
+    # finance_monthly took advances from the contract rows, so deleting one
+    # took its advance back out; move them to the advances ledger instead
+    for name in ('finance_live_ai', 'finance_live_ad', 'finance_advance_au'):
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    for stmt in _statements(FINANCE_SQL):
+        conn.execute(stmt)
+    conn.execute(
+        f"INSERT INTO advances (contract_id, month, amount) "
+        f"SELECT c.id, {_ADVANCE_MONTH.format(r='c')}, c.advance_received FROM contracts c "
+        f"WHERE {_ADVANCE.format(r='c')} <> 0 AND NOT EXISTS (SELECT 1 FROM advances a WHERE a.contract_id = c.id)"
+    )
+    for stmt in FINANCE_REBUILD:
+        conn.execute(stmt)
+
+
+MIGRATIONS = [
+    (1, _create_tables),
+    (2, lambda conn, n_boards: _create_search_index(conn)),
+    (3, lambda conn, n_boards: _create_expiry_index(conn)),
+    (4, lambda conn, n_boards: _create_finance(conn)),
+    (5, lambda conn, n_boards: _create_calendar(conn)),
+    (6, lambda conn, n_boards: _create_journal(conn)),
+    (7, lambda conn, n_boards: _keep_payments(conn)),
+    (8, lambda conn, n_boards: _ledger_advances(conn)),
+]
+
+
+def ensure_schema(conn, n_boards=MAX_BOARDS):
+    """Create or upgrade the typed schema, migrating legacy text tables on first open."""
+    conn.execute("PRAGMA foreign_keys = ON")
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return
+    in_tx = conn.in_transaction
+    if not in_tx:
+        conn.execute("BEGIN IMMEDIATE")
+    try:
+        for target, step in MIGRATIONS:
+            if version < target:
+                step(conn, n_boards)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        if not in_tx:
+            conn.execute("COMMIT")
+    except Exception:
+        if not in_tx:
+            conn.execute("ROLLBACK")
+        raise
+
+
+# -------------------- LEGACY MIGRATION --------------------
+def _migrate_legacy(conn):
+    """Copy the old untyped dashboard/saveddata tables into contracts."""
+    import pandas as pd
+
+    from .frames import is_blank, sql_value, to_board_number, to_contract_frame
+
+    counts = {}
+    for table in LEGACY_TABLES:
+        if table not in _tables(conn):
+            continue
+        df = pd.read_sql_query(f'SELECT * FROM "{table}"', conn)
+        if 'Billboard Number' not in df.columns:
+            df['Billboard Number'] = None
+        rec = to_contract_frame(df)
+        rec['billboard_id'] = [to_board_number(v) for v in df['Billboard Number']]
+        data_cols = list(CONTRACT_COLUMNS.values())
+        if table == 'dashboard':
+            rec['archived_at'] = None
+            rec = rec[~rec[data_cols].isna().all(axis=1) & rec['billboard_id'].notna()]
+            rec = rec.drop_duplicates('billboard_id', keep='first')
+        else:
+            archived = df.get('Archived At', pd.Series(None, index=df.index))
+            rec['archived_at'] = [
+                None if is_blank(v) else str(v) for v in archived
+            ]
+            rec['archived_at'] = rec['archived_at'].fillna(datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+
+        boards = sorted({int(b) for b in rec['billboard_id'].dropna()})
+        conn.executemany(
+            "INSERT OR IGNORE INTO billboards (id, name, location) VALUES (?, ?, '')",
+            ((b, f"Billboard {b}") for b in boards),
+        )
+        cols = ['billboard_id'] + data_cols + ['archived_at']
+        conn.executemany(
+            f"INSERT INTO contracts ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+            ([sql_value(v) for v in r] for r in rec[cols].itertuples(index=False, name=None)),
+        )
+        conn.execute(f'ALTER TABLE "{table}" RENAME TO "legacy_{table}"')
+        counts[table] = len(rec)
+    return counts
+
+
+def migrate(db_path=DB_PATH):
+    """One-shot upgrade of an existing billboards.db; returns row counts."""
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        before = conn.execute("PRAGMA user_version").fetchone()[0]
+        ensure_schema(conn)
+        live = conn.execute("SELECT COUNT(*) FROM contracts WHERE archived_at IS NULL").fetchone()[0]
+        archived = conn.execute("SELECT COUNT(*) FROM contracts WHERE archived_at IS NOT NULL").fetchone()[0]
+        return {'from_version': before, 'to_version': SCHEMA_VERSION, 'live': live, 'archived': archived}
+    finally:
+        conn.close()
@@ -0,0 +1,44 @@
+from .db import commit
+
+
+ALERT_DAYS = 'alert_days'
+PERF_ENABLED = 'perf_enabled'
+PERF_SLOW_MS = 'perf_slow_ms'
+DEFAULTS = {ALERT_DAYS: 7, PERF_ENABLED: 0, PERF_SLOW_MS: 500}
+
+
+def get_setting(conn, key, default=None):
+    row = conn.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+    if row is None:
+        return DEFAULTS.get(key, default)
+    return row[0]
+
+
+def set_setting(conn, key, value):
+    conn.execute("BEGIN IMMEDIATE")
+    conn.execute(
+        "INSERT INTO settings (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        (key, str(value)),
+    )
+    commit(conn)
+
+
+def alert_days(conn):
+    """The "Alert before expiry" window shared by the app and the alert job."""
+    try:
+        return max(int(get_setting(conn, ALERT_DAYS)), 0)
+    except (TypeError, ValueError):
+        return DEFAULTS[ALERT_DAYS]
+
+
+def perf_settings(conn):
+    """(timing on?, slow-operation threshold in ms) from the Admin Performance section."""
+    try:
+        enabled = int(get_setting(conn, PERF_ENABLED)) != 0
+    except (TypeError, ValueError):
+        enabled = False
+    try:
+        slow_ms = max(float(get_setting(conn, PERF_SLOW_MS)), 1.0)
+    except (TypeError, ValueError):
+        slow_ms = float(DEFAULTS[PERF_SLOW_MS])
+    return enabled, slow_ms
@@ -0,0 +1,104 @@
+import heapq
+
+
+FREE, OCCUPIED, MISSING = 0, 1, 2
+
+
+class SlotIndex:
+    """Free/occupied board numbers: a bitset plus a min-heap of free slots.
+
+    The heap is cleaned lazily: occupying a slot only flips its flag, and
+    stale heap entries are discarded when they reach the top. first_free,
+    allocate and release are O(log n); is_free is O(1).
+    """
+
+    def __init__(self, board_numbers=(), occupied=()):
+        boards = [int(n) for n in board_numbers]
+        size = max(boards, default=0) + 1
+        self._flags = bytearray([MISSING]) * size
+        for n in boards:
+            self._flags[n] = FREE
+        for n in occupied:
+            n = int(n)
+            if 0 < n < size and self._flags[n] == FREE:
+                self._flags[n] = OCCUPIED
+        self._heap = [n for n in boards if self._flags[n] == FREE]
+        heapq.heapify(self._heap)
+        self._n_free = len(self._heap)
+        self._n_boards = len(set(boards))
+
+    @classmethod
+    def from_db(cls, conn):
+        boards = [r[0] for r in conn.execute("SELECT id FROM billboards")]
+        occupied = [
+            r[0] for r in conn.execute(
+                "SELECT billboard_id FROM contracts WHERE archived_at IS NULL AND billboard_id IS NOT NULL"
+            )
+        ]
+        return cls(boards, occupied)
+
+    def copy(self):
+        """Independent copy (the bitset and heap are copied, not shared)."""
+        other = object.__new__(SlotIndex)
+        other._flags = bytearray(self._flags)
+        other._heap = list(self._heap)
+        other._n_free = self._n_free
+        other._n_boards = self._n_boards
+        return other
+
+    def __len__(self):
+        return self._n_boards
+
+    @property
+    def n_free(self):
+        return self._n_free
+
+    def exists(self, n):
+        n = int(n)
+        return 0 < n < len(self._flags) and self._flags[n] != MISSING
+
+    def is_free(self, n):
+        n = int(n)
+        return 0 < n < len(self._flags) and self._flags[n] == FREE
+
+    def first_free(self):
+        heap = self._heap
+        while heap and self._flags[heap[0]] != FREE:
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def occupy(self, n):
+        n = int(n)
+        if self.is_free(n):
+            self._flags[n] = OCCUPIED
+            self._n_free -= 1
+
+    def release(self, n):
+        n = int(n)
+        if 0 < n < len(self._flags) and self._flags[n] == OCCUPIED:
+            self._flags[n] = FREE
+            self._n_free += 1
+            heapq.heappush(self._heap, n)
+            if len(self._heap) > 2 * self._n_free + 64:
+                self._compact()
+
+    def allocate(self):
+        n = self.first_free()
+        if n is not None:
+            self.occupy(n)
+        return n
+
+    def allocate_many(self, count):
+        """Take the `count` lowest free slots, or none at all if there aren't enough."""
+        if count > self._n_free:
+            return []
+        return [self.allocate() for _ in range(count)]
+
+    def set_occupied(self, n, occupied):
+        if occupied:
+            self.occupy(n)
+        else:
+            self.release(n)
+
+    def _compact(self):
+        self._heap = sorted({n for n in self._heap if self._flags[n] == FREE})
@@ -0,0 +1,64 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+
+STATUSES = ['Available', 'Expired', 'Expiring Soon', 'Booked', 'Unknown']
+
+
+def compute_status(end_val, alert_days_local):
+    try:
+        if pd.isna(end_val) or str(end_val).strip() == "":
+            return 'Available'
+        end_dt = pd.to_datetime(end_val)
+    except:
+        return 'Unknown'
+
+    today = pd.Timestamp(datetime.today().date())
+    if end_dt < today:
+        return 'Expired'
+    if end_dt <= today + pd.Timedelta(days=alert_days_local):
+        return 'Expiring Soon'
+    return 'Booked'
+
+
+def compute_statuses(end_dates, alert_days, today=None):
+    """Vectorised compute_status over a whole column.
+
+    Returns (status, days_remaining) Series aligned with `end_dates`: a
+    categorical over STATUSES and nullable Int64 days.
+    """
+    today = pd.Timestamp(today or datetime.today().date()).normalize()
+    end = pd.Series(end_dates)
+    if pd.api.types.is_datetime64_any_dtype(end):
+        parsed = end
+        blank = end.isna()
+    else:
+        blank = end.isna() | end.astype(str).str.strip().eq("")
+        parsed = pd.to_datetime(end.where(~blank), errors='coerce', format='mixed')
+    parsed = parsed.dt.normalize()
+
+    days = (parsed - today).dt.days
+    status = np.select(
+        [blank, parsed.isna(), days < 0, days <= alert_days],
+        ['Available', 'Unknown', 'Expired', 'Expiring Soon'],
+        default='Booked',
+    )
+    return (
+        pd.Series(pd.Categorical(status, categories=STATUSES), index=end.index),
+        days.astype('Int64'),
+    )
+
+
+def cached_statuses(cache, version, end_dates, alert_days, today=None):
+    """compute_statuses memoised on (data version, today, alert_days).
+
+    `cache` is any dict the caller keeps alive (e.g. Streamlit session state).
+    """
+    today = pd.Timestamp(today or datetime.today().date()).normalize()
+    key = (version, today, int(alert_days))
+    if cache.get('key') != key:
+        cache['status'], cache['days'] = compute_statuses(end_dates, alert_days, today)
+        cache['key'] = key
+    return cache['status'], cache['days']
@@ -0,0 +1,56 @@
+"""Bulk-import live contracts from a CSV or XLSX file.
+
+    python import_contracts.py contracts.csv
+    python import_contracts.py city.xlsx --sheet Lahore --replace --errors errors.csv
+    python import_contracts.py contracts.csv --dry-run
+
+Headers are matched to the dashboard columns (Billboard Number is
+required). Rejected rows are listed in the --errors CSV report.
+"""
+import argparse
+import sys
+
+from billboard_core.db import close_all
+from billboard_core.importer import BATCH_ROWS, import_contracts
+from billboard_core.schema import DB_PATH
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help="CSV or XLSX file")
+    parser.add_argument('--sheet', help="XLSX sheet name (default: the active sheet)")
+    parser.add_argument('--replace', action='store_true', help="replace contracts on boards that already have one")
+    parser.add_argument('--dry-run', action='store_true', help="validate only, write nothing")
+    parser.add_argument('--errors', default='import_errors.csv', help="per-row error report (CSV)")
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--batch', type=int, default=BATCH_ROWS, help="rows per transaction")
+    args = parser.parse_args(argv)
+
+    def progress(n):
+        print(f"\r{n:,} rows read", end='', file=sys.stderr, flush=True)
+
+    try:
+        with open(args.errors, 'w', encoding='utf-8', newline='') as report:
+            result = import_contracts(
+                args.path, sheet=args.sheet, replace=args.replace, dry_run=args.dry_run,
+                db_path=args.db, errors=report, batch_rows=args.batch, progress=progress,
+            )
+    except (ValueError, ImportError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    finally:
+        close_all()
+
+    print(file=sys.stderr)
+    verb = "would import" if args.dry_run else "imported"
+    print(f"✅ {result['rows']:,} rows read, {verb} {result['imported']:,}, "
+          f"rejected {result['rejected']:,}, new boards {result['boards_created']:,}")
+    if result['unknown_columns']:
+        print("⚠️ ignored columns:", ", ".join(result['unknown_columns']))
+    if result['rejected']:
+        print("⚠️ error report:", args.errors)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,21 +1,11 @@
-import sqlite3
-
-# اگر فائل موجود نہ ہو تو یہ خود نئی billboards.db فائل بنا دے گا
-conn = sqlite3.connect("billboards.db")
-cur = conn.cursor()
-
-# Billboard کی جدول (table) بنائیں
-cur.execute("""
-CREATE TABLE IF NOT EXISTS billboards (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    name TEXT NOT NULL,
-    location TEXT NOT NULL,
-    width REAL,
-    height REAL,
-    is_digital INTEGER DEFAULT 0
-);
-""")
-
-conn.commit()
-conn.close()
-print("✅ Database اور Table کامیابی سے بن گئے — billboards.db تیار ہے!")
+from billboard_core.db import close_all, writing
+
+# اگر فائل موجود نہ ہو تو یہ خود نئی billboards.db فائل بنا دے گا
+# writer connection کھلتے ہی WAL mode لگتا ہے اور billboards (master list), contracts اور summary کی typed tables بنتی ہیں
+try:
+    with writing() as conn:
+        mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+finally:
+    close_all()
+
+print("✅ Database اور Table کامیابی سے بن گئے — billboards.db تیار ہے! (journal mode:", mode, ")")
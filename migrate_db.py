@@ -0,0 +1,19 @@
+import os
+import sys
+
+from billboard_core.schema import DB_PATH, migrate
+
+# پرانی untyped dashboard / saveddata tables کو typed billboards + contracts میں بدلیں
+db_path = sys.argv[1] if len(sys.argv) > 1 else DB_PATH
+
+if not os.path.exists(db_path):
+    print("❌ Database فائل نہیں ملی:", db_path)
+else:
+    result = migrate(db_path)
+    if result['from_version'] >= result['to_version']:
+        print("✅ Database پہلے سے migrated ہے (schema version", result['to_version'], ")")
+    else:
+        print("✅ Migration مکمل — schema version", result['from_version'], "→", result['to_version'])
+    print(" - live contracts:", result['live'])
+    print(" - archived contracts:", result['archived'])
+    print(" - old tables kept as legacy_dashboard / legacy_saveddata")
@@ -0,0 +1,66 @@
+import pytest
+
+from billboard_core.datacache import cache_for
+from billboard_core.db import close_all, commit, open_connection
+from billboard_core.persistence import apply_changes
+from billboard_core.schema import DATA_COLUMNS, DB_PATH, ensure_schema
+
+
+N_BOARDS = 10
+
+
+def contract(board, **cells):
+    """LIVE_UPSERT / change-set values for a live contract on `board`; unnamed cells are empty."""
+    values = dict.fromkeys(DATA_COLUMNS)
+    values.update(cells)
+    return [board] + [values[c] for c in DATA_COLUMNS]
+
+
+def archived(board, archived_at='2026-01-31 12:00:00', **cells):
+    """Change-set values for an archived contract."""
+    return contract(board, **cells) + [archived_at]
+
+
+def contracts(conn, *columns):
+    """Every contract as a tuple of `columns` (default id, board, client, archived?), by id."""
+    cols = ', '.join(columns) if columns else "id, billboard_id, client_name, archived_at IS NOT NULL"
+    return conn.execute(f"SELECT {cols} FROM contracts ORDER BY id").fetchall()
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """A fresh database of N_BOARDS boards at the default DB_PATH, with the test run from its directory."""
+    monkeypatch.chdir(tmp_path)
+    conn = open_connection(DB_PATH)
+    conn.execute("PRAGMA journal_mode = WAL")
+    ensure_schema(conn, N_BOARDS)
+    conn.close()
+    yield DB_PATH
+    close_all()
+    cache_for(DB_PATH).clear()
+
+
+@pytest.fixture
+def conn(db_path):
+    conn = open_connection(db_path)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def write(conn):
+    """write(live={board: values | None}, archive={id: values | None}, label=...) as one journaled action."""
+    def write(live=None, archive=None, label='Edit', session='test', id_map=None):
+        changeset = {
+            'live': live or {}, 'archive': archive or {}, 'summary': None,
+            'journal': {'session': session, 'label': label},
+        }
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            action = apply_changes(conn, changeset, {} if id_map is None else id_map)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        commit(conn)
+        return action
+    return write
@@ -0,0 +1,166 @@
+import random
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+
+from billboard_core import availability
+from billboard_core.availability import (
+    BookingConflict, activate_due_bookings, book_board, booking_conflicts, cancel_booking, count_free, free_boards,
+    overlapping,
+)
+from billboard_core.inventory import set_inventory_size
+
+from conftest import N_BOARDS, archived, contract, contracts
+
+
+@pytest.fixture(params=['rtree', 'fallback'])
+def index(request, monkeypatch):
+    """Run the test against the R*Tree and against the computed intervals."""
+    if request.param == 'fallback':
+        monkeypatch.setattr(availability, 'has_calendar_index', lambda conn: False)
+    return request.param
+
+
+def _live(write, board, start, end, client='Ali'):
+    write(live={board: contract(board, client_name=client, start_date=start, end_date=end)})
+
+
+def test_booking_next_to_a_contract_is_allowed(conn, write, index):
+    _live(write, 1, '2026-10-01', '2026-10-31')
+    assert book_board(conn, 1, '2026-11-01', '2026-11-30', 'Sara') > 0
+
+
+@pytest.mark.parametrize('start, end', [
+    ('2026-10-31', '2026-11-15'),      # shares the contract's last day
+    ('2026-09-01', '2026-10-01'),      # shares its first day
+    ('2026-10-10', '2026-10-12'),      # inside it
+    ('2026-09-01', '2026-12-31'),      # around it
+])
+def test_booking_over_a_contract_conflicts(conn, write, index, start, end):
+    _live(write, 1, '2026-10-01', '2026-10-31')
+    with pytest.raises(BookingConflict) as e:
+        book_board(conn, 1, start, end, 'Sara')
+    assert [(c['kind'], c['client'], c['start'], c['end']) for c in e.value.conflicts] == [
+        ('Live', 'Ali', '2026-10-01', '2026-10-31'),
+    ]
+    assert conn.execute("SELECT COUNT(*) FROM bookings").fetchone()[0] == 0
+
+
+def test_booking_over_a_booking_conflicts_until_cancelled(conn, index):
+    first = book_board(conn, 2, '2026-11-01', '2026-11-30', 'Ali')
+    with pytest.raises(BookingConflict):
+        book_board(conn, 2, '2026-11-30', '2026-12-15', 'Sara')
+    assert cancel_booking(conn, first)
+    assert book_board(conn, 2, '2026-11-30', '2026-12-15', 'Sara') > first
+
+
+def test_a_failed_cancel_rolls_back(conn):
+    booking = book_board(conn, 2, '2026-11-01', '2026-11-30', 'Ali')
+    conn.execute("CREATE TEMP TRIGGER refuse BEFORE DELETE ON bookings BEGIN SELECT RAISE(ABORT, 'refused'); END")
+    with pytest.raises(sqlite3.IntegrityError, match='refused'):
+        cancel_booking(conn, booking)
+    assert not conn.in_transaction
+    conn.execute("DROP TRIGGER refuse")
+    assert cancel_booking(conn, booking)
+
+
+def test_open_ended_contract_blocks_every_later_period(conn, write, index):
+    _live(write, 3, '2026-01-01', None)
+    assert [c['end'] for c in overlapping(conn, 3, '2030-01-01', '2030-01-31')] == [None]
+
+
+def test_archived_contracts_never_block(conn, write, index):
+    write(archive={-1: archived(4, client_name='Old', start_date='2026-10-01', end_date='2026-12-31')},
+          id_map={})
+    assert overlapping(conn, 4, '2026-11-01', '2026-11-30') == []
+    assert book_board(conn, 4, '2026-11-01', '2026-11-30', 'Sara') > 0
+
+
+@pytest.mark.parametrize('board, start, end, error', [
+    (1, '2026-11-30', '2026-11-01', 'ends before'),
+    (1, '2026-11-01', '2026-11-30', 'client'),
+    (N_BOARDS + 1, '2026-11-01', '2026-11-30', 'does not exist'),
+])
+def test_book_board_refuses_bad_requests(conn, board, start, end, error):
+    client = None if error == 'client' else 'Sara'
+    with pytest.raises(ValueError, match=error):
+        book_board(conn, board, start, end, client)
+
+
+def test_free_boards_and_count_free(conn, write, index):
+    _live(write, 1, '2026-10-01', '2026-10-31')
+    book_board(conn, 2, '2026-11-01', '2026-11-30', 'Sara')
+    assert free_boards(conn, '2026-10-15', '2026-10-20') == [b for b in range(1, N_BOARDS + 1) if b != 1]
+    assert free_boards(conn, '2026-10-31', '2026-11-01', limit=2) == [3, 4]
+    assert count_free(conn, '2026-10-31', '2026-11-01') == N_BOARDS - 2
+    assert count_free(conn, '2026-12-01', '2026-12-31') == N_BOARDS
+
+
+def test_index_matches_a_brute_force_scan(conn, write):
+    rng = random.Random(7)
+    first = date(2026, 1, 1)
+
+    def day():
+        return first + timedelta(days=rng.randrange(365))
+
+    spans = {b: [] for b in range(1, N_BOARDS + 1)}
+    for board in range(1, N_BOARDS + 1):
+        start, end = sorted([day(), day()])
+        if rng.random() < 0.2:
+            start = None
+        if rng.random() < 0.2:
+            end = None
+        _live(write, board, start and start.isoformat(), end and end.isoformat())
+        spans[board].append((start or date.min, end or date.max))
+        start, end = sorted([day(), day()])
+        conn.execute("INSERT INTO bookings (billboard_id, client_name, start_date, end_date) VALUES (?, 'B', ?, ?)",
+                     (board, start.isoformat(), end.isoformat()))
+        spans[board].append((start, end))
+
+    for _ in range(50):
+        lo, hi = sorted([day(), day()])
+        expected = [b for b, taken in spans.items() if not any(s <= hi and e >= lo for s, e in taken)]
+        assert free_boards(conn, lo, hi) == expected
+        assert count_free(conn, lo, hi) == len(expected)
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr(availability, 'has_calendar_index', lambda conn: False)
+            assert free_boards(conn, lo, hi) == expected
+            assert count_free(conn, lo, hi) == len(expected)
+
+
+def test_booking_conflicts_reports_contracts_extended_over_a_booking(conn, write):
+    _live(write, 5, '2026-10-01', '2026-10-31')
+    booking = book_board(conn, 5, '2026-11-01', '2026-11-30', 'Sara')
+    assert booking_conflicts(conn) == []
+    _live(write, 5, '2026-10-01', '2026-11-10')
+    [clash] = booking_conflicts(conn)
+    assert clash['booking']['id'] == booking
+    assert [c['kind'] for c in clash['conflicts']] == ['Live']
+
+
+def test_activate_due_bookings_waits_for_a_free_board(conn, write):
+    _live(write, 6, '2026-09-01', '2026-10-05')
+    on_busy = book_board(conn, 6, '2026-10-06', '2026-10-31', 'Sara', rent=5000.0)
+    on_free = book_board(conn, 7, '2026-10-01', '2026-10-31', 'Bilal')
+    later = book_board(conn, 8, '2026-12-01', '2026-12-31', 'Zara')
+    assert activate_due_bookings(conn, today='2026-10-10') == ([on_free], [on_busy])
+    assert [r[1:3] for r in contracts(conn) if not r[3]] == [(6, 'Ali'), (7, 'Bilal')]
+    assert [r[0] for r in conn.execute("SELECT id FROM bookings ORDER BY id")] == [on_busy, later]
+
+
+def test_activate_due_bookings_leaves_bookings_that_have_ended(conn):
+    ended = book_board(conn, 6, '2026-09-01', '2026-09-30', 'Sara')
+    last_day = book_board(conn, 7, '2026-09-15', '2026-10-10', 'Bilal')
+    assert activate_due_bookings(conn, today='2026-10-10') == ([last_day], [])
+    assert [r[1:3] for r in contracts(conn)] == [(7, 'Bilal')]
+    assert [r[0] for r in conn.execute("SELECT id FROM bookings")] == [ended]
+
+
+def test_shrinking_the_inventory_keeps_booked_and_contracted_boards(conn, write):
+    _live(write, 7, '2026-10-01', '2026-10-31')
+    book_board(conn, 9, '2026-11-01', '2026-11-30', 'Sara')
+    assert set_inventory_size(conn, 5) == (7, 2)
+    assert [r[0] for r in conn.execute("SELECT id FROM billboards WHERE id > 5")] == [7, 9]
+    assert conn.execute('SELECT "Total Boards" FROM summary').fetchone()[0] == 7
+    assert set_inventory_size(conn, N_BOARDS) == (N_BOARDS, 0)
@@ -0,0 +1,28 @@
+import bench
+from billboard_core.db import open_connection
+
+
+def test_generate_db(tmp_path):
+    path = str(tmp_path / 'bench.db')
+    bench.generate_db(path, 40, 100, occupancy=0.5, seed=3)
+    conn = open_connection(path)
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM billboards").fetchone()[0] == 40
+        assert conn.execute("SELECT COUNT(*) FROM contracts WHERE archived_at IS NOT NULL").fetchone()[0] == 100
+        live = conn.execute("SELECT COUNT(*) FROM contracts WHERE archived_at IS NULL").fetchone()[0]
+        assert 0 < live < 40
+    finally:
+        conn.close()
+
+
+def test_run_times_every_scenario(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    report = bench.run([(50, 200)], repeat=1)
+    assert set(report['meta']) >= {'timestamp', 'python', 'sqlite'}
+    [scenario] = report['scenarios']
+    assert (scenario['boards'], scenario['archived']) == (50, 200)
+    results = scenario['results']
+    assert {'read_sheets_sqlite_cold', 'save_to_db', 'archive_restore', 'finance_kpis', 'free_boards_90d'} <= set(
+        results)
+    assert all(r['median'] >= 0 for r in results.values())
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,55 @@
+import csv
+import gzip
+import importlib
+import importlib.util
+import io
+import sys
+
+import pytest
+
+from billboard_core import export
+from billboard_core.export import export_archive, export_archive_bytes
+
+from conftest import archived
+
+
+@pytest.fixture
+def archive(write):
+    write(archive={
+        -1: archived(1, client_name='Ali', end_date='2026-01-31', rent_amount=1000.0),
+        -2: archived(2, client_name='Sara', end_date='2026-02-28'),
+    }, id_map={})
+
+
+def _rows(data):
+    return list(csv.DictReader(io.StringIO(data.decode('utf-8'))))
+
+
+def test_csv_and_gzip(conn, archive):
+    rows = _rows(export_archive_bytes(conn, 'CSV'))
+    assert [(r['Billboard Number'], r['Client Name']) for r in rows] == [('1', 'Ali'), ('2', 'Sara')]
+    assert _rows(gzip.decompress(export_archive_bytes(conn, 'CSV (gzip)'))) == rows
+    assert [r['Client Name'] for r in _rows(export_archive_bytes(conn, 'CSV', search='sara'))] == ['Sara']
+
+
+def test_parquet(conn, archive):
+    pq = pytest.importorskip('pyarrow.parquet')
+    out = io.BytesIO()
+    assert export_archive(conn, out, 'Parquet', chunk_rows=1) == 2
+    table = pq.read_table(io.BytesIO(out.getvalue()))
+    assert table.column('Client Name').to_pylist() == ['Ali', 'Sara']
+    assert table.column('Rent Amount (PKR)').to_pylist() == [1000.0, None]
+
+
+def test_parquet_is_offered_only_with_pyarrow(conn, archive, monkeypatch):
+    find_spec = importlib.util.find_spec
+    monkeypatch.setattr(importlib.util, 'find_spec',
+                        lambda name, *args: None if name == 'pyarrow' else find_spec(name, *args))
+    try:
+        assert list(importlib.reload(export).EXPORT_FORMATS) == ['CSV', 'CSV (gzip)']
+    finally:
+        monkeypatch.undo()
+        importlib.reload(export)
+    monkeypatch.setitem(sys.modules, 'pyarrow', None)
+    with pytest.raises(ImportError, match='pip install pyarrow'):
+        export_archive(conn, io.BytesIO(), 'Parquet')
@@ -0,0 +1,163 @@
+import random
+import sqlite3
+
+import pytest
+
+from billboard_core.finance import delete_payment, finance_kpis, payments_for, record_payment
+from billboard_core.inventory import clear_live_contracts
+from billboard_core.schema import FINANCE_REBUILD, ensure_schema
+
+from conftest import N_BOARDS, archived, contract, contracts
+
+
+def _figures(conn):
+    # months netting to zero are dropped: the triggers keep them at 0, a rebuild leaves them out
+    return (
+        [(i, round(p, 6)) for i, p in conn.execute("SELECT id, paid_total FROM contracts ORDER BY id")],
+        [tuple(round(v, 6) if isinstance(v, float) else v for v in r)
+         for r in conn.execute("SELECT * FROM finance_live ORDER BY end_date")],
+        [(m, round(v, 6)) for m, v in conn.execute("SELECT * FROM finance_monthly ORDER BY month")
+         if round(v, 6) != 0],
+    )
+
+
+def _rebuilt(conn):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for stmt in FINANCE_REBUILD:
+            conn.execute(stmt)
+        return _figures(conn)
+    finally:
+        conn.execute("ROLLBACK")
+
+
+def _terms(rng, board, client):
+    rent = float(rng.randrange(1, 20) * 1000)
+    advance = float(rng.randrange(0, 5) * 500)
+    return contract(
+        board, client_name=client, start_date=f"2026-{rng.randint(1, 9):02d}-01",
+        end_date=rng.choice([None, f"2027-{rng.randint(1, 12):02d}-28"]),
+        rent_amount=rent, advance_received=advance, balance=rent - advance,
+        partner_share=rng.choice([None, '10%', '1,500']),
+    )
+
+
+def test_triggers_match_a_full_rebuild_after_random_edits(conn, write):
+    rng = random.Random(11)
+    clients = ['Ali', 'Sara', 'Bilal', 'Zara']
+    write(live={b: _terms(rng, b, rng.choice(clients)) for b in range(1, N_BOARDS + 1)})
+    for step in range(150):
+        ids = [r[0] for r in contracts(conn)]
+        payments = [r[0] for r in conn.execute("SELECT id FROM payments")]
+        action = rng.random()
+        if action < 0.35 or not payments:
+            amount = rng.choice([1, 1, 1, -1]) * float(rng.randrange(1, 40) * 100)
+            record_payment(conn, rng.choice(ids), amount, paid_on=f"2026-{rng.randint(1, 12):02d}-15")
+        elif action < 0.5:
+            conn.execute(
+                "UPDATE payments SET amount = ?, paid_on = ?, contract_id = ? WHERE id = ?",
+                (float(rng.randrange(1, 40) * 100), f"2026-{rng.randint(1, 12):02d}-01",
+                 rng.choice(ids + [None]), rng.choice(payments)),
+            )
+        elif action < 0.6:
+            delete_payment(conn, rng.choice(payments))
+        elif action < 0.8:
+            # same client keeps the contract; another one archives it
+            board = rng.randint(1, N_BOARDS)
+            write(live={board: _terms(rng, board, rng.choice(clients))})
+        elif action < 0.9:
+            board = rng.randint(1, N_BOARDS)
+            write(live={board: None})
+        else:
+            board = rng.randint(1, N_BOARDS)
+            write(archive={-1: archived(board, client_name=rng.choice(clients), rent_amount=5000.0,
+                                        advance_received=1000.0, balance=4000.0)}, id_map={})
+        assert _figures(conn) == _rebuilt(conn), f"step {step}"
+    assert conn.execute("SELECT COUNT(*) FROM contracts WHERE archived_at IS NOT NULL").fetchone()[0] > 0
+    assert conn.execute("SELECT COUNT(*) FROM payments WHERE contract_id IS NULL").fetchone()[0] > 0
+
+
+def test_a_new_client_on_a_board_starts_a_new_contract(conn, write):
+    write(live={3: contract(3, client_name='Ali', start_date='2026-01-01', rent_amount=60000.0, balance=60000.0)})
+    [(old, *_)] = contracts(conn)
+    record_payment(conn, old, 30000.0, paid_on='2026-02-01')
+    assert conn.execute("SELECT balance FROM contracts WHERE id = ?", (old,)).fetchone()[0] == 30000.0
+
+    write(live={3: contract(3, client_name='Sara', start_date='2026-06-01', rent_amount=50000.0, balance=50000.0)})
+    rows = contracts(conn, 'id', 'client_name', 'archived_at IS NOT NULL', 'balance', 'paid_total')
+    assert rows[0] == (old, 'Ali', 1, 30000.0, 30000.0)
+    assert rows[1][1:] == ('Sara', 0, 50000.0, 0.0)
+    assert [p['amount'] for p in payments_for(conn, old)] == [30000.0]
+    assert payments_for(conn, rows[1][0]) == []
+    assert finance_kpis(conn, today='2026-06-15')['outstanding'] == 50000.0
+
+    # the same client and start date is an edit of the live contract
+    write(live={3: contract(3, client_name='Sara', start_date='2026-06-01', rent_amount=55000.0, balance=55000.0)})
+    assert [r[0] for r in contracts(conn)] == [old, rows[1][0]]
+    assert _figures(conn) == _rebuilt(conn)
+
+
+def test_clearing_contracts_keeps_the_money_received(conn, write):
+    write(live={1: contract(1, client_name='Ali', start_date='2026-01-01', rent_amount=9000.0,
+                            advance_received=3000.0, balance=6000.0)})
+    write(archive={-1: archived(2, client_name='Sara', start_date='2025-11-01', rent_amount=4000.0,
+                                advance_received=500.0, balance=3500.0)}, id_map={})
+    live, old = [r[0] for r in contracts(conn)]
+    record_payment(conn, live, 2000.0, paid_on='2026-03-10')
+    record_payment(conn, old, 1500.0, paid_on='2025-12-10')
+    monthly = conn.execute("SELECT * FROM finance_monthly ORDER BY month").fetchall()
+    assert monthly == [('2025-11', 500.0), ('2025-12', 1500.0), ('2026-01', 3000.0), ('2026-03', 2000.0)]
+
+    assert clear_live_contracts(conn) == 1
+    write(archive={old: None})
+    assert contracts(conn) == []
+    assert conn.execute("SELECT contract_id, amount FROM payments ORDER BY id").fetchall() == [
+        (None, 2000.0), (None, 1500.0),
+    ]
+    assert conn.execute("SELECT contract_id, month, amount FROM advances ORDER BY id").fetchall() == [
+        (None, '2026-01', 3000.0), (None, '2025-11', 500.0),
+    ]
+    assert conn.execute("SELECT * FROM finance_monthly ORDER BY month").fetchall() == monthly
+    assert _figures(conn) == _rebuilt(conn)
+
+
+def test_changing_an_advance_posts_a_correction(conn, write):
+    terms = dict(client_name='Ali', start_date='2026-01-01', rent_amount=9000.0)
+    write(live={1: contract(1, advance_received=3000.0, balance=6000.0, **terms)})
+    write(live={1: contract(1, advance_received=3000.0, balance=6000.0, remarks='edited', **terms)})
+    write(live={1: contract(1, advance_received=2000.0, balance=7000.0, **terms)})
+    [(ali, *_)] = contracts(conn)
+    # an archived contract's start month can still be corrected
+    write(live={1: None}, archive={-1: archived(1, advance_received=2000.0, balance=7000.0, **terms)}, id_map={})
+    write(archive={ali: archived(1, advance_received=2000.0, balance=7000.0, **dict(terms, start_date='2026-02-01'))})
+    assert conn.execute("SELECT month, amount FROM advances ORDER BY id").fetchall() == [
+        ('2026-01', 3000.0), ('2026-01', -3000.0), ('2026-01', 2000.0), ('2026-01', -2000.0), ('2026-02', 2000.0),
+    ]
+    assert conn.execute("SELECT * FROM finance_monthly WHERE received <> 0").fetchall() == [('2026-02', 2000.0)]
+    assert _figures(conn) == _rebuilt(conn)
+
+
+def test_upgrade_moves_existing_advances_to_the_ledger(conn, write):
+    write(live={1: contract(1, client_name='Ali', start_date='2026-01-01', advance_received=3000.0)})
+    write(live={2: contract(2, client_name='Sara', advance_received=700.0)})
+    conn.execute("DELETE FROM advances")
+    conn.execute("PRAGMA user_version = 7")
+    ensure_schema(conn, N_BOARDS)
+    assert conn.execute("SELECT contract_id, month, amount FROM advances ORDER BY contract_id").fetchall() == [
+        (1, '2026-01', 3000.0), (2, '', 700.0),
+    ]
+    assert _figures(conn) == _rebuilt(conn)
+    clear_live_contracts(conn)
+    assert conn.execute("SELECT SUM(received) FROM finance_monthly").fetchone()[0] == 3700.0
+
+
+def test_a_failed_payment_delete_rolls_back(conn, write):
+    write(live={1: contract(1, client_name='Ali', rent_amount=9000.0, balance=9000.0)})
+    payment = record_payment(conn, 1, 2000.0, paid_on='2026-03-10')
+    conn.execute("CREATE TEMP TRIGGER refuse BEFORE DELETE ON payments BEGIN SELECT RAISE(ABORT, 'refused'); END")
+    with pytest.raises(sqlite3.IntegrityError, match='refused'):
+        delete_payment(conn, payment)
+    assert not conn.in_transaction
+    conn.execute("DROP TRIGGER refuse")
+    assert delete_payment(conn, payment)
+    assert conn.execute("SELECT balance FROM contracts").fetchone()[0] == 9000.0
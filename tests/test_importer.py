@@ -0,0 +1,118 @@
+import csv
+import io
+from datetime import date
+
+import pytest
+
+from billboard_core.importer import import_contracts, map_columns, validate_row
+from billboard_core.schema import DATA_COLUMNS
+
+from conftest import N_BOARDS, contract, contracts
+
+
+TODAY = date(2026, 10, 1)
+HEADER = ['Board No', 'Client', 'Start', 'End', 'Rent', 'Advance', 'Colour']
+
+
+def _csv(tmp_path, *rows, header=HEADER):
+    path = tmp_path / 'contracts.csv'
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows([header, *rows])
+    return path
+
+
+def _cells(values):
+    return dict(zip(DATA_COLUMNS, values[1:]))
+
+
+def test_map_columns_accepts_aliases_and_reports_unknown_headers():
+    mapping, unknown = map_columns(HEADER)
+    assert mapping == {
+        0: 'Billboard Number', 1: 'Client Name', 2: 'Contract Start Date', 3: 'Contract End Date',
+        4: 'Rent Amount (PKR)', 5: 'Advance Received (PKR)',
+    }
+    assert unknown == ['Colour']
+
+
+def test_validate_row_parses_and_derives():
+    mapping, _ = map_columns(HEADER)
+    board, values, errors = validate_row(['7', ' Ali ', '01/09/2026', '2026-10-31', 'Rs. 12,000', '2000'], mapping,
+                                         TODAY)
+    assert (board, errors) == (7, [])
+    cells = _cells(values)
+    assert cells['client_name'] == 'Ali'
+    assert (cells['start_date'], cells['end_date']) == ('2026-09-01', '2026-10-31')
+    assert (cells['rent_amount'], cells['balance'], cells['days_remaining']) == (12000.0, 10000.0, 30)
+
+
+@pytest.mark.parametrize('row, column', [
+    (['', 'Ali'], 'Billboard Number'),
+    (['7.5', 'Ali'], 'Billboard Number'),
+    (['0', 'Ali'], 'Billboard Number'),
+    (['7', 'Ali', 'soon'], 'Contract Start Date'),
+    (['7', 'Ali', '2026-10-01', '2026-09-01'], 'Contract End Date'),
+    (['7', 'Ali', '', '', '-5'], 'Rent Amount (PKR)'),
+    (['7', 'Ali', '', '', 'lots'], 'Rent Amount (PKR)'),
+])
+def test_validate_row_rejects(row, column):
+    mapping, _ = map_columns(HEADER)
+    _, _, errors = validate_row(row, mapping, TODAY)
+    assert [e[0] for e in errors] == [column]
+
+
+def test_import_creates_contracts_and_missing_boards(tmp_path, conn):
+    path = _csv(tmp_path, ['3', 'Ali', '', '2027-01-31', '1000'], ['', ''], [str(N_BOARDS + 2), 'Sara'])
+    result = import_contracts(path, today=TODAY)
+    assert {k: result[k] for k in ('rows', 'imported', 'rejected', 'boards_created')} == {
+        'rows': 2, 'imported': 2, 'rejected': 0, 'boards_created': 1,
+    }
+    assert result['unknown_columns'] == ['Colour']
+    assert [c[1:3] for c in contracts(conn)] == [(3, 'Ali'), (N_BOARDS + 2, 'Sara')]
+    assert conn.execute('SELECT "Total Boards" FROM summary').fetchone()[0] == N_BOARDS + 1
+
+
+def test_import_skips_occupied_boards_and_duplicates(tmp_path, conn, write):
+    write(live={3: contract(3, client_name='Old')})
+    path = _csv(tmp_path, ['3', 'New'], ['4', 'Ali'], ['4', 'Again'])
+    result = import_contracts(path, today=TODAY)
+    assert (result['imported'], result['rejected']) == (1, 2)
+    assert [(e['Row'], e['Column']) for e in result['errors']] == [(4, 'Billboard Number'), (2, 'Billboard Number')]
+    assert [c[1:3] for c in contracts(conn)] == [(3, 'Old'), (4, 'Ali')]
+
+
+def test_replace_archives_another_clients_contract_and_updates_the_same_client(tmp_path, conn, write):
+    write(live={3: contract(3, client_name='Old'), 4: contract(4, client_name='Ali', rent_amount=1000.0)})
+    before = contracts(conn)
+    path = _csv(tmp_path, ['3', 'New'], ['4', 'Ali', '', '', '1500'])
+    result = import_contracts(path, replace=True, today=TODAY)
+    assert (result['imported'], result['rejected']) == (2, 0)
+    after = contracts(conn, 'id', 'billboard_id', 'client_name', 'archived_at IS NOT NULL', 'rent_amount')
+    assert after[0] == (before[0][0], 3, 'Old', 1, None)
+    assert after[1] == (before[1][0], 4, 'Ali', 0, 1500.0)
+    assert after[2][1:4] == (3, 'New', 0)
+
+
+def test_dry_run_writes_nothing(tmp_path, conn):
+    path = _csv(tmp_path, ['3', 'Ali'], [str(N_BOARDS + 1), 'Sara'])
+    result = import_contracts(path, dry_run=True, today=TODAY)
+    assert (result['imported'], result['boards_created']) == (2, 0)
+    assert contracts(conn) == []
+    assert conn.execute("SELECT COUNT(*) FROM billboards").fetchone()[0] == N_BOARDS
+
+
+def test_error_report_lists_every_problem(tmp_path, conn):
+    path = _csv(tmp_path, ['x', 'Ali', 'soon'], ['5', 'Sara'])
+    report = io.StringIO()
+    with open(path, 'rb') as f:
+        result = import_contracts(f, errors=report, today=TODAY)
+    assert (result['imported'], result['rejected']) == (1, 1)
+    assert list(csv.reader(io.StringIO(report.getvalue()))) == [
+        ['Row', 'Column', 'Value', 'Error'],
+        ['2', 'Billboard Number', 'x', 'not a board number'],
+        ['2', 'Contract Start Date', 'soon', 'not a date (use YYYY-MM-DD or DD/MM/YYYY)'],
+    ]
+
+
+def test_header_without_a_board_column_is_refused(tmp_path, conn):
+    with pytest.raises(ValueError, match='Billboard Number'):
+        import_contracts(_csv(tmp_path, ['Ali'], header=['Client']), today=TODAY)
@@ -0,0 +1,119 @@
+import pytest
+
+from billboard_core import journal
+from billboard_core.db import commit
+from billboard_core.finance import record_payment
+
+from conftest import archived, contract, contracts
+
+
+COLUMNS = ('id', 'billboard_id', 'client_name', 'start_date', 'end_date', 'rent_amount', 'balance', 'paid_total',
+           'archived_at')
+
+
+def _state(conn):
+    return contracts(conn, *COLUMNS)
+
+
+def _step(conn, fn, session='test'):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        result = fn(conn, session)
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    commit(conn)
+    return result
+
+
+def _round_trip(conn, write, ids=True, **change):
+    def state():
+        return [r if ids else r[1:] for r in _state(conn)]
+
+    before = state()
+    write(label='Change', **change)
+    after = state()
+    assert after != before
+    assert journal.labels(conn, 'test') == ('Change', None)
+    assert _step(conn, journal.undo)['skipped'] == 0
+    assert state() == before
+    assert journal.labels(conn, 'test')[1] == 'Change'
+    assert _step(conn, journal.redo)['skipped'] == 0
+    assert state() == after
+    return before, after
+
+
+@pytest.fixture
+def seeded(write):
+    write(live={
+        1: contract(1, client_name='Ali', start_date='2026-09-01', end_date='2027-01-31', rent_amount=1000.0,
+                     balance=1000.0),
+        2: contract(2, client_name='Sara', end_date='2027-03-31'),
+    }, label='Seed')
+
+
+def test_undo_redo_an_edit(conn, write, seeded):
+    _round_trip(conn, write, live={
+        1: contract(1, client_name='Ali', start_date='2026-09-01', end_date='2027-02-28', rent_amount=1200.0,
+                     balance=1200.0),
+    })
+
+
+def test_undo_redo_a_delete(conn, write, seeded):
+    # a live row comes back under a new contract id
+    before, after = _round_trip(conn, write, ids=False, live={2: None})
+    assert len(after) == len(before) - 1
+
+
+def test_undo_redo_an_archive_keeps_the_contract_id(conn, write, seeded):
+    [ali] = [r for r in _state(conn) if r[1] == 1]
+    before, after = _round_trip(conn, write, live={1: None}, archive={-1: archived(
+        1, client_name='Ali', start_date='2026-09-01', end_date='2027-01-31', rent_amount=1000.0, balance=1000.0,
+    )})
+    assert [r[0] for r in after if r[8]] == [ali[0]]
+
+
+def test_undo_of_an_overwrite_brings_back_the_old_contract_and_its_payments(conn, write, seeded):
+    [ali] = [r for r in _state(conn) if r[1] == 1]
+    record_payment(conn, ali[0], 300.0, paid_on='2026-09-15')
+    before = _state(conn)
+    write(live={1: contract(1, client_name='Bilal', rent_amount=500.0, balance=500.0)}, label='Overwrite')
+    assert [r[2:] for r in _state(conn) if r[1] == 1 and r[8] is None] == [(
+        'Bilal', None, None, 500.0, 500.0, 0.0, None,
+    )]
+    _step(conn, journal.undo)
+    assert _state(conn) == before
+    _step(conn, journal.redo)
+    live = [r for r in _state(conn) if r[1] == 1 and r[8] is None]
+    assert [r[2] for r in live] == ['Bilal']
+    assert live[0][6] == 500.0
+    assert [r[6] for r in _state(conn) if r[0] == ali[0]] == [700.0]
+
+
+def test_undo_leaves_cells_changed_since(conn, write, seeded):
+    write(live={2: contract(2, client_name='Sara', end_date='2027-04-30', rent_amount=800.0, balance=800.0)},
+          label='Mine')
+    write(live={2: contract(2, client_name='Sara', end_date='2027-05-31', rent_amount=800.0, balance=800.0)},
+          session='other')
+    result = _step(conn, journal.undo)
+    assert (result['label'], result['skipped']) == ('Mine', 1)
+    assert [r[2:7] for r in _state(conn) if r[1] == 2] == [('Sara', None, '2027-05-31', None, None)]
+
+
+def test_nothing_to_undo_or_redo(conn, db_path):
+    assert _step(conn, journal.undo) is None
+    assert _step(conn, journal.redo) is None
+    assert journal.labels(conn, 'test') == (None, None)
+
+
+def test_board_history_and_state_at(conn, write, seeded):
+    write(live={2: contract(2, client_name='Sara', end_date='2027-04-30')}, label='Extend')
+    history = journal.board_history(conn, 2)
+    assert [(e['action'], e['column'], e['old'], e['new']) for e in history[:1]] == [
+        ('Extend', 'end_date', '2027-03-31', '2027-04-30'),
+    ]
+    assert all(e['target'] == 'live' and e['row_key'] == 2 for e in history)
+    first = history[-1]['event']
+    assert journal.state_at(conn, 'live', 2, first - 1) is None
+    assert journal.state_at(conn, 'live', 2, history[1]['event'])['end_date'] == '2027-03-31'
+    assert journal.state_at(conn, 'live', 2, history[0]['event'])['end_date'] == '2027-04-30'
@@ -0,0 +1,109 @@
+import pandas as pd
+
+from billboard_core.persistence import (
+    ARCHIVE_KEY, ARCHIVED_AT, DASHBOARD_KEY, changes, read_sheets_sqlite, read_store, resolve_archive_ids,
+    rewrite_db, row_changes, save_to_db, snapshot,
+)
+
+from conftest import N_BOARDS, archived, contract, contracts
+
+
+def _seed(write):
+    write(live={
+        1: contract(1, client_name='Ali', end_date='2027-01-31', rent_amount=1000.0),
+        2: contract(2, client_name='Sara', end_date='2027-03-31', rent_amount=2000.0),
+    })
+
+
+def _load():
+    dashboard, summary, saved = read_sheets_sqlite()
+    return dashboard, summary, saved, snapshot(dashboard, summary, saved)
+
+
+def test_unchanged_frames_make_an_empty_change_set(write):
+    _seed(write)
+    dashboard, summary, saved, baseline = _load()
+    changeset, _ = changes(dashboard, summary, saved, baseline)
+    assert changeset == {'live': {}, 'archive': {}, 'summary': None}
+
+
+def test_only_edited_rows_are_in_the_change_set(write):
+    _seed(write)
+    dashboard, summary, saved, baseline = _load()
+    dashboard.loc[dashboard[DASHBOARD_KEY] == 2, 'Company Name'] = 'Sara & Co'
+    changeset, _ = changes(dashboard, summary, saved, baseline)
+    assert list(changeset['live']) == [2]
+    assert changeset['archive'] == {}
+
+
+def test_days_remaining_alone_does_not_dirty_a_row(write):
+    _seed(write)
+    dashboard, summary, saved, baseline = _load()
+    dashboard['Days Remaining'] = 99
+    changeset, _ = changes(dashboard, summary, saved, baseline)
+    assert changeset['live'] == {}
+
+
+def test_save_upserts_edits_in_place_and_deletes_blanked_boards(conn, write):
+    _seed(write)
+    before = dict(conn.execute("SELECT billboard_id, id FROM contracts").fetchall())
+    dashboard, summary, saved, baseline = _load()
+    dashboard.loc[dashboard[DASHBOARD_KEY] == 1, 'Rent Amount (PKR)'] = 1500.0
+    for col in dashboard.columns:
+        if col != DASHBOARD_KEY:
+            dashboard.loc[dashboard[DASHBOARD_KEY] == 2, col] = None
+    save_to_db(dashboard, summary, saved, baseline)
+    assert conn.execute("SELECT id, rent_amount FROM contracts").fetchall() == [(before[1], 1500.0)]
+
+
+def test_new_archive_rows_get_their_ids_in_the_frame(conn, write):
+    _seed(write)
+    dashboard, summary, saved, baseline = _load()
+    row = dashboard[dashboard[DASHBOARD_KEY] == 1].copy()
+    row[ARCHIVED_AT] = None
+    row[ARCHIVE_KEY] = pd.NA
+    saved = pd.concat([saved, row], ignore_index=True)
+    save_to_db(dashboard, summary, saved, baseline)
+    ids = saved[ARCHIVE_KEY].tolist()
+    assert len(ids) == 1 and ids[0] > 0
+    assert conn.execute("SELECT billboard_id, client_name FROM contracts WHERE id = ?", (ids[0],)).fetchone() == (
+        1, 'Ali',
+    )
+
+
+def test_row_changes_covers_just_the_given_rows(write):
+    _seed(write)
+    dashboard, summary, saved, baseline = _load()
+    edited = dashboard[dashboard[DASHBOARD_KEY] == 1].copy()
+    edited['Client Name'] = 'Ali Khan'
+    changeset, new_baseline = row_changes(baseline, live_rows=edited)
+    assert list(changeset['live']) == [1]
+    assert (new_baseline['dashboard'].drop(1) == baseline['dashboard'].drop(1)).all()
+    assert new_baseline['dashboard'][1] != baseline['dashboard'][1]
+
+
+def test_rewrite_keeps_surviving_contract_ids(conn, write):
+    _seed(write)
+    before = contracts(conn)
+    dashboard, summary, saved, _ = _load()
+    rewrite_db(dashboard[dashboard[DASHBOARD_KEY] == 1], summary, saved)
+    assert contracts(conn) == before[:1]
+    assert conn.execute("SELECT COUNT(*) FROM billboards").fetchone()[0] == N_BOARDS
+
+
+def test_sessions_cannot_change_the_shared_frames(write):
+    _seed(write)
+    write(archive={-1: archived(3, client_name='Old')}, id_map={})
+    saved, summary, baseline = read_store()
+    [old] = saved[ARCHIVE_KEY].tolist()
+    saved.loc[saved.index[0], 'Client Name'] = 'Changed'
+    summary.loc[summary.index[0], 'Total Boards'] = 1
+    saved.loc[saved.index[0], ARCHIVE_KEY] = -5
+    assert resolve_archive_ids(saved, baseline, {-5: old + 100})
+    dashboard, _, _ = read_sheets_sqlite()
+    dashboard.loc[dashboard.index[0], 'Client Name'] = 'Changed'
+
+    again, summary, _ = read_store()
+    assert again['Client Name'].tolist() == ['Old'] and again[ARCHIVE_KEY].tolist() == [old]
+    assert summary['Total Boards'].tolist() == [N_BOARDS]
+    assert not read_sheets_sqlite()[0]['Client Name'].eq('Changed').any()